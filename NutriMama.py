@@ -1,5 +1,7 @@
 import streamlit as st
 from datetime import datetime
+from stages import DEFAULT_STAGE, DURATIONS, STAGE_BY_DURATION
+from user_session import restore_session, save_profile
 
 # ==============================================
 # INITIALIZE SESSION STATE
@@ -11,6 +13,9 @@ if 'show_onboarding' not in st.session_state:
 if 'trigger_redirect' not in st.session_state:
     st.session_state.trigger_redirect = False
 
+# Returning users (uid in the URL) skip onboarding
+restore_session()
+
 # ==============================================
 # STYLE CONFIGURATION
 # ==============================================
@@ -93,7 +98,7 @@ def show_onboarding():
             # Updated breastfeeding duration options
             bf_duration = st.selectbox(
                 "Breastfeeding Duration*",
-                ["0-6 Months", "6-12 Months", "12+ Months"],
+                list(DURATIONS),
                 index=0
             )
             # Updated health conditions to reflect model changes
@@ -109,23 +114,16 @@ def show_onboarding():
             if not all([name, age, region, bf_duration]):
                 st.error("Please fill all required fields (*)")
             else:
-                # Map breastfeeding duration to stage for internal use
-                bf_stage_mapping = {
-                    "0-6 Months": "Lactation",
-                    "6-12 Months": "Weaning",
-                    "12+ Months": "Extended"
-                }
-
                 # Save user profile with the mapped bf_stage
-                st.session_state.user_profile = {
+                save_profile({
                     "name": name,
                     "age": age,
                     "region": region,
                     "bf_duration": bf_duration,  # Save the bf_duration
-                    "bf_stage": bf_stage_mapping.get(bf_duration, "Lactation"),  # Map to bf_stage
+                    "bf_stage": STAGE_BY_DURATION.get(bf_duration, DEFAULT_STAGE),  # Map to bf_stage
                     "conditions": conditions,
                     "onboarded_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
+                })
 
                 st.session_state.trigger_redirect = True
                 st.rerun()
@@ -139,6 +137,8 @@ if st.session_state.trigger_redirect:
     st.session_state.trigger_redirect = False
     st.session_state.show_onboarding = False
     st.success("✅ Profile saved successfully! Redirecting to home...")
+    # Pages put the uid back in the URL themselves if switching pages drops it
+    st.query_params["uid"] = st.session_state.user_id
     st.switch_page("pages/1_Home.py")
 
 elif st.session_state.show_onboarding:
@@ -148,4 +148,5 @@ else:
     st.write(f"Welcome back, {st.session_state.user_profile['name']}!")
     st.write("You're ready to get your personalized meal plan!")
     if st.button("Go to NutriMama application"):
+        st.query_params["uid"] = st.session_state.user_id
         st.switch_page("pages/1_Home.py")
@@ -0,0 +1,203 @@
+# barcode_scan.py
+# Medication barcode scanning for the Home page: camera image -> UPC/EAN code ->
+# product -> medication name for the safety lookup.
+#
+# Decoding needs no native libraries: the image is downscaled and converted to
+# grayscale, then a handful of scanlines (in both directions, and transposed for
+# vertical barcodes) are thresholded into bar widths and matched against the
+# EAN-13 / UPC-A digit patterns, with the check digit rejecting misreads. If the
+# optional zxing-cpp package is installed it is tried first on the same prepared
+# image, since it also copes with skewed and low-contrast photos. Products come from a local barcode index
+# (data/barcodes.csv), which also maps NDC numbers carried inside UPC-A codes.
+import csv
+import io
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageOps
+
+try:
+    import zxingcpp
+except ImportError:  # optional
+    zxingcpp = None
+
+INDEX_PATH = os.environ.get(
+    "NUTRIMAMA_BARCODE_INDEX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "barcodes.csv")
+)
+
+MAX_SIDE = 800
+SCANLINES = 24
+
+Product = namedtuple("Product", ["code", "name", "medication"])
+
+# Digit patterns as module widths (space, bar, space, bar) for the left-hand
+# L code; G is L reversed, and right-hand R digits share L's widths with colours swapped
+_L = ["3211", "2221", "2122", "1411", "1132", "1231", "1114", "1312", "1213", "3112"]
+_PATTERNS = np.array([[int(c) for c in p] for p in _L] + [[int(c) for c in p[::-1]] for p in _L], dtype=np.float64)
+# First digit of EAN-13 from the L/G parity of the six left-hand digits
+_FIRST_DIGIT = {
+    "LLLLLL": 0, "LLGLGG": 1, "LLGGLG": 2, "LLGGGL": 3, "LGLLGG": 4,
+    "LGGLLG": 5, "LGGGLL": 6, "LGLGLG": 7, "LGLGGL": 8, "LGGLGL": 9,
+}
+_EAN13_RUNS = 3 + 24 + 5 + 24 + 3
+
+
+# ==============================================
+# Image -> barcode digits
+# ==============================================
+def prepare_image(data, max_side=MAX_SIDE):
+    """Camera bytes -> grayscale uint8 array, downscaled so the longest side is <= max_side."""
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data) if isinstance(data, bytes) else data))
+    image = image.convert("L")
+    image.thumbnail((max_side, max_side))
+    return np.asarray(image)
+
+
+def check_digit_ok(code):
+    digits = [int(c) for c in code]
+    total = sum(digits[-2::-2]) * 3 + sum(digits[-3::-2])
+    return (10 - total % 10) % 10 == digits[-1]
+
+
+def _runs(row):
+    """Widths of alternating dark/light runs along a thresholded scanline, and whether each is dark."""
+    dark = row < (int(row.min()) + int(row.max())) / 2
+    edges = np.flatnonzero(dark[1:] != dark[:-1]) + 1
+    bounds = np.concatenate(([0], edges, [len(row)]))
+    return np.diff(bounds).astype(np.float64), dark[bounds[:-1]]
+
+
+def _digit(widths):
+    """Best (pattern index, error) for 4 run widths scaled to 7 modules."""
+    scaled = widths * (7 / widths.sum())
+    errors = np.abs(_PATTERNS - scaled).sum(axis=1)
+    best = int(np.argmin(errors))
+    return best, errors[best]
+
+
+def _decode_runs(widths, dark):
+    if len(widths) < _EAN13_RUNS:
+        return None
+    for start in np.flatnonzero(dark[:len(widths) - _EAN13_RUNS + 1]):
+        window = widths[start:start + _EAN13_RUNS]
+        module = window.sum() / 95
+        guards = np.concatenate((window[:3], window[27:32], window[-3:])) / module
+        if np.abs(guards - 1).max() > 0.7:
+            continue
+        digits, parity, worst = [], "", 0.0
+        for k in range(12):
+            offset = 3 + 4 * k + (5 if k >= 6 else 0)
+            index, error = _digit(window[offset:offset + 4])
+            worst = max(worst, error)
+            if k < 6:
+                parity += "L" if index < 10 else "G"
+            elif index >= 10:
+                break
+            digits.append(index % 10)
+        else:
+            if parity in _FIRST_DIGIT and worst < 1.5:
+                code = str(_FIRST_DIGIT[parity]) + "".join(map(str, digits))
+                if check_digit_ok(code):
+                    return code
+    return None
+
+
+def decode_ean(gray, scanlines=SCANLINES):
+    """EAN-13 codes (UPC-A as its 13-digit form) found on scanlines across the image."""
+    found = []
+    for image in (gray, gray.T):
+        rows = np.linspace(0, image.shape[0] - 1, scanlines + 2).astype(int)[1:-1]
+        for r in rows:
+            line = image[r].astype(np.int16)
+            if int(line.max()) - int(line.min()) < 40:
+                continue
+            for row in (line, line[::-1]):
+                code = _decode_runs(*_runs(row))
+                if code and code not in found:
+                    found.append(code)
+        if found:
+            break
+    return found
+
+
+def decode_image(data):
+    """Barcode numbers in a camera image, most specific first; [] if none could be read."""
+    gray = prepare_image(data)
+    if zxingcpp is not None:
+        codes = [r.text for r in zxingcpp.read_barcodes(gray)]
+        if codes:
+            return codes
+    return decode_ean(gray)
+
+
+# ==============================================
+# Barcode -> product
+# ==============================================
+def normalize_code(code):
+    return "".join(c for c in str(code) if c.isdigit())
+
+
+def code_keys(code):
+    """Lookup keys for a scanned or typed number: the code, its UPC-A/EAN-13 twin and any NDC inside."""
+    digits = normalize_code(code)
+    keys = [digits]
+    if len(digits) == 13 and digits.startswith("0"):
+        keys.append(digits[1:])
+    elif len(digits) == 12:
+        keys.append("0" + digits)
+    upc = digits[1:] if len(digits) == 13 and digits.startswith("0") else digits
+    # Drug packages carry the 10-digit NDC in a UPC-A with number system 3
+    if len(upc) == 12 and upc.startswith("3"):
+        keys.append(upc[1:11])
+    return keys
+
+
+class BarcodeIndex:
+    def __init__(self, products):
+        self._by_key = {}
+        for product in products:
+            for key in code_keys(product.code):
+                self._by_key.setdefault(key, product)
+
+    def __len__(self):
+        return len(self._by_key)
+
+    def lookup(self, code):
+        for key in code_keys(code):
+            if key in self._by_key:
+                return self._by_key[key]
+        return None
+
+
+@lru_cache(maxsize=None)
+def load_index(path=INDEX_PATH):
+    """Barcode index from a CSV with code, product and medication columns (NDCs allowed as codes)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = csv.DictReader(line for line in f if not line.startswith("#"))
+        return BarcodeIndex([Product(r["code"], r["product"], r["medication"]) for r in rows])
+
+
+# ==============================================
+# Pipeline
+# ==============================================
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="barcode")
+
+
+def scan(data, path=INDEX_PATH):
+    """(codes read, Product or None) for a camera image."""
+    codes = decode_image(data)
+    index = load_index(path)
+    for code in codes:
+        product = index.lookup(code)
+        if product:
+            return codes, product
+    return codes, None
+
+
+def scan_async(data, path=INDEX_PATH):
+    """scan() on a worker thread; returns a Future so the page can keep rendering."""
+    return _executor.submit(scan, data, path)
@@ -0,0 +1,72 @@
+"""Compare the Baby Tracker's old pd.concat-per-measurement path with GrowthLog.
+
+Run from the repository root:  python benchmarks/bench_growth.py [--full]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from growth_log import GROWTH_COLUMNS, GrowthLog  # noqa: E402
+
+# pd.concat copies the whole frame on every save, so above this size (unless
+# --full) it is timed on CONCAT_SAMPLE saves into a half-full frame and scaled up.
+CONCAT_LIMIT = 10_000
+CONCAT_SAMPLE = 1_000
+
+
+def make_measurements(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ages = np.sort(rng.uniform(0, 60, n))
+    return list(zip(ages.tolist(), (3 + ages * 0.25).tolist(), (19 + ages * 0.4).tolist()))
+
+
+def concat_saves(measurements, frame):
+    for age, weight, height in measurements:
+        new_entry = pd.DataFrame({GROWTH_COLUMNS[0]: [age], GROWTH_COLUMNS[1]: [weight], GROWTH_COLUMNS[2]: [height]})
+        frame = pd.concat([frame, new_entry])
+    return frame
+
+
+def time_concat(measurements, full):
+    n = len(measurements)
+    if full or n <= CONCAT_LIMIT:
+        start = time.perf_counter()
+        concat_saves(measurements, pd.DataFrame(columns=GROWTH_COLUMNS))
+        return time.perf_counter() - start, False
+    # Each save costs time proportional to the frame size, so the saves around
+    # the midpoint average out to the mean cost over the whole history
+    half = pd.DataFrame(measurements[:n // 2], columns=GROWTH_COLUMNS)
+    start = time.perf_counter()
+    concat_saves(measurements[n // 2:n // 2 + CONCAT_SAMPLE], half)
+    return (time.perf_counter() - start) * n / CONCAT_SAMPLE, True
+
+
+def time_growth_log(measurements):
+    start = time.perf_counter()
+    log = GrowthLog()
+    for age, weight, height in measurements:
+        log.append(age, weight, height)
+    log.frame()
+    return time.perf_counter() - start
+
+
+def main():
+    full = "--full" in sys.argv
+    print(f"{'records':>10} {'pd.concat (s)':>15} {'GrowthLog (s)':>15} {'speedup':>9}")
+    for n in (10, 1_000, 100_000):
+        measurements = make_measurements(n)
+        concat, extrapolated = time_concat(measurements, full)
+        growth = time_growth_log(measurements)
+        label = f"{concat:.4f}{'*' if extrapolated else ''}"
+        print(f"{n:>10} {label:>15} {growth:>15.4f} {concat / growth:>8.1f}x")
+    if not full:
+        print(f"* estimated from {CONCAT_SAMPLE} saves at half size; --full runs every save")
+
+
+if __name__ == "__main__":
+    main()
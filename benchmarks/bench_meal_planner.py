@@ -0,0 +1,74 @@
+"""Latency and bulk throughput of meal_planner for onboarding-style profiles.
+
+Times single plan_week() calls across regions, stages and condition mixes, then
+plan_many() over a batch of random profiles on a process pool, and reports how
+close the plans land to their goals.
+
+Run from the repository root:
+    python benchmarks/bench_meal_planner.py --profiles 1000 --processes 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from meal_planner import plan_key, plan_many, plan_week  # noqa: E402
+from nutrient_engine import POSITION  # noqa: E402
+
+REGIONS = ["South Asia", "Africa", "Europe", "North America", "Other"]
+STAGES = ["Lactation", "Weaning", "Extended"]
+CONDITIONS = ["Anemia", "Diabetes", "Thyroid", "PCOS", "Hypertension", "Obesity", "Cholesterol"]
+
+
+def random_profiles(n, rng):
+    return [
+        {
+            "region": REGIONS[rng.integers(len(REGIONS))],
+            "bf_stage": STAGES[rng.integers(len(STAGES))],
+            "conditions": list(rng.choice(CONDITIONS, size=rng.integers(0, 3), replace=False)),
+        }
+        for _ in range(n)
+    ]
+
+
+def calorie_fit(plan):
+    goal = plan.goals[POSITION["calories"]]
+    return float((plan.daily["calories"] / goal).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=1000)
+    parser.add_argument("--processes", type=int, default=None, help="default: one per CPU")
+    parser.add_argument("--meals-per-day", type=int, default=4)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    singles = random_profiles(30, rng)
+    plan_week(singles[0], args.meals_per_day)   # load the catalog and goal tables
+    times, fits, incomplete = [], [], 0
+    for profile in singles:
+        start = time.perf_counter()
+        plan = plan_week(profile, args.meals_per_day)
+        times.append(time.perf_counter() - start)
+        fits.append(calorie_fit(plan))
+        incomplete += not plan.complete
+    print(f"single plan:    median {np.median(times) * 1e3:.0f} ms, max {max(times) * 1e3:.0f} ms "
+          f"({7 * args.meals_per_day} slots, {incomplete} cut short by the time cap)")
+    print(f"calorie fit:    {np.mean(fits):.0%} of goal on average")
+
+    profiles = random_profiles(args.profiles, rng)
+    distinct = len({plan_key(p, args.meals_per_day) for p in profiles})
+    start = time.perf_counter()
+    plans = plan_many(profiles, args.meals_per_day, processes=args.processes)
+    elapsed = time.perf_counter() - start
+    print(f"bulk:           {len(plans):,} profiles ({distinct:,} distinct) in {elapsed:.1f} s "
+          f"= {len(plans) / elapsed:,.0f} profiles/s")
+
+
+if __name__ == "__main__":
+    main()
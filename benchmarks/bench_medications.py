@@ -0,0 +1,91 @@
+"""Ingestion and query benchmark for medication_db with tens of thousands of drugs.
+
+Generates a synthetic dataset (one generic, two brands and a synonym per drug),
+then times reading it, compiling the index, and exact and misspelled lookups.
+
+Run from the repository root:  python benchmarks/bench_medications.py [entries]
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from medication_db import MedicationIndex, read_dataset  # noqa: E402
+
+SYLLABLES = ["al", "ben", "cor", "da", "fen", "ga", "hex", "in", "lo", "mab", "nex", "ol",
+             "pra", "quin", "ril", "sar", "tan", "vir", "xa", "zol", "pro", "dine", "mycin", "pam"]
+QUERIES = 2_000
+
+
+def make_names(n, rng, parts=4):
+    names = set()
+    while len(names) < n:
+        picks = rng.integers(0, len(SYLLABLES), (n, parts))
+        names.update("".join(SYLLABLES[i] for i in row).capitalize() for row in picks)
+    return sorted(names)[:n]
+
+
+def write_dataset(path, n, seed=0):
+    rng = np.random.default_rng(seed)
+    names = make_names(4 * n, rng)
+    rng.shuffle(names)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["generic", "brands", "synonyms", "category", "transfer", "effects", "recommendation", "alternatives"])
+        for i in range(n):
+            generic, brand1, brand2, synonym = names[4 * i:4 * i + 4]
+            writer.writerow([generic, f"{brand1}|{brand2}", synonym, f"L{i % 5 + 1}", "Low", "None reported", "Usually safe", ""])
+    return names
+
+
+def misspell(name, rng):
+    i = int(rng.integers(1, len(name) - 1))
+    return name[:i] + name[i + 1:]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    rng = np.random.default_rng(1)
+    path = os.path.join(tempfile.mkdtemp(), "medications.csv")
+    names = write_dataset(path, n)
+
+    start = time.perf_counter()
+    medications = read_dataset(path)
+    read = time.perf_counter() - start
+    start = time.perf_counter()
+    index = MedicationIndex(medications)
+    build = time.perf_counter() - start
+
+    queries = [names[i] for i in rng.integers(0, len(names), QUERIES)]
+    start = time.perf_counter()
+    exact_hits = sum(index.lookup(q) is not None for q in queries)
+    exact = (time.perf_counter() - start) / QUERIES
+    typos = [misspell(q, rng) for q in queries]
+    start = time.perf_counter()
+    results = [index.suggest(q) for q in typos]
+    fuzzy = (time.perf_counter() - start) / QUERIES
+    start = time.perf_counter()
+    for q in typos:
+        index.suggest(q)
+    repeat = (time.perf_counter() - start) / QUERIES
+    # A typo counts as resolved when the drug the name belongs to is the first suggestion
+    correct = sum(
+        bool(r) and q in (r[0].medication.generic, *r[0].medication.brands, *r[0].medication.synonyms)
+        for q, r in zip(queries, results)
+    )
+
+    print(f"entries:        {n:,} medications, {len(index._owners):,} names")
+    print(f"read dataset:   {read:.2f} s")
+    print(f"compile index:  {build:.2f} s ({index._fuzzy.nbytes / 1e6:.1f} MB trigram index)")
+    print(f"exact lookup:   {exact * 1e6:.1f} us ({exact_hits}/{QUERIES} found)")
+    print(f"typo suggest:   {fuzzy * 1e6:.1f} us ({correct}/{QUERIES} suggest the right drug first)")
+    print(f"repeated typo:  {repeat * 1e6:.1f} us (memoized)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare predict_nutrition (one row per call) with predict_nutrition_batch.
+
+Run from the repository root:  python benchmarks/bench_predict.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from nutrition_model import predict_nutrition, predict_nutrition_batch  # noqa: E402
+
+# The single-row path takes roughly a millisecond per call, so above this size
+# it is timed on a sample and extrapolated.
+SINGLE_ROW_SAMPLE = 2_000
+
+
+def make_profiles(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'age': rng.integers(18, 46, n),
+        'region': rng.choice(['South Asia', 'Africa', 'Europe'], n),
+        'stage': rng.choice(['Lactation', 'Weaning', 'Extended'], n),
+        'health': rng.choice(['Anemia', 'Diabetes', 'None', 'Thyroid'], n),
+    })
+
+
+def time_single(profiles):
+    sample = profiles.head(SINGLE_ROW_SAMPLE)
+    rows = list(sample.itertuples(index=False))
+    start = time.perf_counter()
+    for row in rows:
+        predict_nutrition(row.age, row.region, row.stage, row.health)
+    elapsed = time.perf_counter() - start
+    return elapsed * len(profiles) / len(rows), len(rows) < len(profiles)
+
+
+def time_batch(profiles):
+    start = time.perf_counter()
+    predict_nutrition_batch(profiles)
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{'profiles':>10} {'single-row (s)':>16} {'batch (s)':>12} {'speedup':>9}")
+    for n in (1, 1_000, 1_000_000):
+        profiles = make_profiles(n)
+        single, extrapolated = time_single(profiles)
+        batch = time_batch(profiles)
+        label = f"{single:.4f}{'*' if extrapolated else ''}"
+        print(f"{n:>10} {label:>16} {batch:>12.4f} {single / batch:>8.1f}x")
+    print(f"* extrapolated from {SINGLE_ROW_SAMPLE} single-row calls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Load test for storage.SQLiteRepository: many concurrent users writing at once.
+
+Each simulated user saves a profile, logs a day of meals (single and bulk, plus
+one from a second tab that must not overwrite the first), deletes one, records growth, a milestone and vaccines, then reads everything
+back and checks it. Users run on a thread pool inside each worker process, like
+Streamlit sessions; several processes share the same database file.
+
+Run from the repository root:
+    python benchmarks/load_test_storage.py --users 2000 --threads 64 --processes 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from meal_log import MealLog  # noqa: E402
+from storage import SQLiteRepository, StorageError  # noqa: E402
+
+MEALS_PER_USER = 12
+
+
+def simulate_user(repo, user_id):
+    """One user's session; returns (writes issued, problems found)."""
+    writes = 0
+    repo.save_profile(user_id, {"name": user_id, "age": "26-35", "region": "Europe"})
+    writes += 1
+
+    log = MealLog()
+    today = date.today()
+    saved = []
+    for i in range(MEALS_PER_USER // 2):
+        meal_id = log.append(f"meal {i}", f"{8 + i}:00", "Medium (150-200g)", day=today,
+                             vitamin_d=1.0, calcium=2.0, protein=3.0, calories=100.0, iron=0.5)
+        saved.append(([meal_id], repo.add_meals(user_id, log.rows([meal_id]))))
+        writes += 1
+    # A second tab starts from its own empty log, so its first meal has the same log id
+    other_tab = MealLog()
+    meal_id = other_tab.append("other tab", "21:00", "Medium (150-200g)", day=today, calories=50.0)
+    repo.add_meals(user_id, other_tab.rows([meal_id]))
+    writes += 1
+    bulk = pd.DataFrame({
+        "name": [f"bulk {i}" for i in range(MEALS_PER_USER // 2)],
+        "time": "18:00",
+        "portion": "Small (100-150g)",
+        "vitamin_d": 1.0, "calcium": 2.0, "protein": 3.0, "calories": 100.0, "iron": 0.5,
+    })
+    ids = log.extend(bulk, day=today)
+    saved.append((ids, repo.add_meals(user_id, log.rows(ids))))
+    writes += len(ids)
+    for meal_ids, future in saved:
+        log.set_stored_ids(meal_ids, future.result())
+    repo.delete_meal(user_id, log.stored_id(0))
+    log.delete(0)
+    repo.add_growth(user_id, 3, 5.5, 23.0)
+    repo.add_milestone(user_id, "First smile", today.isoformat(), age="2M")
+    repo.set_vaccine(user_id, "vax_Birth_Hepatitis B (1st dose)", True)
+    writes += 4
+
+    problems = []
+    if repo.load_profile(user_id)["name"] != user_id:
+        problems.append("profile")
+    stored = repo.load_meals(user_id)
+    expected = log.totals_vector() + other_tab.totals_vector()
+    if len(stored) != len(log) + len(other_tab) or (stored.totals_vector() != expected).any():
+        problems.append("meals")
+    if len(repo.load_growth(user_id)) != 1 or len(repo.load_milestones(user_id)) != 1:
+        problems.append("baby tracker")
+    if not all(repo.load_vaccines(user_id).values()):
+        problems.append("vaccines")
+    return writes, problems
+
+
+def run_worker(path, first_user, users, threads):
+    repo = SQLiteRepository(path)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda n: simulate_user(repo, f"user-{n}"), range(first_user, first_user + users)))
+    try:
+        repo.flush()
+    except StorageError as e:
+        results.append((0, [str(e)]))
+    elapsed = time.perf_counter() - start
+    writes = sum(w for w, _ in results)
+    failed = sum(1 for _, problems in results if problems)
+    return writes, failed, elapsed, repo.transactions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=64, help="concurrent sessions per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--db", help="database file (default: a temporary file)")
+    args = parser.parse_args()
+
+    path = args.db or os.path.join(tempfile.mkdtemp(), "load_test.sqlite")
+    SQLiteRepository(path).close()  # create the schema before the workers race for it
+    per_process = -(-args.users // args.processes)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.processes) as pool:
+        futures = [
+            pool.submit(run_worker, path, p * per_process, min(per_process, args.users - p * per_process), args.threads)
+            for p in range(args.processes)
+        ]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+
+    writes = sum(r[0] for r in results)
+    failed = sum(r[1] for r in results)
+    transactions = sum(r[3] for r in results)
+    print(f"users:         {args.users} ({args.processes} processes x {args.threads} threads)")
+    print(f"statements:    {writes} in {transactions} transactions")
+    print(f"elapsed:       {elapsed:.2f} s")
+    print(f"throughput:    {writes / elapsed:,.0f} writes/s, {args.users / elapsed:,.0f} user sessions/s")
+    print(f"verification:  {'ok' if not failed else f'{failed} users with missing or wrong data'}")
+    print(f"database:      {path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
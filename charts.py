@@ -0,0 +1,60 @@
+# charts.py
+# Chart helpers shared by the tracker pages.
+#
+# Long series are thinned with Largest-Triangle-Three-Buckets (LTTB) before they
+# reach Altair, which keeps the visual shape (peaks and dips survive) while the
+# point count stays under a fixed budget. Finished Vega-Lite specs are memoized
+# per chart against a data key, so an unchanged chart costs a dict lookup on
+# rerun instead of a rebuild and a re-serialization of its data.
+import numpy as np
+
+POINT_BUDGET = 250
+
+
+def lttb(x, y, threshold=POINT_BUDGET):
+    """Indices of at most `threshold` points of (x, y) chosen by LTTB; x must be sorted."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # First and last points are always kept; the rest is split into equal buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(threshold - 2):
+        start, end = edges[b], edges[b + 1]
+        next_end = edges[b + 2] if b + 2 < len(edges) else n
+        # Average of the next bucket is the third triangle corner
+        cx = x[end:next_end].mean() if next_end > end else x[-1]
+        cy = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs((x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+
+def downsample(frame, x, y, budget=POINT_BUDGET):
+    """Rows of `frame` kept by LTTB on columns x/y; frames within budget come back as is."""
+    if len(frame) <= budget:
+        return frame
+    xs = frame[x].to_numpy()
+    if xs.dtype.kind == "M":
+        xs = xs.astype("datetime64[ns]").astype(np.int64)
+    return frame.iloc[lttb(xs, frame[y].fillna(0).to_numpy(), budget)]
+
+
+def cached_spec(store, name, key, build):
+    """Vega-Lite dict for chart `name`, rebuilt only when `key` changes.
+
+    `store` is a per-session dict (e.g. in st.session_state) holding the latest
+    (key, spec) for each chart; `build` returns an Altair chart.
+    """
+    cached = store.get(name)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    spec = build().to_dict()
+    store[name] = (key, spec)
+    return spec
@@ -0,0 +1,63 @@
+# food_resolver.py
+# Turns what the user typed ("dal", "chiken brest") into food names the nutrient
+# sources know, using a trigram index over the FoodData Central description list.
+import nutrient_db
+from fuzzy_index import TrigramIndex, normalize
+from nutrition_helpers import get_meal_ideas
+
+# Regional dishes (see nutrition_helpers.get_meal_ideas) and the wording FDC uses for them
+SYNONYMS = {
+    "dal": "lentils cooked",
+    "daal": "lentils cooked",
+    "dhal": "lentils cooked",
+    "chapati": "bread chapati or roti",
+    "chapatti": "bread chapati or roti",
+    "roti": "bread chapati or roti",
+    "paneer": "cheese paneer",
+    "plantain": "plantains cooked",
+    "plantains": "plantains cooked",
+    "maize porridge": "cornmeal porridge",
+    "ugali": "cornmeal porridge",
+    "stewed greens": "collards cooked",
+    "chickpea": "chickpeas garbanzo beans",
+    "chickpeas": "chickpeas garbanzo beans",
+    "hummus": "hummus commercial",
+    "curd": "yogurt plain whole milk",
+    "dahi": "yogurt plain whole milk",
+    "ghee": "butter oil anhydrous",
+}
+
+# Without a local FDC import the resolver still knows the dishes the app suggests
+FALLBACK_REGIONS = ["South Asia", "Africa", "Europe", "North America", "Other"]
+
+
+def expand_synonyms(query):
+    norm = normalize(query)
+    if norm in SYNONYMS:
+        return SYNONYMS[norm]
+    return " ".join(SYNONYMS.get(word, word) for word in norm.split())
+
+
+class FoodResolver:
+    def __init__(self, names):
+        self.index = TrigramIndex(names)
+
+    def candidates(self, query, limit=5):
+        """Ranked Match(name, score, id) candidates for a typed food name."""
+        if not normalize(query):
+            return []
+        return self.index.search(expand_synonyms(query), limit=limit)
+
+    def resolve(self, query, min_score=0.6):
+        """The single best name if it is a confident match, else None."""
+        matches = self.candidates(query, limit=1)
+        if matches and matches[0].score >= min_score:
+            return matches[0].name
+        return None
+
+
+def load_resolver(db_path=nutrient_db.DB_PATH):
+    names = nutrient_db.food_names(db_path)
+    if not names:
+        names = sorted({meal for region in FALLBACK_REGIONS for meal in get_meal_ideas(region)})
+    return FoodResolver(names)
@@ -0,0 +1,111 @@
+# fuzzy_index.py
+# Typo-tolerant name search over large name lists (food descriptions, drug names).
+#
+# Names are normalized to [a-z0-9 ], so every character trigram packs into an
+# integer below 37**3. The index is a compressed posting list (CSR): int32 name
+# ids grouped by trigram, plus a dense offsets array addressed directly by the
+# trigram code. It is built with vectorized NumPy passes over chunks of names, so
+# memory stays around 4 bytes per distinct (name, trigram) pair. A query counts
+# shared trigrams for every candidate name and ranks them by Dice similarity.
+import re
+from collections import namedtuple
+
+import numpy as np
+
+Match = namedtuple("Match", ["name", "score", "id"])
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_CHUNK = 50_000
+
+# Byte -> symbol code: space is 0, a-z are 1-26, 0-9 are 27-36
+_SYMBOLS = np.zeros(256, dtype=np.int32)
+_SYMBOLS[np.frombuffer(b"abcdefghijklmnopqrstuvwxyz0123456789", dtype=np.uint8)] = np.arange(1, 37)
+_BASE = 37
+VOCABULARY_SIZE = _BASE ** 3
+
+
+def normalize(text):
+    """Lowercase and collapse punctuation/whitespace so lookups ignore formatting.
+
+    The one normalizer for names and lookup keys (foods, medications, USDA cache).
+    """
+    return _NON_WORD.sub(" ", str(text).lower()).strip()
+
+
+def _trigram_pairs(texts):
+    """(trigram codes, text positions) for a chunk of texts, deduplicated and sorted by trigram."""
+    # normalize() leaves only ASCII, so each character is one byte
+    padded = [f"  {normalize(t)} " for t in texts]
+    lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+    symbols = _SYMBOLS[np.frombuffer("".join(padded).encode("ascii"), dtype=np.uint8)]
+    grams = (symbols[:-2] * _BASE + symbols[1:-1]) * _BASE + symbols[2:]
+
+    owner = np.repeat(np.arange(len(padded), dtype=np.int64), lengths)[:-2]
+    ends = np.cumsum(lengths)
+    # Drop trigrams that would straddle two texts
+    inside = np.arange(len(grams)) <= ends[owner] - 3
+    keys = np.sort(grams[inside].astype(np.int64) * len(padded) + owner[inside])
+    keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+    return (keys // len(padded)).astype(np.int32), (keys % len(padded)).astype(np.int32)
+
+
+def trigrams(text):
+    """Distinct trigram codes of the normalized text, with word-boundary padding."""
+    return _trigram_pairs([text])[0]
+
+
+class TrigramIndex:
+    def __init__(self, names):
+        self.names = list(names)
+        chunks = []
+        counts = np.zeros(VOCABULARY_SIZE, dtype=np.int64)
+        for start in range(0, len(self.names), _CHUNK):
+            grams, ids = _trigram_pairs(self.names[start:start + _CHUNK])
+            chunks.append((start, grams, ids))
+            counts += np.bincount(grams, minlength=VOCABULARY_SIZE)
+
+        self._offsets = np.zeros(VOCABULARY_SIZE + 1, dtype=np.int64)
+        np.cumsum(counts, out=self._offsets[1:])
+        self._postings = np.empty(self._offsets[-1], dtype=np.int32)
+        self._sizes = np.zeros(len(self.names), dtype=np.int32)
+
+        # Counting-sort each chunk into place; chunks arrive in id order, so every
+        # trigram's postings end up sorted by name id
+        cursor = self._offsets[:-1].copy()
+        while chunks:
+            start, grams, ids = chunks.pop(0)
+            chunk_counts = np.bincount(grams, minlength=VOCABULARY_SIZE)
+            first = np.cumsum(chunk_counts) - chunk_counts
+            self._postings[cursor[grams] + np.arange(len(grams)) - first[grams]] = ids + start
+            cursor += chunk_counts
+            sizes = np.bincount(ids)
+            self._sizes[start:start + len(sizes)] = sizes
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self):
+        """Memory held by the index arrays (excluding the name strings themselves)."""
+        return self._postings.nbytes + self._offsets.nbytes + self._sizes.nbytes
+
+    def search(self, query, limit=5, min_score=0.2):
+        """Best `limit` names for `query`, as Match(name, score, id), best first."""
+        if not self.names or not normalize(query):
+            return []
+        grams = trigrams(query)
+        hits = np.concatenate([self._postings[self._offsets[g]:self._offsets[g + 1]] for g in grams])
+        if not len(hits):
+            return []
+        shared = np.bincount(hits, minlength=len(self.names))
+        candidates = np.flatnonzero(shared)
+        scores = 2.0 * shared[candidates] / (len(grams) + self._sizes[candidates])
+
+        keep = scores >= min_score
+        candidates, scores = candidates[keep], scores[keep]
+        if len(candidates) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            candidates, scores = candidates[top], scores[top]
+        # Best score first; ties go to the shorter (more generic) name
+        order = sorted(range(len(candidates)), key=lambda i: (-scores[i], len(self.names[candidates[i]])))
+        return [Match(self.names[candidates[i]], float(scores[i]), int(candidates[i])) for i in order]
@@ -0,0 +1,68 @@
+# growth_log.py
+# Growth measurements for the Baby Tracker, kept sorted by age.
+#
+# Measurements live in preallocated float64 columns that double in capacity when
+# full. A new measurement is placed by binary search on age; measurements almost
+# always arrive in age order, so that is the end of the arrays and an append is
+# amortized O(1). Charts read frame(), a read-only DataFrame over the live part of
+# the arrays that is rebuilt only after a change.
+from itertools import count
+
+import numpy as np
+import pandas as pd
+
+AGE, WEIGHT, HEIGHT = "Age (months)", "Weight (kg)", "Height (inches)"
+GROWTH_COLUMNS = [AGE, WEIGHT, HEIGHT]
+
+# Process-wide, so a version also tells two logs apart (used as a cache key)
+_versions = count(1)
+
+
+class GrowthLog:
+    __slots__ = ("_size", "_columns", "_frame", "version")
+
+    def __init__(self, capacity=16):
+        self._size = 0
+        self._columns = np.zeros((len(GROWTH_COLUMNS), capacity), dtype=np.float64)
+        self._frame = None
+        self.version = next(_versions)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from (age_months, weight_kg, height_in) tuples in any order."""
+        log = cls(capacity=max(16, len(records)))
+        if records:
+            values = np.array(records, dtype=np.float64).reshape(len(records), len(GROWTH_COLUMNS))
+            # Stable, so measurements at the same age keep their entry order
+            values = values[np.argsort(values[:, 0], kind="stable")]
+            log._columns[:, :len(values)] = values.T
+            log._size = len(values)
+            log.version = next(_versions)
+        return log
+
+    def append(self, age_months, weight_kg, height_in):
+        """Insert one measurement after any others at the same age; returns its position."""
+        if self._size == self._columns.shape[1]:
+            grown = np.zeros((len(GROWTH_COLUMNS), self._size * 2), dtype=np.float64)
+            grown[:, :self._size] = self._columns[:, :self._size]
+            self._columns = grown
+        ages = self._columns[0, :self._size]
+        i = self._size if not self._size or age_months >= ages[-1] else int(np.searchsorted(ages, age_months, "right"))
+        if i < self._size:
+            self._columns[:, i + 1:self._size + 1] = self._columns[:, i:self._size]
+        self._columns[:, i] = (age_months, weight_kg, height_in)
+        self._size += 1
+        self._frame = None
+        self.version = next(_versions)
+        return i
+
+    def __len__(self):
+        return self._size
+
+    def frame(self):
+        """Read-only DataFrame view of the measurements, sorted by age."""
+        if self._frame is None:
+            view = self._columns[:, :self._size]
+            view.flags.writeable = False
+            self._frame = pd.DataFrame(dict(zip(GROWTH_COLUMNS, view)), copy=False)
+        return self._frame
@@ -0,0 +1,128 @@
+# growth_standards.py
+# WHO Child Growth Standards z-scores and percentiles for Baby Tracker measurements.
+#
+# The LMS tables in data/who_lms.csv are loaded once into a NumPy array indexed
+# by (indicator, sex, month, L/M/S). Scoring looks up both neighbouring months for
+# every measurement at once and interpolates L, M and S linearly, so a whole
+# series -- or a cohort export with a sex per row -- is one vectorized pass.
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from growth_log import AGE, HEIGHT, WEIGHT
+
+LMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "who_lms.csv")
+
+INDICATORS = ("weight", "length")
+SEXES = ("boys", "girls")
+SEX_ALIASES = {"boy": "boys", "male": "boys", "m": "boys", "girl": "girls", "female": "girls", "f": "girls"}
+MAX_MONTH = 60
+CM_PER_INCH = 2.54
+
+# WHO restricts weight z-scores beyond +/-3 SD to the spacing between the 2 and
+# 3 SD lines, since the skewed distribution stretches that tail.
+_RESTRICTED_TAILS = {"weight": True, "length": False}
+
+
+@lru_cache(maxsize=None)
+def load_lms(path=LMS_PATH):
+    """LMS parameters as an array of shape (indicator, sex, month 0..60, [L, M, S])."""
+    df = pd.read_csv(path, comment="#")
+    table = np.full((len(INDICATORS), len(SEXES), MAX_MONTH + 1, 3), np.nan)
+    i = df["indicator"].map(INDICATORS.index).to_numpy()
+    s = df["sex"].map(SEXES.index).to_numpy()
+    table[i, s, df["month"].to_numpy()] = df[["L", "M", "S"]].to_numpy()
+    table.flags.writeable = False
+    return table
+
+
+def sex_codes(sex, n):
+    """Index into SEXES for a scalar sex or one sex per measurement."""
+    if np.ndim(sex) == 0:
+        return np.full(n, _sex_code(sex), dtype=np.intp)
+    # Normalize each distinct label once, then map the whole column
+    codes, labels = pd.factorize(np.asarray(sex, dtype=object))
+    return np.array([_sex_code(label) for label in labels], dtype=np.intp)[codes]
+
+
+def _sex_code(label):
+    key = str(label).strip().lower()
+    key = SEX_ALIASES.get(key, key)
+    if key not in SEXES:
+        raise ValueError(f"Unknown sex {label!r}; expected one of {SEXES}")
+    return SEXES.index(key)
+
+
+def lms_at(indicator, sex, age_months):
+    """(L, M, S) arrays interpolated between completed months; NaN outside 0-60 months."""
+    age = np.asarray(age_months, dtype=np.float64)
+    table = load_lms()[INDICATORS.index(indicator)]
+    codes = sex_codes(sex, age.size).reshape(age.shape)
+    inside = (age >= 0) & (age <= MAX_MONTH)
+    clipped = np.where(inside, age, 0.0)
+    lower = np.minimum(np.floor(clipped).astype(np.intp), MAX_MONTH - 1)
+    weight = (clipped - lower)[..., None]
+    lms = table[codes, lower] * (1 - weight) + table[codes, lower + 1] * weight
+    lms[~inside] = np.nan
+    return lms[..., 0], lms[..., 1], lms[..., 2]
+
+
+def _value_at(L, M, S, z):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(L == 0, M * np.exp(S * z), M * (1 + L * S * z) ** (1 / L))
+
+
+def z_scores(indicator, sex, age_months, values):
+    """WHO z-scores for `values` (kg for weight, cm for length) at `age_months`."""
+    L, M, S = lms_at(indicator, sex, age_months)
+    x = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(L == 0, np.log(x / M) / S, ((x / M) ** L - 1) / (L * S))
+        if _RESTRICTED_TAILS[indicator]:
+            sd3, sd2 = _value_at(L, M, S, 3.0), _value_at(L, M, S, 2.0)
+            sd3neg, sd2neg = _value_at(L, M, S, -3.0), _value_at(L, M, S, -2.0)
+            z = np.where(z > 3, 3 + (x - sd3) / (sd3 - sd2), z)
+            z = np.where(z < -3, -3 + (x - sd3neg) / (sd2neg - sd3neg), z)
+    # Missing measurements (entered as 0) have no score
+    return np.where(x > 0, z, np.nan)
+
+
+def percentiles(z):
+    return ndtr(np.asarray(z, dtype=np.float64)) * 100
+
+
+def score_growth(measurements, sex):
+    """Add z-score and percentile columns to a GrowthLog frame or cohort export.
+
+    `measurements` has the Baby Tracker columns (age in months, weight in kg,
+    height in inches); `sex` is one value or a column/array with one per row.
+    """
+    age = measurements[AGE].to_numpy(dtype=np.float64)
+    if isinstance(sex, str) and sex in measurements:
+        sex = measurements[sex].to_numpy()
+    weight_z = z_scores("weight", sex, age, measurements[WEIGHT].to_numpy(dtype=np.float64))
+    length_z = z_scores("length", sex, age, measurements[HEIGHT].to_numpy(dtype=np.float64) * CM_PER_INCH)
+    scored = measurements.copy()
+    scored["Weight z"] = weight_z
+    scored["Weight percentile"] = percentiles(weight_z)
+    scored["Height z"] = length_z
+    scored["Height percentile"] = percentiles(length_z)
+    return scored
+
+
+def percentile_bands(indicator, sex, centiles=(3, 15, 50, 85, 97), months=None, inches=False):
+    """Long-format curves for charting: one row per (month, percentile) with its value."""
+    months = np.arange(MAX_MONTH + 1, dtype=np.float64) if months is None else np.asarray(months, dtype=np.float64)
+    L, M, S = lms_at(indicator, sex, months)
+    z = ndtri(np.asarray(centiles, dtype=np.float64) / 100)
+    values = _value_at(L[None, :], M[None, :], S[None, :], z[:, None])
+    if inches:
+        values = values / CM_PER_INCH
+    return pd.DataFrame({
+        "month": np.tile(months, len(centiles)),
+        "percentile": np.repeat([f"P{c}" for c in centiles], len(months)),
+        "value": values.ravel(),
+    })
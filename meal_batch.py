@@ -0,0 +1,122 @@
+# meal_batch.py
+# Bulk meal logging for the Mother Tracker: parse a pasted list or CSV of foods,
+# resolve every distinct food concurrently, and score the whole batch at once.
+import io
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from nutrient_engine import NUTRIENT_KEYS, to_matrix
+from portions import DEFAULT_SIZE, SIZES, portion_grams, scale
+
+DEFAULT_PORTION = DEFAULT_SIZE
+
+# Accepted meal times; anything outside 00:00-23:59 fails to parse
+TIME_FORMATS = ("%H:%M", "%I:%M %p", "%I:%M%p", "%I %p", "%I%p")
+# What a time column looks like, valid or not ("08:00", "25:99", "8am", "8:30 p.m.")
+_TIME = re.compile(r"^\d{1,2}(?::\d{2}|(?::\d{2})?\s*[ap]\.?\s*m\.?)$", re.IGNORECASE)
+
+
+def parse_time(text):
+    """"08:00", "8:00 AM" or "8am" -> "08:00"; None if it isn't a time of day."""
+    if not _TIME.match(str(text).strip()):
+        return None
+    text = re.sub(r"\s+", " ", str(text).strip().upper().replace(".", ""))
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%H:%M")
+        except ValueError:
+            continue
+    return None
+
+
+def parse_meal_text(text, default_time):
+    """One meal per line: "food", "HH:MM, food" or "HH:MM, food, portion".
+
+    Returns (meals, skipped): a DataFrame of name, time ("HH:MM") and portion,
+    and a description of each line left out for an invalid time.
+    """
+    rows, skipped = [], []
+    for number, line in enumerate(text.splitlines(), 1):
+        parts = [p.strip() for p in line.split(",")]
+        if not parts or not parts[0]:
+            continue
+        time = default_time
+        if _TIME.match(parts[0]):
+            time, parts = parse_time(parts[0]), parts[1:]
+            if time is None:
+                skipped.append(f"line {number}: invalid time {line.split(',')[0].strip()!r}")
+                continue
+        if not parts or not parts[0]:
+            continue
+        portion = parts[1] if len(parts) > 1 and parts[1] else DEFAULT_PORTION
+        rows.append({"name": parts[0], "time": time, "portion": portion})
+    return pd.DataFrame(rows, columns=["name", "time", "portion"]), skipped
+
+
+def parse_meal_csv(data, default_time):
+    """CSV with a `food` (or `name`) column and optional `time` and `portion` columns.
+
+    Returns (meals, skipped) like parse_meal_text, with skipped rows numbered by
+    their line in the file.
+    """
+    df = pd.read_csv(io.BytesIO(data) if isinstance(data, bytes) else data, dtype=str)
+    df.columns = [c.strip().lower() for c in df.columns]
+    df = df.rename(columns={"food": "name"})
+    if "name" not in df:
+        raise ValueError("CSV needs a 'food' column")
+    if "time" not in df:
+        df["time"] = default_time
+    if "portion" not in df:
+        df["portion"] = DEFAULT_PORTION
+    df = df[["name", "time", "portion"]].dropna(subset=["name"])
+    df["name"] = df["name"].str.strip()
+    df = df[df["name"] != ""]
+    raw = df["time"].fillna(default_time)
+    df["time"] = raw.map(parse_time)
+    df["portion"] = df["portion"].fillna(DEFAULT_PORTION)
+    invalid = df["time"].isna()
+    skipped = [f"row {row + 2}: invalid time {time!r}" for row, time in raw[invalid].items()]
+    return df[~invalid].reset_index(drop=True), skipped
+
+
+def resolve_nutrients(names, lookup, max_workers=8):
+    """{name: nutrients} for each distinct name, looked up on a bounded thread pool."""
+    unique = list(dict.fromkeys(names))
+    if not unique:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique))) as pool:
+        return dict(zip(unique, pool.map(lookup, unique)))
+
+
+def score_meals(meals, lookup, max_workers=8, portions=None):
+    """Resolve and score a DataFrame of meals (name, time, portion).
+
+    `portions(name)` gives a food's household measures for entries like "2 cups";
+    unreadable portions count as DEFAULT_PORTION. Returns (found, missing, skipped):
+    `found` has one row per meal with every nutrient in NUTRIENT_KEYS scaled
+    to the portion's grams; `missing` lists names with no data; `skipped`
+    describes meals left out because their portion weighs nothing ("0 cups").
+    """
+    resolved = resolve_nutrients(meals["name"], lookup, max_workers)
+    names = list(resolved)
+    per_100g = to_matrix([resolved[n] for n in names])
+
+    codes = pd.Categorical(meals["name"], categories=names).codes
+    measures = {n: portions(n) if portions and resolved[n] else () for n in names}
+    grams = np.array([portion_grams(p, measures[n]) for n, p in zip(meals["name"], meals["portion"])], dtype=np.float64)
+    grams[np.isnan(grams)] = SIZES[DEFAULT_PORTION]
+    found_mask = np.array([bool(resolved[n]) for n in names], dtype=bool)[codes]
+    empty = grams <= 0
+    skipped = [
+        f"{n} ({p}): zero portion" for n, p in zip(meals["name"].to_numpy()[empty], meals["portion"].to_numpy()[empty])
+    ]
+
+    values = scale(per_100g[codes], grams)
+    found = pd.concat([meals.reset_index(drop=True), pd.DataFrame(values, columns=list(NUTRIENT_KEYS))], axis=1)
+    found["calories"] = found["calories"].round()
+    missing = sorted(set(meals["name"].to_numpy()[~found_mask]))
+    return found[found_mask & ~empty].reset_index(drop=True), missing, skipped
@@ -0,0 +1,249 @@
+# meal_log.py
+# Columnar, append-only meal log for the Mother Tracker.
+#
+# Meals are rows in preallocated NumPy columns that double in capacity when full,
+# so appends are amortized O(1). Deleting a meal only clears its `alive` flag
+# (tombstone). Rendering asks for one page at a time and only those rows are
+# turned into dicts.
+#
+# Each meal's nutrients are one vector in nutrient_engine's fixed order, so the
+# log covers every tracked nutrient, not just the four shown on the meal cards.
+# Alongside the rows the log keeps a daily rollup: per-day nutrient sums updated
+# in O(1) on every append and delete, so daily totals and 7/30/365-day charts
+# cost one lookup per day no matter how many meals have been logged.
+#
+# A meal's id is its position in this log. Storage assigns its own ids when the
+# meal is saved; set_stored_ids() records them and stored_id() maps back, so a
+# log loaded from storage and one built up in a session both delete the right row.
+from datetime import date
+from itertools import count
+
+import numpy as np
+import pandas as pd
+
+from nutrient_engine import NUTRIENT_KEYS, POSITION
+
+NUTRIENT_COLUMNS = NUTRIENT_KEYS
+
+# Process-wide, so a version also tells two logs apart (used as a cache key)
+_versions = count(1)
+
+
+def _minutes(hhmm):
+    hours, minutes = str(hhmm).split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def _grow(column, capacity, size):
+    grown = np.zeros((capacity,) + column.shape[1:], dtype=column.dtype)
+    grown[:size] = column[:size]
+    return grown
+
+
+class MealLog:
+    __slots__ = (
+        "_size", "_day", "_minute", "_values", "_alive", "_stored", "_names", "_portions",
+        "_daily", "_daily_count", "version",
+    )
+
+    def __init__(self, capacity=64):
+        self._size = 0
+        self._day = np.zeros(capacity, dtype=np.int32)       # date.toordinal()
+        self._minute = np.zeros(capacity, dtype=np.int16)    # minutes after midnight
+        self._values = np.zeros((capacity, len(NUTRIENT_COLUMNS)), dtype=np.float64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._stored = np.full(capacity, -1, dtype=np.int64)  # storage id, -1 until saved
+        self._names = []
+        self._portions = []
+        self._daily = {}          # day ordinal -> sums over NUTRIENT_COLUMNS
+        self._daily_count = {}    # day ordinal -> live meals that day
+        self.version = next(_versions)
+
+    def _roll(self, day, values, meals):
+        """Add `meals` meals, whose values sum to `values`, to `day`'s rollup (negative to remove)."""
+        remaining = self._daily_count.get(day, 0) + meals
+        if remaining <= 0:
+            # Drop the day instead of keeping float residue from the subtractions
+            self._daily.pop(day, None)
+            self._daily_count.pop(day, None)
+            return
+        self._daily_count[day] = remaining
+        if day in self._daily:
+            self._daily[day] += values
+        else:
+            self._daily[day] = np.array(values, dtype=np.float64)
+
+    def _roll_rows(self, rows):
+        """Add the meals at index/mask `rows` to the rollup, one update per distinct day."""
+        days, inverse = np.unique(self._day[rows], return_inverse=True)
+        sums = np.zeros((len(days), len(NUTRIENT_COLUMNS)))
+        np.add.at(sums, inverse, self._values[rows])
+        counts = np.bincount(inverse, minlength=len(days))
+        for day, values, meals in zip(days.tolist(), sums, counts.tolist()):
+            self._roll(day, values, meals)
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._alive)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self._day = _grow(self._day, capacity, self._size)
+        self._minute = _grow(self._minute, capacity, self._size)
+        self._alive = _grow(self._alive, capacity, self._size)
+        self._values = _grow(self._values, capacity, self._size)
+        stored = np.full(capacity, -1, dtype=np.int64)
+        stored[:self._size] = self._stored[:self._size]
+        self._stored = stored
+
+    def append(self, name, time, portion, nutrients=None, day=None, **amounts):
+        """Log one meal; `time` is "HH:MM". Returns the meal id.
+
+        `nutrients` is a vector in NUTRIENT_COLUMNS order; single nutrients can
+        also be given by keyword (calories=520) and override the vector.
+        """
+        self._reserve(1)
+        i = self._size
+        self._day[i] = (day or date.today()).toordinal()
+        self._minute[i] = _minutes(time)
+        self._values[i] = 0.0 if nutrients is None else nutrients
+        for key, amount in amounts.items():
+            self._values[i, POSITION[key]] = amount
+        self._alive[i] = True
+        self._stored[i] = -1
+        self._names.append(name)
+        self._portions.append(portion)
+        self._size += 1
+        self._roll(int(self._day[i]), self._values[i], 1)
+        self.version = next(_versions)
+        return i
+
+    def extend(self, meals, day=None):
+        """Log a DataFrame of meals (name, time, portion and any NUTRIENT_COLUMNS) in one step."""
+        n = len(meals)
+        self._reserve(n)
+        rows = slice(self._size, self._size + n)
+        self._day[rows] = (day or date.today()).toordinal()
+        self._minute[rows] = [_minutes(t) for t in meals["time"]]
+        self._values[rows] = meals.reindex(columns=list(NUTRIENT_COLUMNS), fill_value=0).to_numpy(dtype=np.float64)
+        self._alive[rows] = True
+        self._stored[rows] = -1
+        self._names.extend(meals["name"])
+        self._portions.extend(meals["portion"])
+        self._size += n
+        if n:
+            self._roll_rows(rows)
+            self.version = next(_versions)
+        return list(range(rows.start, rows.stop))
+
+    def delete(self, meal_id):
+        if 0 <= meal_id < self._size and self._alive[meal_id]:
+            self._alive[meal_id] = False
+            self._roll(int(self._day[meal_id]), -self._values[meal_id], -1)
+            self.version = next(_versions)
+
+    def ids_on(self, day):
+        """Ids of the live meals logged on date `day`."""
+        return np.flatnonzero(self._live() & (self._day[:self._size] == day.toordinal())).tolist()
+
+    def set_stored_ids(self, ids, stored):
+        """Record the storage ids `stored` for the meals `ids` once they are saved."""
+        self._stored[list(ids)] = list(stored)
+
+    def stored_id(self, meal_id):
+        """The storage id of a meal, or None if it was never saved."""
+        stored = int(self._stored[meal_id])
+        return None if stored < 0 else stored
+
+    def clear(self):
+        self._size = 0
+        self._alive[:] = False
+        self._stored[:] = -1
+        self._names = []
+        self._portions = []
+        self._daily = {}
+        self._daily_count = {}
+        self.version = next(_versions)
+
+    def __len__(self):
+        return int(np.count_nonzero(self._alive[:self._size]))
+
+    def _live(self):
+        return self._alive[:self._size]
+
+    def totals_vector(self, day=None):
+        """Nutrient sums over live meals in NUTRIENT_COLUMNS order, optionally for one date only."""
+        if day is None:
+            return sum(self._daily.values(), np.zeros(len(NUTRIENT_COLUMNS)))
+        return self._daily.get(day.toordinal(), np.zeros(len(NUTRIENT_COLUMNS))).copy()
+
+    def totals(self, day=None):
+        """{column: sum} over live meals, optionally for one date only (read from the rollup)."""
+        return dict(zip(NUTRIENT_COLUMNS, self.totals_vector(day).tolist()))
+
+    def daily_totals(self, days=7, end=None):
+        """Per-day sums for the `days` days ending on `end` (default today), zeros for empty days.
+
+        Returns a DataFrame with a `date` column plus NUTRIENT_COLUMNS, oldest first.
+        """
+        last = (end or date.today()).toordinal()
+        ordinals = range(last - days + 1, last + 1)
+        sums = np.zeros((days, len(NUTRIENT_COLUMNS)))
+        for row, day in enumerate(ordinals):
+            if day in self._daily:
+                sums[row] = self._daily[day]
+        frame = pd.DataFrame(sums, columns=list(NUTRIENT_COLUMNS))
+        frame.insert(0, "date", pd.to_datetime([date.fromordinal(d) for d in ordinals]))
+        return frame
+
+    def page(self, number, page_size=10, newest_first=True):
+        """Meals on page `number` (0-based) as dicts; only these rows are materialized."""
+        ids = np.flatnonzero(self._live())
+        if newest_first:
+            ids = ids[::-1]
+        rows = []
+        for i in ids[number * page_size:(number + 1) * page_size].tolist():
+            minute = int(self._minute[i])
+            rows.append({
+                "id": i,
+                "name": self._names[i],
+                "portion": self._portions[i],
+                "date": date.fromordinal(int(self._day[i])),
+                "time": f"{minute // 60:02d}:{minute % 60:02d}",
+                **dict(zip(NUTRIENT_COLUMNS, self._values[i].tolist())),
+            })
+        return rows
+
+    def rows(self, ids):
+        """Storage rows (id, day, minute, name, portion, *NUTRIENT_COLUMNS, deleted) for `ids`."""
+        return [
+            (i, int(self._day[i]), int(self._minute[i]), self._names[i], self._portions[i],
+             *self._values[i].tolist(), int(not self._alive[i]))
+            for i in ids
+        ]
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Rebuild a log from stored rows; meal ids are the storage ids, so tombstones stay in place."""
+        rows = sorted(rows)
+        size = rows[-1][0] + 1 if rows else 0
+        log = cls(capacity=max(64, size))
+        log._names = [""] * size
+        log._portions = [""] * size
+        for meal_id, day, minute, name, portion, *rest in rows:
+            *values, deleted = rest
+            log._day[meal_id] = day
+            log._minute[meal_id] = minute
+            log._values[meal_id] = values
+            log._alive[meal_id] = not deleted
+            log._stored[meal_id] = meal_id
+            log._names[meal_id] = name
+            log._portions[meal_id] = portion
+        log._size = size
+        if size:
+            log._roll_rows(log._alive[:size].nonzero()[0])
+        return log
+
+    def page_count(self, page_size=10):
+        return max(1, -(-len(self) // page_size))
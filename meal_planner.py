@@ -0,0 +1,327 @@
+# meal_planner.py
+# Weekly meal plans for the Plan page.
+#
+# A plan fills 7 days x N meal slots from data/meal_catalog.csv. Hard constraints:
+# only meals for the profile's region (or "Any"), none a health condition rules
+# out, no meal twice in a day and at most MAX_REPEATS times a week. Within those,
+# the planner minimizes how far each day's nutrients land from the profile's
+# goals (nutrient_engine.goal_vector), with small bonuses for the region's own
+# dishes (get_meal_ideas) and for meals that fit the day's focus
+# (get_weekly_overview).
+#
+# The solver is a greedy start followed by local search: every slot in turn is
+# re-chosen as the best feasible meal and serving size given the rest of its
+# day, scoring all candidates for the slot in one NumPy expression. Converged
+# plans are perturbed RESTARTS times to escape local minima. The search is
+# bounded by those counts (and MAX_SWEEPS passes per descent), not by the clock,
+# and seeds come from the profile, so a profile gets the same plan on any
+# machine. TIME_BUDGET is only a safety cap; a search it cuts short is marked
+# incomplete and may differ from run to run.
+import csv
+import os
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from nutrient_engine import LIMITS, NUTRIENT_KEYS, NUTRIENTS, POSITION, goal_vector
+from nutrition_helpers import get_meal_ideas, get_weekly_focus, get_weekly_overview
+
+CATALOG_PATH = os.environ.get(
+    "NUTRIMAMA_MEAL_CATALOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "meal_catalog.csv")
+)
+
+SLOTS = {
+    2: ("lunch", "dinner"),
+    3: ("breakfast", "lunch", "dinner"),
+    4: ("breakfast", "lunch", "snack", "dinner"),
+    5: ("breakfast", "snack", "lunch", "snack", "dinner"),
+}
+# Share of the day's goals each slot is expected to cover, for the greedy start
+SLOT_SHARE = {"breakfast": 0.25, "lunch": 0.35, "dinner": 0.3, "snack": 0.1}
+SERVINGS = (1.0, 1.5, 2.0)
+MAX_REPEATS = 2
+RESTARTS = 12
+MAX_SWEEPS = 50
+# Seconds; a full search takes well under a tenth of this
+TIME_BUDGET = 2.0
+
+# Objective: squared relative shortfall for targets, squared excess for limits,
+# squared deviation either way for calories
+CALORIE_WEIGHT, PROTEIN_WEIGHT, LIMIT_WEIGHT = 4.0, 2.0, 10.0
+REGION_BONUS, IDEA_BONUS, FOCUS_BONUS = 0.05, 0.05, 0.05
+
+MealPlan = namedtuple("MealPlan", ["meals", "daily", "goals", "score", "complete"])
+
+
+def _split(value):
+    return tuple(v.strip() for v in (value or "").split("|") if v.strip())
+
+
+class MealCatalog:
+    def __init__(self, rows):
+        """`rows`: dicts with name, regions, slots, tags, avoid and nutrient_engine keys."""
+        self.names = [r["name"].strip() for r in rows]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.regions = [frozenset(_split(r["regions"])) for r in rows]
+        self.slots = [frozenset(_split(r["slots"])) for r in rows]
+        self.tags = [frozenset(_split(r.get("tags"))) for r in rows]
+        self.avoid = [frozenset(_split(r.get("avoid"))) for r in rows]
+        columns = [key for key in NUTRIENT_KEYS if rows and key in rows[0]]
+        self.nutrients = np.zeros((len(rows), len(NUTRIENTS)))
+        for i, row in enumerate(rows):
+            for key in columns:
+                self.nutrients[i, POSITION[key]] = float(row[key] or 0)
+        # Nutrients the catalog has data for; the others can't be planned for
+        self.covered = np.zeros(len(NUTRIENTS), dtype=bool)
+        self.covered[[POSITION[key] for key in columns]] = True
+
+    def __len__(self):
+        return len(self.names)
+
+
+def read_catalog(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return MealCatalog(list(csv.DictReader(line for line in f if not line.startswith("#"))))
+
+
+@lru_cache(maxsize=None)
+def load_catalog(path=CATALOG_PATH):
+    """Meal catalog for `path`, read once per process."""
+    return read_catalog(path)
+
+
+def plan_key(profile, meals_per_day=4):
+    """What a plan depends on; profiles with the same key get the same plan."""
+    conditions = tuple(sorted(c for c in profile.get("conditions") or () if c and c != "None"))
+    return profile.get("region"), profile.get("bf_stage"), conditions, meals_per_day
+
+
+# ==============================================
+# Solver
+# ==============================================
+class _Problem:
+    def __init__(self, catalog, region, stage, conditions, meals_per_day):
+        self.days = list(get_weekly_overview())
+        self.slots = SLOTS[meals_per_day]
+        goals = goal_vector(stage, conditions)
+        self.goals = goals
+        self.columns = np.flatnonzero(catalog.covered & ~np.isnan(goals))
+        self.goal = goals[self.columns]
+        self.limit = LIMITS[self.columns]
+        self.weight = np.where(self.limit, LIMIT_WEIGHT, 1.0)
+        self.weight[self.columns == POSITION["protein"]] = PROTEIN_WEIGHT
+        self.calories = self.columns == POSITION["calories"]
+        self.weight[self.calories] = CALORIE_WEIGHT
+
+        ideas = [idea.lower() for idea in get_meal_ideas(region)]
+        allowed = [
+            i for i in range(len(catalog))
+            if (region in catalog.regions[i] or "Any" in catalog.regions[i]) and not catalog.avoid[i] & set(conditions)
+        ]
+        focus = get_weekly_focus()
+        # Per slot: candidate (meal, servings) pairs, their nutrient rows and bonuses
+        self.items, self.vectors, self.bonus = [], [], []
+        for slot in self.slots:
+            meals = [i for i in allowed if slot in catalog.slots[i]]
+            if not meals:
+                raise ValueError(f"No {slot} meals in the catalog for {region!r} and {list(conditions)}")
+            items = np.repeat(meals, len(SERVINGS))
+            servings = np.tile(SERVINGS, len(meals))
+            self.items.append((items, servings))
+            self.vectors.append(catalog.nutrients[items][:, self.columns] * servings[:, None])
+            bonus = np.array([
+                (REGION_BONUS if region in catalog.regions[i] else 0.0)
+                + (IDEA_BONUS if any(catalog.names[i].lower().startswith(idea) for idea in ideas) else 0.0)
+                for i in items
+            ])
+            day_bonus = np.array([
+                [FOCUS_BONUS if catalog.tags[i] & set(focus.get(day, ())) else 0.0 for i in items]
+                for day in self.days
+            ])
+            self.bonus.append(bonus[None, :] + day_bonus)
+
+    def cost(self, totals, share=1.0):
+        """Distance from goals for totals (..., columns), scaled to `share` of a day."""
+        ratio = totals / (self.goal * share)
+        gap = np.where(self.limit, np.maximum(ratio - 1, 0), np.maximum(1 - ratio, 0))
+        gap = np.where(self.calories, ratio - 1, gap)
+        return (gap * gap * self.weight).sum(axis=-1)
+
+    def feasible(self, slot, day_items, counts, current=None):
+        """Mask of slot candidates allowed given the day's other meals and weekly counts."""
+        items = self.items[slot][0]
+        used = counts[items] - (items == current if current is not None else 0)
+        taken = np.zeros(len(counts), dtype=bool)
+        taken[day_items] = True
+        return (used < MAX_REPEATS) & ~taken[items]
+
+
+def _solve(problem, rng, time_budget):
+    n_days, n_slots = len(problem.days), len(problem.slots)
+    choice = np.zeros((n_days, n_slots), dtype=np.intp)
+    counts = np.zeros(max(int(items.max()) for items, _ in problem.items) + 1, dtype=np.int64)
+    totals = np.zeros((n_days, len(problem.columns)))
+    deadline = time.perf_counter() + time_budget
+    complete = True
+
+    def item(d, s):
+        return problem.items[s][0][choice[d, s]]
+
+    def day_items(d, skip):
+        return [item(d, s) for s in range(n_slots) if s != skip]
+
+    # Greedy start: fill each day slot by slot against a growing share of the goals
+    shares = np.cumsum([SLOT_SHARE[slot] for slot in problem.slots])
+    shares /= shares[-1]
+    for d in range(n_days):
+        for s in range(n_slots):
+            others = [problem.items[t][0][choice[d, t]] for t in range(s)]
+            score = problem.cost(totals[d] + problem.vectors[s], shares[s]) - problem.bonus[s][d]
+            score += rng.random(len(score)) * 1e-9
+            score[~problem.feasible(s, others, counts)] = np.inf
+            choice[d, s] = int(np.argmin(score))
+            counts[item(d, s)] += 1
+            totals[d] += problem.vectors[s][choice[d, s]]
+
+    def total_score():
+        bonus = sum(problem.bonus[s][d, choice[d, s]] for d in range(n_days) for s in range(n_slots))
+        return float(problem.cost(totals).sum() - bonus)
+
+    def descend():
+        nonlocal complete
+        coordinates = [(d, s) for d in range(n_days) for s in range(n_slots)]
+        improved = True
+        for _ in range(MAX_SWEEPS):
+            if not improved:
+                break
+            if time.perf_counter() >= deadline:
+                complete = False
+                break
+            improved = False
+            rng.shuffle(coordinates)
+            for d, s in coordinates:
+                current = choice[d, s]
+                base = totals[d] - problem.vectors[s][current]
+                score = problem.cost(base + problem.vectors[s]) - problem.bonus[s][d]
+                score[~problem.feasible(s, day_items(d, s), counts, item(d, s))] = np.inf
+                best = int(np.argmin(score))
+                if score[best] < score[current] - 1e-12:
+                    counts[item(d, s)] -= 1
+                    choice[d, s] = best
+                    counts[item(d, s)] += 1
+                    totals[d] = base + problem.vectors[s][best]
+                    improved = True
+
+    descend()
+    best = (total_score(), choice.copy())
+    for _ in range(RESTARTS):
+        if time.perf_counter() >= deadline:
+            complete = False
+            break
+        # Kick: re-draw a few slots at random (keeping them feasible), then descend again
+        saved = choice.copy(), counts.copy(), totals.copy()
+        for _ in range(3):
+            d, s = int(rng.integers(n_days)), int(rng.integers(n_slots))
+            options = np.flatnonzero(problem.feasible(s, day_items(d, s), counts, item(d, s)))
+            if len(options):
+                counts[item(d, s)] -= 1
+                totals[d] -= problem.vectors[s][choice[d, s]]
+                choice[d, s] = int(rng.choice(options))
+                counts[item(d, s)] += 1
+                totals[d] += problem.vectors[s][choice[d, s]]
+        descend()
+        score = total_score()
+        if score < best[0]:
+            best = (score, choice.copy())
+        else:
+            choice[:], counts[:], totals[:] = saved
+    return (*best, complete)
+
+
+def plan_week(profile, meals_per_day=4, time_budget=TIME_BUDGET, catalog_path=CATALOG_PATH):
+    """A MealPlan for a profile (region, bf_stage, conditions).
+
+    meals: DataFrame of day, slot, meal, servings and per-meal nutrients;
+    daily: nutrient totals per day (catalog nutrients only); goals: the daily
+    goal vector; score: the objective (lower is better); complete: False if
+    `time_budget` ran out before the search finished.
+    """
+    region, stage, conditions, meals_per_day = plan_key(profile, meals_per_day)
+    catalog = load_catalog(catalog_path)
+    problem = _Problem(catalog, region, stage, conditions, meals_per_day)
+    seed = zlib.crc32(repr(plan_key(profile, meals_per_day)).encode())
+    score, choice, complete = _solve(problem, np.random.default_rng(seed), time_budget)
+
+    meals, servings = [], []
+    for d in range(len(problem.days)):
+        for s in range(len(problem.slots)):
+            items, sizes = problem.items[s]
+            meals.append(int(items[choice[d, s]]))
+            servings.append(float(sizes[choice[d, s]]))
+    return assemble_plan(profile, meals_per_day, meals, servings, score, complete, catalog_path)
+
+
+def assemble_plan(profile, meals_per_day, meals, servings, score=float("nan"), complete=True,
+                  catalog_path=CATALOG_PATH):
+    """The MealPlan for chosen catalog rows and serving sizes, listed day by day in slot order.
+
+    Lets a stored plan (see recommendation_cache) be served without solving it again.
+    """
+    region, stage, conditions, meals_per_day = plan_key(profile, meals_per_day)
+    catalog = load_catalog(catalog_path)
+    slots = SLOTS[meals_per_day]
+    goals = goal_vector(stage, conditions)
+    columns = np.flatnonzero(catalog.covered & ~np.isnan(goals))
+    keys = [NUTRIENT_KEYS[c] for c in columns]
+    days = list(get_weekly_overview())
+
+    amounts = catalog.nutrients[np.asarray(meals)][:, columns] * np.asarray(servings)[:, None]
+    rows = [
+        {
+            "day": days[n // len(slots)], "slot": slots[n % len(slots)], "meal": catalog.names[i], "servings": size,
+            **dict(zip(keys, amount.round(1).tolist())),
+        }
+        for n, (i, size, amount) in enumerate(zip(meals, servings, amounts))
+    ]
+    plan = pd.DataFrame(rows)
+    daily = plan.groupby("day", sort=False)[keys].sum()
+    return MealPlan(plan, daily, goals, score, complete)
+
+
+def search_parameters():
+    """Everything besides the catalog and goals that decides which plan the search returns."""
+    return {
+        "servings": SERVINGS, "max_repeats": MAX_REPEATS, "restarts": RESTARTS, "max_sweeps": MAX_SWEEPS,
+        "time_budget": TIME_BUDGET, "slot_share": SLOT_SHARE,
+        "weights": (CALORIE_WEIGHT, PROTEIN_WEIGHT, LIMIT_WEIGHT, REGION_BONUS, IDEA_BONUS, FOCUS_BONUS),
+    }
+
+
+def _plan_for_key(args):
+    key, time_budget, catalog_path = args
+    region, stage, conditions, meals_per_day = key
+    profile = {"region": region, "bf_stage": stage, "conditions": list(conditions)}
+    return plan_week(profile, meals_per_day, time_budget, catalog_path)
+
+
+def plan_many(profiles, meals_per_day=4, processes=None, time_budget=TIME_BUDGET, catalog_path=CATALOG_PATH):
+    """plan_week() for many profiles, solving each distinct plan_key() once across a process pool.
+
+    `processes=0` solves in this process. Returns plans in profile order.
+    """
+    keys = [plan_key(p, meals_per_day) for p in profiles]
+    unique = list(dict.fromkeys(keys))
+    jobs = [(key, time_budget, catalog_path) for key in unique]
+    if processes == 0 or len(unique) <= 1:
+        plans = list(map(_plan_for_key, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            plans = list(pool.map(_plan_for_key, jobs, chunksize=max(1, len(jobs) // 32)))
+    solved = dict(zip(unique, plans))
+    return [solved[key] for key in keys]
@@ -0,0 +1,243 @@
+# medication_db.py
+# Breastfeeding safety lookup for the Home page medication checker.
+#
+# A dataset of medications (CSV or JSON; one row per generic with its brand
+# names and synonyms) is compiled once per process into a MedicationIndex: a dict
+# from every normalized name to its medication for exact hits, and a trigram
+# index over the same names for misspellings ("ibuprofin", "zyrtek"). Only an
+# exact generic, brand or synonym match gets a safety rating; a close spelling
+# is offered as a suggestion for the user to confirm, since a near miss is often
+# a different drug (metronidazole / methimazole). Fuzzy results are memoized,
+# since people retype the same few misspellings.
+#
+# Known drug pairs (data/interactions.csv) become an adjacency map keyed by
+# medication, so checking a list of drugs walks only the pairs that interact
+# instead of comparing every pair.
+import csv
+import json
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from cache_utils import TTLCache
+from fuzzy_index import TrigramIndex, normalize
+
+DB_PATH = os.environ.get(
+    "NUTRIMAMA_MEDICATION_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "medications.csv")
+)
+
+Medication = namedtuple(
+    "Medication",
+    ["generic", "brands", "synonyms", "category", "transfer", "effects", "recommendation", "alternatives"]
+)
+MedicationMatch = namedtuple("MedicationMatch", ["medication", "name", "score", "id"])
+Interaction = namedtuple("Interaction", ["drug_a", "drug_b", "severity", "description"])
+
+INTERACTIONS_PATH = os.environ.get(
+    "NUTRIMAMA_INTERACTIONS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "interactions.csv")
+)
+SEVERITY_ORDER = {"major": 0, "moderate": 1, "minor": 2}
+
+UNKNOWN = {
+    "category": "L4 (Limited Data)",
+    "transfer": "Unknown",
+    "effects": "Insufficient information",
+    "recommendation": "Consult healthcare provider",
+    "alternatives": []
+}
+
+_LIST_FIELDS = ("brands", "synonyms", "alternatives")
+
+
+def _split(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(v.strip() for v in value if v and v.strip())
+    return tuple(v.strip() for v in str(value or "").split("|") if v.strip())
+
+
+def _medication(row):
+    row = {k.strip().lower(): v for k, v in row.items() if k}
+    fields = {f: (_split(row.get(f)) if f in _LIST_FIELDS else str(row.get(f) or "").strip())
+              for f in Medication._fields}
+    return Medication(**fields)
+
+
+def read_dataset(path):
+    """Medications from a CSV (pipe-separated lists) or a JSON list of objects."""
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(line for line in f if not line.startswith("#")))
+    return [m for m in map(_medication, rows) if m.generic]
+
+
+class MedicationIndex:
+    def __init__(self, medications):
+        self.medications = list(medications)
+        self._exact = {}
+        names, owners = [], []
+        # Generics claim their names first, so a brand can never shadow a generic
+        for field in ("generic", "brands", "synonyms"):
+            for i, med in enumerate(self.medications):
+                for name in ((med.generic,) if field == "generic" else getattr(med, field)):
+                    key = normalize(name)
+                    if key and key not in self._exact:
+                        self._exact[key] = len(names)
+                        names.append(name)
+                        owners.append(i)
+        self._owners = owners
+        self._fuzzy = TrigramIndex(names)
+        self._fuzzy_cache = TTLCache(maxsize=4096, ttl=24 * 3600)
+
+    def __len__(self):
+        return len(self.medications)
+
+    def search(self, query, limit=5, min_score=0.45):
+        """Best matches for `query` as MedicationMatch(medication, matched name, score), one per medication."""
+        key = normalize(query)
+        if not key:
+            return []
+        if key in self._exact:
+            name_id = self._exact[key]
+            i = self._owners[name_id]
+            exact = MedicationMatch(self.medications[i], self._fuzzy.names[name_id], 1.0, i)
+            if limit == 1:
+                return [exact]
+            seen, results = {i}, [exact]
+        else:
+            seen, results = set(), []
+        fuzzy = self._fuzzy_cache.get_or_compute(
+            (key, limit, min_score), lambda: self._fuzzy.search(key, limit=limit * 3, min_score=min_score)
+        )
+        for match in fuzzy:
+            i = self._owners[match.id]
+            if i not in seen:
+                seen.add(i)
+                results.append(MedicationMatch(self.medications[i], match.name, match.score, i))
+        return results[:limit]
+
+    def lookup(self, query):
+        """The MedicationMatch whose generic, brand or synonym is `query` (after normalizing), or None."""
+        name_id = self._exact.get(normalize(query))
+        if name_id is None:
+            return None
+        i = self._owners[name_id]
+        return MedicationMatch(self.medications[i], self._fuzzy.names[name_id], 1.0, i)
+
+    def lookup_many(self, queries):
+        """lookup() for each query."""
+        return [self.lookup(query) for query in queries]
+
+    def suggest(self, query, limit=3, min_score=0.45):
+        """Close spellings of known names for a `query` lookup() doesn't know; [] for exact names."""
+        if normalize(query) in self._exact:
+            return []
+        return self.search(query, limit=limit, min_score=min_score)
+
+
+class InteractionIndex:
+    def __init__(self, index, interactions):
+        self._pairs = {}   # medication id -> {other medication id: Interaction}
+        for a, b, severity, description in interactions:
+            match_a, match_b = index.lookup_many([a, b])
+            if match_a is None or match_b is None or match_a.id == match_b.id:
+                continue
+            interaction = Interaction(
+                match_a.medication.generic, match_b.medication.generic, severity.strip().lower(), description
+            )
+            self._pairs.setdefault(match_a.id, {})[match_b.id] = interaction
+            self._pairs.setdefault(match_b.id, {})[match_a.id] = interaction
+
+    def __len__(self):
+        return sum(map(len, self._pairs.values())) // 2
+
+    def between(self, ids):
+        """Interactions among medication ids, most severe first."""
+        ids = set(ids)
+        found = []
+        for a in ids:
+            for b, interaction in self._pairs.get(a, {}).items():
+                if b in ids and a < b:
+                    found.append(interaction)
+        return sorted(found, key=lambda i: (SEVERITY_ORDER.get(i.severity, len(SEVERITY_ORDER)), i.drug_a, i.drug_b))
+
+
+def read_interactions(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = csv.DictReader(line for line in f if not line.startswith("#"))
+        return [(r["drug_a"], r["drug_b"], r["severity"], r["description"]) for r in rows]
+
+
+@lru_cache(maxsize=None)
+def load_index(path=DB_PATH):
+    """Index for `path`, built once per process."""
+    return MedicationIndex(read_dataset(path))
+
+
+@lru_cache(maxsize=None)
+def load_interactions(path=INTERACTIONS_PATH, db_path=DB_PATH):
+    """Interaction index for `path`, resolved against the medication index at `db_path`."""
+    return InteractionIndex(load_index(db_path), read_interactions(path))
+
+
+def split_medications(text):
+    """Distinct names from "ibuprofen, sertraline; advil" style input, in order."""
+    names = {}
+    for name in re.split(r"[,;\n]+", text):
+        if normalize(name):
+            names.setdefault(normalize(name), name.strip())
+    return list(names.values())
+
+
+def category_level(category):
+    """Hale level (1-5) from a category like "L2 (Compatible)"; unknown counts as 4."""
+    level = re.match(r"\s*L(\d)", category or "")
+    return int(level.group(1)) if level else 4
+
+
+def check_lactation_safety(drug_names, infant_age="1-6 months", path=DB_PATH, interactions_path=INTERACTIONS_PATH):
+    """Safety details in the Home page's result format.
+
+    A single name returns that drug's details. A list, or comma-separated names,
+    returns {"drugs": [details per name], "worst": the riskiest drug's details,
+    "interactions": [Interaction, ...]}. `infant_age` is accepted for the page's
+    call; the dataset has one rating per drug.
+
+    Names that aren't an exact generic, brand or synonym get the UNKNOWN details,
+    with close spellings listed under "suggestions" for the user to confirm.
+    """
+    index = load_index(path)
+    names = split_medications(drug_names) if isinstance(drug_names, str) else list(drug_names)
+    if isinstance(drug_names, str) and len(names) <= 1:
+        return _details(index, drug_names, index.lookup(drug_names))
+
+    matches = index.lookup_many(names)
+    drugs = [dict(_details(index, q, m), query=q) for q, m in zip(names, matches)]
+    worst = max(drugs, key=lambda d: category_level(d["category"])) if drugs else dict(UNKNOWN, matched=None)
+    ids = [m.id for m in matches if m is not None]
+    return {
+        "drugs": drugs,
+        "worst": worst,
+        "interactions": load_interactions(interactions_path, path).between(ids),
+    }
+
+
+def _details(index, query, match):
+    if match is None:
+        return dict(UNKNOWN, matched=None, suggestions=[m.medication.generic for m in index.suggest(query)])
+    med = match.medication
+    return {
+        "category": med.category,
+        "transfer": med.transfer,
+        "effects": med.effects,
+        "recommendation": med.recommendation,
+        "alternatives": list(med.alternatives),
+        "matched": med.generic,
+        "brands": list(med.brands),
+        "suggestions": [],
+    }
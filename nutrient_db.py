@@ -0,0 +1,355 @@
+# nutrient_db.py
+# Offline copy of USDA FoodData Central nutrient data for the Mother Tracker.
+#
+# Build it once from a FoodData Central bulk download
+# (https://fdc.nal.usda.gov/download-datasets.html), either the CSV folder or a JSON file:
+#
+#   python nutrient_db.py import path/to/FoodData_Central_csv_YYYY-MM-DD
+#   python nutrient_db.py import path/to/FoodData_Central_foundation_food_json_YYYY-MM-DD.json
+#
+# lookup(food_name) then returns the same {nutrientName: value} mapping as the live
+# /foods/search endpoint, from SQLite with a full-text prefix index on descriptions.
+# Household measures (food_portion.csv, or foodPortions in JSON) are imported too,
+# and portions(food_name) serves them from a PortionIndex loaded once per process.
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+from functools import lru_cache
+
+from fuzzy_index import normalize
+from portions import PortionIndex, parse_amount, unit_key
+
+DB_PATH = os.environ.get(
+    "NUTRIMAMA_NUTRIENT_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fdc_nutrients.sqlite")
+)
+
+SCHEMA = """
+CREATE TABLE food (
+    fdc_id INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    norm TEXT NOT NULL
+);
+CREATE TABLE nutrient (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    unit TEXT
+);
+CREATE TABLE food_nutrient (
+    fdc_id INTEGER NOT NULL,
+    nutrient_id INTEGER NOT NULL,
+    amount REAL NOT NULL,
+    PRIMARY KEY (fdc_id, nutrient_id)
+) WITHOUT ROWID;
+CREATE TABLE food_portion (
+    fdc_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    amount REAL NOT NULL,
+    unit TEXT NOT NULL,
+    grams REAL NOT NULL,
+    PRIMARY KEY (fdc_id, seq)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE food_fts USING fts5(
+    description, content='food', content_rowid='fdc_id', prefix='2 3'
+);
+"""
+
+# The live search API reports energy in kcal; bulk files also carry a kJ row with the same name
+SKIPPED_UNITS = {"kJ"}
+# Measure units FDC uses when the measure is in the modifier or description instead
+_NO_MEASURE_UNITS = {"", "undetermined", "quantity not specified"}
+
+_BATCH = 50_000
+
+
+# ==============================================
+# IMPORT
+# ==============================================
+def _batched(rows, size=_BATCH):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def _portion(fdc_id, seq, amount, measure, description, modifier, grams):
+    """food_portion row (fdc_id, seq, label, amount, unit, grams) from FDC fields, or None if unusable."""
+    measure, description, modifier = (str(v or "").strip() for v in (measure, description, modifier))
+    if measure.lower() not in _NO_MEASURE_UNITS:
+        label = f"{float(amount or 1):g} {measure}" + (f", {modifier}" if modifier else "")
+    elif description.lower() not in _NO_MEASURE_UNITS:
+        label = description                 # survey foods: "1 cup", "1 medium banana"
+    else:
+        label = f"{float(amount or 1):g} {modifier}"   # SR Legacy: amount 1, modifier "cup, chopped"
+    parsed = parse_amount(label)
+    if parsed is None:
+        return None
+    count, rest = parsed
+    unit = unit_key(rest)
+    if not grams or not unit or not count:
+        return None
+    return fdc_id, seq, label, count, unit, float(grams)
+
+
+def _csv_records(folder):
+    nutrients = [(int(r["id"]), r["name"], r["unit_name"]) for r in _read_csv(os.path.join(folder, "nutrient.csv"))]
+    foods = ((int(r["fdc_id"]), r["description"]) for r in _read_csv(os.path.join(folder, "food.csv")))
+    amounts = (
+        (int(r["fdc_id"]), int(r["nutrient_id"]), float(r["amount"]))
+        for r in _read_csv(os.path.join(folder, "food_nutrient.csv"))
+        if r["amount"]
+    )
+    # Portions are optional; older and branded-only downloads have none
+    portions = []
+    if os.path.exists(os.path.join(folder, "food_portion.csv")):
+        units = {}
+        if os.path.exists(os.path.join(folder, "measure_unit.csv")):
+            units = {r["id"]: r["name"] for r in _read_csv(os.path.join(folder, "measure_unit.csv"))}
+        portions = (
+            _portion(int(r["fdc_id"]), int(r.get("seq_num") or r["id"]), r["amount"], units.get(r["measure_unit_id"]),
+                     r.get("portion_description"), r.get("modifier"), float(r["gram_weight"] or 0))
+            for r in _read_csv(os.path.join(folder, "food_portion.csv"))
+        )
+    return nutrients, foods, amounts, portions
+
+
+def _json_records(path):
+    with open(path, encoding="utf-8") as f:
+        document = json.load(f)
+    # Each FDC JSON download wraps its foods in one top-level list (FoundationFoods, SRLegacyFoods, ...)
+    food_list = next(v for v in document.values() if isinstance(v, list)) if isinstance(document, dict) else document
+
+    nutrients = {}
+    foods = []
+    amounts = []
+    portions = []
+    for food in food_list:
+        fdc_id = int(food["fdcId"])
+        foods.append((fdc_id, food["description"]))
+        for seq, fp in enumerate(food.get("foodPortions", [])):
+            portions.append(_portion(
+                fdc_id, seq, fp.get("amount"), (fp.get("measureUnit") or {}).get("name"),
+                fp.get("portionDescription"), fp.get("modifier"), fp.get("gramWeight")
+            ))
+        for fn in food.get("foodNutrients", []):
+            nutrient = fn.get("nutrient", {})
+            if "id" not in nutrient or fn.get("amount") is None:
+                continue
+            nutrients[nutrient["id"]] = (int(nutrient["id"]), nutrient["name"], nutrient.get("unitName"))
+            amounts.append((fdc_id, int(nutrient["id"]), float(fn["amount"])))
+    return list(nutrients.values()), foods, amounts, portions
+
+
+def import_fdc(source, db_path=DB_PATH):
+    """Build the nutrient database at `db_path` from an FDC CSV folder or JSON file.
+
+    The database is written to a temporary file and moved into place, so workers
+    reading the old copy are never exposed to a half-built one. Returns the number
+    of foods imported.
+    """
+    nutrients, foods, amounts, portions = _csv_records(source) if os.path.isdir(source) else _json_records(source)
+
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    tmp_path = f"{db_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+
+        conn.executemany(
+            "INSERT OR REPLACE INTO nutrient (id, name, unit) VALUES (?, ?, ?)",
+            [n for n in nutrients if n[2] not in SKIPPED_UNITS]
+        )
+        for batch in _batched((fdc_id, desc, normalize(desc)) for fdc_id, desc in foods):
+            conn.executemany("INSERT OR REPLACE INTO food (fdc_id, description, norm) VALUES (?, ?, ?)", batch)
+        # Amounts for skipped nutrients or unknown foods are dropped by the join
+        conn.execute("CREATE TEMP TABLE staged_amount (fdc_id INTEGER, nutrient_id INTEGER, amount REAL)")
+        for batch in _batched(amounts):
+            conn.executemany("INSERT INTO staged_amount VALUES (?, ?, ?)", batch)
+        conn.execute("""
+            INSERT OR REPLACE INTO food_nutrient (fdc_id, nutrient_id, amount)
+            SELECT s.fdc_id, s.nutrient_id, s.amount
+            FROM staged_amount s
+            JOIN food f ON f.fdc_id = s.fdc_id
+            JOIN nutrient n ON n.id = s.nutrient_id
+        """)
+        conn.execute("DROP TABLE staged_amount")
+        conn.execute(
+            "CREATE TEMP TABLE staged_portion (fdc_id INTEGER, seq INTEGER, label TEXT, amount REAL, unit TEXT, grams REAL)"
+        )
+        for batch in _batched(p for p in portions if p is not None):
+            conn.executemany("INSERT INTO staged_portion VALUES (?, ?, ?, ?, ?, ?)", batch)
+        conn.execute("""
+            INSERT OR REPLACE INTO food_portion (fdc_id, seq, label, amount, unit, grams)
+            SELECT s.fdc_id, s.seq, s.label, s.amount, s.unit, s.grams
+            FROM staged_portion s JOIN food f ON f.fdc_id = s.fdc_id
+        """)
+        conn.execute("DROP TABLE staged_portion")
+
+        conn.execute("CREATE INDEX food_norm ON food (norm)")
+        conn.execute("INSERT INTO food_fts (food_fts) VALUES ('rebuild')")
+        conn.commit()
+        count = conn.execute("SELECT COUNT(*) FROM food").fetchone()[0]
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, db_path)
+    _reset_connections()
+    return count
+
+
+# ==============================================
+# LOOKUP
+# ==============================================
+_local = threading.local()
+_generation = 0
+
+
+def _reset_connections():
+    global _generation
+    _generation += 1
+    _cached_match.cache_clear()
+    _cached_lookup.cache_clear()
+    load_portions.cache_clear()
+
+
+def _connection(db_path=DB_PATH):
+    # One read-only connection per thread; Streamlit runs each session on its own thread
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.generation != _generation or _local.path != db_path:
+        if conn is not None:
+            conn.close()
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        _local.conn, _local.generation, _local.path = conn, _generation, db_path
+    return conn
+
+
+def available(db_path=DB_PATH):
+    return os.path.exists(db_path)
+
+
+def _stem(token):
+    # Crude plural folding; the prefix match covers the singular and plural forms
+    if len(token) > 4 and token.endswith(("ies", "oes")):
+        return token[:-3] if token.endswith("ies") else token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def _fts_query(norm, operator="AND"):
+    return f" {operator} ".join(f'"{_stem(token)}"*' for token in norm.split())
+
+
+def find_food(food_name, db_path=DB_PATH):
+    """Best matching (fdc_id, description) for a free-text food name, or None."""
+    norm = normalize(food_name)
+    if not norm or not available(db_path):
+        return None
+    conn = _connection(db_path)
+    row = conn.execute(
+        "SELECT fdc_id, description FROM food WHERE norm = ? LIMIT 1", (norm,)
+    ).fetchone()
+    # Best full-text match on all words, then on any word; ties go to the
+    # shorter (more generic) description
+    for operator in ("AND", "OR"):
+        if row is not None:
+            break
+        row = conn.execute(
+            """
+            SELECT f.fdc_id, f.description
+            FROM food_fts JOIN food f ON f.fdc_id = food_fts.rowid
+            WHERE food_fts MATCH ?
+            ORDER BY bm25(food_fts), length(f.description)
+            LIMIT 1
+            """,
+            (_fts_query(norm, operator),)
+        ).fetchone()
+    return row
+
+
+def nutrients_for(fdc_id, db_path=DB_PATH):
+    rows = _connection(db_path).execute(
+        """
+        SELECT n.name, fn.amount
+        FROM food_nutrient fn JOIN nutrient n ON n.id = fn.nutrient_id
+        WHERE fn.fdc_id = ?
+        """,
+        (fdc_id,)
+    )
+    return dict(rows.fetchall())
+
+
+def food_names(db_path=DB_PATH):
+    """Every food description in the database, in fdc_id order."""
+    if not available(db_path):
+        return []
+    return [row[0] for row in _connection(db_path).execute("SELECT description FROM food ORDER BY fdc_id")]
+
+
+@lru_cache(maxsize=4096)
+def _cached_match(food_name, db_path):
+    return find_food(food_name, db_path)
+
+
+@lru_cache(maxsize=4096)
+def _cached_lookup(food_name, db_path):
+    match = _cached_match(food_name, db_path)
+    if match is None:
+        return {}
+    return nutrients_for(match[0], db_path)
+
+
+@lru_cache(maxsize=None)
+def load_portions(db_path=DB_PATH):
+    """Every food's household measures as a PortionIndex, read once per database build."""
+    try:
+        rows = _connection(db_path).execute(
+            "SELECT fdc_id, label, amount, unit, grams FROM food_portion ORDER BY fdc_id, seq"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # Databases imported before portions were added
+        rows = []
+    return PortionIndex(rows)
+
+
+def lookup(food_name, db_path=DB_PATH):
+    """{nutrientName: value} per 100 g for the best matching food; {} if none."""
+    if not available(db_path):
+        return {}
+    return dict(_cached_lookup(food_name, db_path))
+
+
+def portions(food_name, db_path=DB_PATH):
+    """Household measures (Portion) for the best matching food; [] if none."""
+    if not available(db_path):
+        return []
+    match = _cached_match(food_name, db_path)
+    if match is None:
+        return []
+    return load_portions(db_path).portions(match[0])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "import":
+        sys.exit("usage: python nutrient_db.py import <FDC csv folder | FDC json file>")
+    n = import_fdc(sys.argv[2])
+    print(f"Imported {n} foods into {DB_PATH}")
@@ -0,0 +1,226 @@
+# nutrient_engine.py
+# Full-nutrient tracking for the Mother Tracker.
+#
+# Every food, meal and day is one float64 vector in the fixed order of NUTRIENTS,
+# positioned by FoodData Central nutrient id. The nutrient sources return
+# {nutrient name: amount per 100 g}; names (and ids, for callers that have them)
+# are resolved to vector positions through lookup tables built once at import.
+# Daily totals are vector sums and %-of-goal for every nutrient is one division
+# against a goal vector. Goals come from data/nutrient_goals.csv: per-stage
+# values, then per-condition rules applied on top.
+import csv
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from stages import DEFAULT_STAGE, STAGE_BY_DURATION
+
+GOALS_PATH = os.environ.get(
+    "NUTRIMAMA_NUTRIENT_GOALS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "nutrient_goals.csv")
+)
+
+# kind: "target" goals are minimums to reach, "limit" goals are caps to stay under
+Nutrient = namedtuple("Nutrient", ["key", "fdc_id", "name", "unit", "label", "kind", "aliases"])
+
+NUTRIENTS = (
+    Nutrient("calories", 1008, "Energy", "kcal", "Calories", "target", ("Energy (Atwater General Factors)",)),
+    Nutrient("protein", 1003, "Protein", "g", "Protein", "target", ()),
+    Nutrient("fat", 1004, "Total lipid (fat)", "g", "Fat", "target", ()),
+    Nutrient("carbohydrate", 1005, "Carbohydrate, by difference", "g", "Carbohydrate", "target", ()),
+    Nutrient("fiber", 1079, "Fiber, total dietary", "g", "Fiber", "target", ()),
+    Nutrient("sugars", 2000, "Sugars, total including NLEA", "g", "Sugars", "limit", ("Total Sugars", "Sugars, Total")),
+    Nutrient("saturated_fat", 1258, "Fatty acids, total saturated", "g", "Saturated fat", "limit", ()),
+    Nutrient("cholesterol", 1253, "Cholesterol", "mg", "Cholesterol", "limit", ()),
+    Nutrient("dha", 1272, "PUFA 22:6 n-3 (DHA)", "g", "DHA (omega-3)", "target", ("PUFA 22:6",)),
+    Nutrient("vitamin_a", 1106, "Vitamin A, RAE", "µg", "Vitamin A", "target", ()),
+    Nutrient("vitamin_c", 1162, "Vitamin C, total ascorbic acid", "mg", "Vitamin C", "target", ()),
+    Nutrient("vitamin_d", 1110, "Vitamin D (D2 + D3), International Units", "IU", "Vitamin D", "target", ()),
+    Nutrient("vitamin_e", 1109, "Vitamin E (alpha-tocopherol)", "mg", "Vitamin E", "target", ()),
+    Nutrient("vitamin_k", 1185, "Vitamin K (phylloquinone)", "µg", "Vitamin K", "target", ()),
+    Nutrient("thiamin", 1165, "Thiamin", "mg", "Thiamin (B1)", "target", ()),
+    Nutrient("riboflavin", 1166, "Riboflavin", "mg", "Riboflavin (B2)", "target", ()),
+    Nutrient("niacin", 1167, "Niacin", "mg", "Niacin (B3)", "target", ()),
+    Nutrient("vitamin_b6", 1175, "Vitamin B-6", "mg", "Vitamin B6", "target", ()),
+    Nutrient("folate", 1190, "Folate, DFE", "µg", "Folate", "target", ()),
+    Nutrient("vitamin_b12", 1178, "Vitamin B-12", "µg", "Vitamin B12", "target", ()),
+    Nutrient("choline", 1180, "Choline, total", "mg", "Choline", "target", ()),
+    Nutrient("calcium", 1087, "Calcium, Ca", "mg", "Calcium", "target", ()),
+    Nutrient("iron", 1089, "Iron, Fe", "mg", "Iron", "target", ()),
+    Nutrient("magnesium", 1090, "Magnesium, Mg", "mg", "Magnesium", "target", ()),
+    Nutrient("phosphorus", 1091, "Phosphorus, P", "mg", "Phosphorus", "target", ()),
+    Nutrient("potassium", 1092, "Potassium, K", "mg", "Potassium", "target", ()),
+    Nutrient("sodium", 1093, "Sodium, Na", "mg", "Sodium", "limit", ()),
+    Nutrient("zinc", 1095, "Zinc, Zn", "mg", "Zinc", "target", ()),
+    Nutrient("copper", 1098, "Copper, Cu", "mg", "Copper", "target", ()),
+    Nutrient("selenium", 1103, "Selenium, Se", "µg", "Selenium", "target", ()),
+    Nutrient("iodine", 1100, "Iodine, I", "µg", "Iodine", "target", ()),
+)
+NUTRIENT_KEYS = tuple(n.key for n in NUTRIENTS)
+POSITION = {key: i for i, key in enumerate(NUTRIENT_KEYS)}
+LIMITS = np.array([n.kind == "limit" for n in NUTRIENTS])
+
+# Foods that only report a nutrient in another unit: (source id, name, target key, factor)
+_CONVERSIONS = (
+    (1114, "Vitamin D (D2 + D3)", "vitamin_d", 40.0),     # µg -> IU
+    (1177, "Folate, total", "folate", 1.0),               # food folate; DFE when not reported
+)
+
+# Sources often report one nutrient under several names (e.g. "Energy" and "Energy
+# (Atwater General Factors)"), so each slot keeps a single value: the primary id or
+# name, else an alias, else a conversion from another unit
+PRIMARY, ALIAS, CONVERTED = 0, 1, 2
+
+_by_id = {n.fdc_id: POSITION[n.key] for n in NUTRIENTS}
+_by_name = {n.name.lower(): POSITION[n.key] for n in NUTRIENTS}
+_alias_by_name = {name.lower(): POSITION[n.key] for n in NUTRIENTS for name in n.aliases}
+_fallback_by_id = {fdc_id: (POSITION[key], factor) for fdc_id, _, key, factor in _CONVERSIONS}
+_fallback_by_name = {name.lower(): (POSITION[key], factor) for _, name, key, factor in _CONVERSIONS}
+
+
+# ==============================================
+# Nutrient dicts -> vectors
+# ==============================================
+def _position(key):
+    """(position, factor, rank) for a nutrient id or name, or None if not tracked."""
+    if isinstance(key, (int, np.integer)) or str(key).isdigit():
+        fdc_id = int(key)
+        if fdc_id in _by_id:
+            return _by_id[fdc_id], 1.0, PRIMARY
+        if fdc_id in _fallback_by_id:
+            return (*_fallback_by_id[fdc_id], CONVERTED)
+        return None
+    name = str(key).lower()
+    if name in _by_name:
+        return _by_name[name], 1.0, PRIMARY
+    if name in _alias_by_name:
+        return _alias_by_name[name], 1.0, ALIAS
+    if name in _fallback_by_name:
+        return (*_fallback_by_name[name], CONVERTED)
+    return None
+
+
+def to_vector(nutrients):
+    """{FDC nutrient id or name: amount} -> float64 vector in NUTRIENTS order; untracked keys are ignored.
+
+    A nutrient reported under several ids or names is counted once, preferring the
+    primary id or name, then an alias, then a unit conversion.
+    """
+    vector = np.zeros(len(NUTRIENTS))
+    rank = np.full(len(NUTRIENTS), CONVERTED + 1)
+    for key, amount in (nutrients or {}).items():
+        found = _position(key)
+        if found is None or amount is None:
+            continue
+        position, factor, key_rank = found
+        if key_rank < rank[position]:
+            vector[position] = float(amount) * factor
+            rank[position] = key_rank
+    return vector
+
+
+def to_matrix(nutrient_dicts):
+    """One to_vector() row per dict."""
+    matrix = np.zeros((len(nutrient_dicts), len(NUTRIENTS)))
+    for row, nutrients in enumerate(nutrient_dicts):
+        matrix[row] = to_vector(nutrients)
+    return matrix
+
+
+def from_dict(values):
+    """{nutrient key: amount} -> vector, for callers that work in NUTRIENT_KEYS."""
+    vector = np.zeros(len(NUTRIENTS))
+    for key, amount in values.items():
+        vector[POSITION[key]] = amount
+    return vector
+
+
+# ==============================================
+# Goals
+# ==============================================
+
+
+def read_goals(path):
+    """({stage: goal vector}, {condition: [(position, rule, value), ...]}) from a goals CSV.
+
+    Stage "*" rows give the values shared by every stage; rows for a named stage
+    override them. Condition rules either "set" a goal or "scale" it.
+    """
+    shared, stages, conditions = np.full(len(NUTRIENTS), np.nan), {}, {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(line for line in f if not line.startswith("#")):
+            position, value = POSITION[row["nutrient"].strip()], float(row["value"])
+            scope, name = row["scope"].strip(), row["name"].strip()
+            if scope == "stage" and name == "*":
+                shared[position] = value
+            elif scope == "stage":
+                stages.setdefault(name, {})[position] = value
+            elif scope == "condition":
+                conditions.setdefault(name, []).append((position, row["rule"].strip(), value))
+            else:
+                raise ValueError(f"Unknown goal scope: {scope!r}")
+    goals = {}
+    for stage, overrides in stages.items():
+        goals[stage] = shared.copy()
+        for position, value in overrides.items():
+            goals[stage][position] = value
+    goals.setdefault(DEFAULT_STAGE, shared.copy())
+    return goals, conditions
+
+
+@lru_cache(maxsize=None)
+def load_goals(path=GOALS_PATH):
+    """Goal table for `path`, read once per process."""
+    return read_goals(path)
+
+
+@lru_cache(maxsize=256)
+def _goal_vector(stage, conditions, path):
+    stages, rules = load_goals(path)
+    goals = stages.get(STAGE_BY_DURATION.get(stage, stage), stages[DEFAULT_STAGE]).copy()
+    for condition in conditions:
+        for position, rule, value in rules.get(condition, ()):
+            if rule == "set":
+                # A condition can only tighten a goal: raise a target, lower a limit
+                goals[position] = min(goals[position], value) if LIMITS[position] else max(goals[position], value)
+            elif rule == "scale":
+                goals[position] *= value
+    goals.flags.writeable = False
+    return goals
+
+
+def goal_vector(stage, conditions=(), path=GOALS_PATH):
+    """Daily goals in NUTRIENTS order for a breastfeeding stage and health conditions.
+
+    NaN marks a nutrient without a goal. The vector is shared and read-only.
+    """
+    conditions = tuple(sorted(c for c in (conditions or ()) if c and c != "None"))
+    return _goal_vector(stage or DEFAULT_STAGE, conditions, path)
+
+
+def profile_goals(profile, path=GOALS_PATH):
+    """goal_vector() for a stored user profile (its bf_stage and conditions)."""
+    return goal_vector(profile.get("bf_stage"), profile.get("conditions") or (), path)
+
+
+def percent_of_goal(totals, goals):
+    """Percent of goal for each nutrient (works on one vector or a days x nutrients matrix)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.asarray(totals, dtype=np.float64) / goals * 100
+
+
+def progress_table(totals, goals):
+    """DataFrame of every nutrient with a goal: label, amount, goal, unit, percent and kind."""
+    totals = np.asarray(totals, dtype=np.float64)
+    has_goal = ~np.isnan(goals)
+    return pd.DataFrame({
+        "nutrient": [n.label for n in NUTRIENTS],
+        "amount": totals,
+        "goal": goals,
+        "unit": [n.unit for n in NUTRIENTS],
+        "percent": percent_of_goal(totals, goals),
+        "kind": [n.kind for n in NUTRIENTS],
+    })[has_goal].reset_index(drop=True)
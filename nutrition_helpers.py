@@ -1,47 +1,175 @@
 # nutrition_helpers.py
+# Meal ideas, weekly focus, condition and stage tips and feeding advice.
+#
+# The wording lives in data/nutrition_guidance.json (versioned by its "version"
+# field). It is compiled once into read-only lookup tables; later calls only
+# stat the file, at most every RELOAD_INTERVAL seconds, and recompile it when it
+# changed, so edited content goes live without restarting the app.
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+from types import MappingProxyType
+
+GUIDANCE_PATH = os.environ.get(
+    "NUTRIMAMA_GUIDANCE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "nutrition_guidance.json")
+)
+RELOAD_INTERVAL = 2.0
+
+Guidance = namedtuple("Guidance", [
+    "version", "digest", "meal_ideas", "default_region", "weekly_overview", "weekly_focus", "condition_tips",
+    "default_condition_tip", "stage_tips", "feeding_advice", "stage_aliases", "condition_aliases",
+])
+
+
+def _frozen(mapping):
+    return MappingProxyType(dict(mapping))
+
+
+def compile_guidance(data, digest=""):
+    """Guidance tables from the parsed content file: read-only dicts of strings and tuples."""
+    aliases = data.get("aliases", {})
+    return Guidance(
+        version=str(data["version"]),
+        digest=digest,
+        meal_ideas=_frozen((region, tuple(ideas)) for region, ideas in data["meal_ideas"].items()),
+        default_region=data["default_region"],
+        weekly_overview=_frozen(data["weekly_overview"]),
+        weekly_focus=_frozen((day, tuple(tags)) for day, tags in data.get("weekly_focus_tags", {}).items()),
+        condition_tips=_frozen(data["condition_tips"]),
+        default_condition_tip=data["default_condition_tip"],
+        stage_tips=_frozen(data["stage_tips"]),
+        feeding_advice=_frozen(data["feeding_advice"]),
+        stage_aliases=_frozen(aliases.get("stages", {})),
+        condition_aliases=_frozen(aliases.get("conditions", {})),
+    )
+
+
+def read_guidance(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    return compile_guidance(json.loads(raw), hashlib.sha256(raw).hexdigest()[:16])
+
+
+class GuidanceSource:
+    """The compiled content of one file, recompiled when the file changes."""
+
+    def __init__(self, path, interval=RELOAD_INTERVAL, clock=time.monotonic):
+        self.path = path
+        self.interval = interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stamp = self._stat()
+        self._checked = clock()
+        self.guidance = read_guidance(path)
+        self.reloads = 0
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def current(self):
+        """Latest Guidance; a broken edit keeps the previous content until it is fixed."""
+        if self._clock() - self._checked < self.interval:
+            return self.guidance
+        with self._lock:
+            if self._clock() - self._checked < self.interval:
+                return self.guidance
+            self._checked = self._clock()
+            try:
+                stamp = self._stat()
+                if stamp != self._stamp:
+                    self.guidance = read_guidance(self.path)
+                    self._stamp = stamp
+                    self.reloads += 1
+            except (OSError, ValueError, KeyError):
+                pass
+        return self.guidance
+
+
+@lru_cache(maxsize=None)
+def load_source(path=GUIDANCE_PATH):
+    return GuidanceSource(path)
+
+
+def current_guidance(path=GUIDANCE_PATH):
+    return load_source(path).current()
+
+
+def content_version(path=GUIDANCE_PATH):
+    """Declared version and content hash of the guidance file ("1:ab12..."), for caches built from it."""
+    guidance = current_guidance(path)
+    return f"{guidance.version}:{guidance.digest}"
+
+
+# ==============================================
+# Lookups
+# ==============================================
+def _stage(guidance, stage):
+    return guidance.stage_aliases.get(stage, stage)
+
+
+def _conditions(guidance, conditions):
+    names = (guidance.condition_aliases.get(c, c) for c in conditions or ())
+    return [c for c in dict.fromkeys(names) if c and c != "None"]
+
 
 def get_meal_ideas(region):
-    meals = {
-        "South Asia": ["Lentil soup (dal)", "Chapati with spinach", "Boiled eggs", "Chickpea salad"],
-        "Africa": ["Maize porridge", "Stewed greens", "Grilled plantains", "Beans and rice"],
-        "Europe": ["Whole grain toast with hummus", "Boiled eggs & kale", "Salmon & potatoes"],
-        "North America": ["Oatmeal with flaxseed", "Quinoa & black beans", "Avocado toast"],
-        "Other": ["Seasonal fruit bowl", "Rice and legumes", "Vegetable stir fry"]
-    }
-    return meals.get(region, meals["Other"])
+    guidance = current_guidance()
+    return list(guidance.meal_ideas.get(region, guidance.meal_ideas[guidance.default_region]))
+
 
 def get_weekly_overview():
-    return {
-        "Monday": "Focus on hydration and iron-rich foods (e.g., lentils, leafy greens)",
-        "Tuesday": "Include one dairy-based snack (yogurt or paneer)",
-        "Wednesday": "Vitamin C boost: citrus fruits, tomatoes",
-        "Thursday": "High-protein day: beans, tofu, or chicken",
-        "Friday": "Add fermented foods like yogurt or kefir",
-        "Saturday": "Go fiber-heavy: oats, carrots, whole grains",
-        "Sunday": "Rest and prep day: Soups, smoothies, meal prep"
-    }
+    return dict(current_guidance().weekly_overview)
+
+
+def get_weekly_focus():
+    """{day: meal catalog tags matching that day's overview}, e.g. {"Monday": ("iron",), ...}."""
+    return dict(current_guidance().weekly_focus)
+
 
 def get_condition_tips(conditions):
-    tips = {
-        "Diabetes": "Limit sugar, eat complex carbs, and avoid processed snacks.",
-        "Hypertension": "Reduce salt intake and consume potassium-rich foods like bananas.",
-        "PCOS": "Balance protein and fiber, avoid refined carbs.",
-        "Thyroid Issues": "Include iodine-rich foods and avoid excessive soy."
-    }
-    return [tips[c] for c in conditions] if conditions else ["Maintain a balanced, whole-food-based diet."]
+    guidance = current_guidance()
+    matched = [guidance.condition_tips[c] for c in _conditions(guidance, conditions) if c in guidance.condition_tips]
+    return matched if matched else [guidance.default_condition_tip]
+
 
 def get_stage_tips(stage):
-    stage_dict = {
-        "0-6 Months": "Focus on foods that boost milk production like oats, garlic, and fennel.",
-        "6-12 Months": "Support energy with proteins and iron-rich foods as baby starts solids.",
-        "12+ Months": "Prioritize calcium and variety for both mother and baby as weaning may begin."
-    }
-    return stage_dict.get(stage, "")
+    guidance = current_guidance()
+    return guidance.stage_tips.get(_stage(guidance, stage), "")
+
 
 def get_feeding_advice(stage):
-    tips = {
-        "0-6 Months": "Ensure frequent breastfeeding (8–12 times/day) to establish supply.",
-        "6-12 Months": "Combine breastfeeding with solid foods; maintain iron and zinc intake.",
-        "12+ Months": "Breastfeeding is still beneficial; allow the baby to lead the weaning process."
-    }
-    return tips.get(stage, "")
+    guidance = current_guidance()
+    return guidance.feeding_advice.get(_stage(guidance, stage), "")
+
+
+# Keyed on the content digest, so a reload never serves results built from the old file
+@lru_cache(maxsize=1024)
+def _guidance_for(region, stage, conditions, digest, path):
+    guidance = load_source(path).guidance
+    stage = _stage(guidance, stage)
+    tips = [guidance.condition_tips[c] for c in conditions if c in guidance.condition_tips]
+    return MappingProxyType({
+        "meal_ideas": guidance.meal_ideas.get(region, guidance.meal_ideas[guidance.default_region]),
+        "condition_tips": tuple(tips) or (guidance.default_condition_tip,),
+        "stage_tips": guidance.stage_tips.get(stage, ""),
+        "feeding_advice": guidance.feeding_advice.get(stage, ""),
+        "version": f"{guidance.version}:{guidance.digest}",
+    })
+
+
+def get_guidance(profile, path=GUIDANCE_PATH):
+    """Meal ideas, condition tips, stage tips and feeding advice for a profile in one call.
+
+    Uses the profile's region, bf_duration (or bf_stage) and conditions; results
+    are memoized per combination and shared, so they come back read-only.
+    """
+    guidance = current_guidance(path)
+    stage = profile.get("bf_duration") or profile.get("bf_stage")
+    conditions = tuple(sorted(_conditions(guidance, profile.get("conditions"))))
+    return _guidance_for(profile.get("region"), stage, conditions, guidance.digest, path)
@@ -1,7 +1,33 @@
+import hashlib
+import os
+import pickle
+
+import joblib
+import numpy as np
 import pandas as pd
+import sklearn
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.preprocessing import LabelEncoder
 
+from cache_utils import CACHE_DIR
+from stages import STAGE_BY_DURATION
+
+# Bump when the training data, features or artifact layout change so stale
+# artifacts are rejected and rebuilt.
+SCHEMA_VERSION = 1
+# Bump when predictions change without the artifact changing (e.g. how unknown
+# inputs are answered) so caches of predictions are rebuilt.
+PREDICTION_VERSION = 2
+FEATURES = ['age', 'region_enc', 'stage_enc', 'health_enc']
+# Kept in the user's cache directory, not the package, so read-only installs can still
+# write it once instead of retraining in every process
+ARTIFACT_PATH = os.environ.get("NUTRIMAMA_MODEL_ARTIFACT", os.path.join(CACHE_DIR, "nutrition_model.joblib"))
+# Set to 1 to precompute every onboarding-form answer at load time (see compile_predictions)
+COMPILED_MODE = os.environ.get("NUTRIMAMA_COMPILED_MODEL", "0") == "1"
+
+# Age groups offered by the onboarding form and the age each one is scored at
+AGE_GROUPS = {"18-25": 22, "26-35": 30, "36-45": 40, "45+": 48}
+
 # Sample dataset
 data = pd.DataFrame({
     'age': [25, 30, 35, 28, 40, 33, 27, 31],
@@ -20,30 +46,329 @@ data = pd.DataFrame({
     ]
 })
 
-# Encode categorical values
-le_region = LabelEncoder()
-le_stage = LabelEncoder()
-le_health = LabelEncoder()
-le_output = LabelEncoder()
 
-data['region_enc'] = le_region.fit_transform(data['region'])
-data['stage_enc'] = le_stage.fit_transform(data['breastfeeding_stage'])
-data['health_enc'] = le_health.fit_transform(data['health_condition'])
-data['plan_enc'] = le_output.fit_transform(data['nutrition_plan'])
+# ==============================================
+# TRAINING
+# ==============================================
+def train_model(df=data):
+    """Fit the encoders and the tree; returns the bundle stored in the artifact."""
+    df = df.copy()
+    le_region = LabelEncoder()
+    le_stage = LabelEncoder()
+    le_health = LabelEncoder()
+    le_output = LabelEncoder()
+
+    df['region_enc'] = le_region.fit_transform(df['region'])
+    df['stage_enc'] = le_stage.fit_transform(df['breastfeeding_stage'])
+    df['health_enc'] = le_health.fit_transform(df['health_condition'])
+    df['plan_enc'] = le_output.fit_transform(df['nutrition_plan'])
+
+    # Fixed seed so every worker that has to fall back to training gets the same tree
+    model = DecisionTreeClassifier(random_state=0)
+    model.fit(df[FEATURES], df['plan_enc'])
+
+    return {
+        "model": model,
+        "le_region": le_region,
+        "le_stage": le_stage,
+        "le_health": le_health,
+        "le_output": le_output,
+    }
+
+
+def model_fingerprint(df=data):
+    """Identifies what an artifact was trained from: schema, data and sklearn version."""
+    h = hashlib.sha256()
+    h.update(f"schema={SCHEMA_VERSION};sklearn={sklearn.__version__};".encode())
+    h.update(df.to_csv(index=False).encode())
+    return h.hexdigest()
+
+
+# ==============================================
+# ARTIFACT BUILD / LOAD
+# ==============================================
+def build_artifact(path=ARTIFACT_PATH, bundle=None):
+    """Train (unless a bundle is given) and write the versioned artifact to `path`."""
+    if bundle is None:
+        bundle = train_model()
+    payload = pickle.dumps(bundle, protocol=pickle.HIGHEST_PROTOCOL)
+    artifact = {
+        "schema": SCHEMA_VERSION,
+        "fingerprint": model_fingerprint(),
+        "sha256": hashlib.sha256(payload).hexdigest(),
+        "payload": payload,
+    }
+    # Write to a temp file and rename so concurrent workers never read a partial file
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    joblib.dump(artifact, tmp_path)
+    os.replace(tmp_path, path)
+    return artifact["sha256"]
+
+
+def _verified_artifact(path):
+    """(bundle, payload sha256) stored at `path`, or None if missing, corrupt or stale."""
+    if not os.path.exists(path):
+        return None
+    try:
+        artifact = joblib.load(path)
+    except Exception:
+        return None
+    if not isinstance(artifact, dict):
+        return None
+    if artifact.get("schema") != SCHEMA_VERSION or artifact.get("fingerprint") != model_fingerprint():
+        return None
+    payload = artifact.get("payload", b"")
+    if hashlib.sha256(payload).hexdigest() != artifact.get("sha256"):
+        return None
+    return pickle.loads(payload), artifact["sha256"]
+
+
+def load_artifact(path=ARTIFACT_PATH):
+    """Return the bundle stored at `path`, or None if missing, corrupt or stale."""
+    verified = _verified_artifact(path)
+    return verified[0] if verified else None
+
+
+_loaded_bundle = None
+_loaded_sha256 = None
+
+
+def load_model(path=ARTIFACT_PATH):
+    """Load the model bundle once per process, retraining only if the artifact is unusable."""
+    global _loaded_bundle, _loaded_sha256
+    if _loaded_bundle is None:
+        verified = _verified_artifact(path)
+        if verified is None:
+            bundle = train_model()
+            try:
+                sha256 = build_artifact(path, bundle)
+            except OSError:
+                # Read-only deployments still work; they just retrain per process
+                sha256 = hashlib.sha256(pickle.dumps(bundle, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+            verified = bundle, sha256
+        _loaded_bundle, _loaded_sha256 = verified
+    return _loaded_bundle
+
+
+def artifact_sha256():
+    """Content hash of the loaded model artifact, for caches built from its predictions."""
+    load_model()
+    return _loaded_sha256
+
+
+_bundle = load_model()
+model = _bundle["model"]
+le_region = _bundle["le_region"]
+le_stage = _bundle["le_stage"]
+le_health = _bundle["le_health"]
+le_output = _bundle["le_output"]
+
+
+# ==============================================
+# FEATURE ENCODING
+# ==============================================
+# Values the onboarding form offers but the training data lacks land in an explicit
+# "unknown" bucket: one code past the known classes. Every lookup below is a dict
+# get with that default, so an unknown value costs the same as a known one.
+#
+# The tree never saw those codes (they just fall on the high side of every split),
+# so its answer for them is meaningless: a Hypertension profile would be scored
+# like Thyroid. Any profile with an unknown region, stage or condition therefore
+# gets GENERAL_PLAN instead of a prediction.
+UNKNOWN = "Unknown"
+GENERAL_PLAN = "General maintenance plan"
+
+# Ages the form can't describe (missing or unparseable) are scored at the training median
+DEFAULT_AGE = int(data['age'].median())
+
+# Form labels that name a training class differently
+CONDITION_ALIASES = {"Thyroid Issues": "Thyroid", "": "None"}
+
+# When a profile lists several conditions, the model is fed the first of these it has
+CONDITION_PRIORITY = ["Anemia", "Diabetes", "Thyroid"]
+
+
+def _code_table(encoder, aliases=None):
+    table = {value: code for code, value in enumerate(encoder.classes_)}
+    for alias, value in (aliases or {}).items():
+        if value in table:
+            table[alias] = table[value]
+    return table
+
+
+_region_codes = _code_table(le_region)
+_stage_codes = _code_table(le_stage, STAGE_BY_DURATION)
+_health_codes = _code_table(le_health, CONDITION_ALIASES)
+UNKNOWN_REGION = len(le_region.classes_)
+UNKNOWN_STAGE = len(le_stage.classes_)
+UNKNOWN_HEALTH = len(le_health.classes_)
+_health_priority = {
+    _health_codes[c]: rank for rank, c in enumerate(CONDITION_PRIORITY) if c in _health_codes
+}
+_no_condition = _health_codes.get("None", UNKNOWN_HEALTH)
+_general_plan = int(np.flatnonzero(le_output.classes_ == GENERAL_PLAN)[0])
+
+
+def encode_age(age):
+    """Age group label ("26-35"), integer or digit string -> numeric model age."""
+    if isinstance(age, str):
+        if age in AGE_GROUPS:
+            return AGE_GROUPS[age]
+        return int(age) if age.isdigit() else DEFAULT_AGE
+    if age is None or age != age:  # None or NaN
+        return DEFAULT_AGE
+    return int(age)
+
+
+def encode_region(region):
+    return _region_codes.get(region, UNKNOWN_REGION)
+
+
+def encode_stage(stage):
+    return _stage_codes.get(stage, UNKNOWN_STAGE)
+
+
+def encode_conditions(conditions):
+    """Condition name, comma-separated string or list -> a single health code.
+
+    No conditions (or only "None") encodes as "None". Otherwise the highest-priority
+    condition the model knows wins, and a list of only unknown conditions is
+    UNKNOWN_HEALTH (answered with GENERAL_PLAN).
+    """
+    if conditions is None:
+        return _no_condition
+    if isinstance(conditions, str):
+        if conditions in _health_codes:
+            return _health_codes[conditions]
+        conditions = conditions.split(",")
+    codes = {_health_codes.get(str(c).strip(), UNKNOWN_HEALTH) for c in conditions}
+    codes.discard(_no_condition)
+    if not codes:
+        return _no_condition
+    known = [c for c in codes if c in _health_priority]
+    if known:
+        return min(known, key=_health_priority.get)
+    return min(codes)
+
+
+def encode_profile(age, region, stage, health):
+    return (encode_age(age), encode_region(region), encode_stage(stage), encode_conditions(health))
+
+
+def _predict_codes(X):
+    """Plan codes for encoded rows; rows with an unknown code get GENERAL_PLAN."""
+    X = np.asarray(X)
+    codes = model.predict(pd.DataFrame(X, columns=FEATURES))
+    unknown = (X[:, 1] == UNKNOWN_REGION) | (X[:, 2] == UNKNOWN_STAGE) | (X[:, 3] == UNKNOWN_HEALTH)
+    codes[unknown] = _general_plan
+    return codes
 
-# Model training
-X = data[['age', 'region_enc', 'stage_enc', 'health_enc']]
-y = data['plan_enc']
-model = DecisionTreeClassifier()
-model.fit(X, y)
 
 # Prediction function
 def predict_nutrition(age, region, stage, health):
-    input_df = pd.DataFrame([[
-        age,
-        le_region.transform([region])[0],
-        le_stage.transform([stage])[0],
-        le_health.transform([health])[0]
-    ]])
-    prediction = model.predict(input_df)
-    return le_output.inverse_transform(prediction)[0]
+    row = encode_profile(age, region, stage, health)
+    if _compiled is not None and isinstance(age, str) and age in _compiled["age_index"]:
+        return _compiled["plans"][_compiled["table"][(_compiled["age_index"][age],) + row[1:]]]
+    return le_output.classes_[_predict_codes([row])[0]]
+
+
+# ==============================================
+# BATCH PREDICTION
+# ==============================================
+def _encode_column(values, encode):
+    # Encode each distinct value once, then broadcast the codes back over the column
+    values = pd.Series(values, dtype=object)
+    try:
+        positions, uniques = pd.factorize(values, use_na_sentinel=True)
+    except TypeError:
+        # Lists of conditions aren't hashable; factorize them as tuples
+        values = values.map(lambda v: tuple(v) if isinstance(v, list) else v)
+        positions, uniques = pd.factorize(values, use_na_sentinel=True)
+    # Missing values get position -1, which picks the appended encode(None)
+    codes = np.array([encode(v) for v in uniques] + [encode(None)], dtype=np.int64)
+    return codes[positions]
+
+
+def predict_nutrition_batch(profiles=None, age=None, region=None, stage=None, health=None):
+    """Score many profiles with one encoding pass and one model.predict call.
+
+    Pass either a DataFrame with `age`, `region`, `stage` and `health` columns
+    (`breastfeeding_stage` / `health_condition` are accepted too), or equal-length
+    sequences via the keyword arguments. Values are encoded and answered as in
+    predict_nutrition.
+    Returns a NumPy array of plan strings.
+    """
+    if profiles is not None:
+        profiles = pd.DataFrame(profiles)
+        age = profiles['age']
+        region = profiles['region']
+        stage = profiles['stage'] if 'stage' in profiles else profiles['breastfeeding_stage']
+        health = profiles['health'] if 'health' in profiles else profiles['health_condition']
+
+    X = np.column_stack([
+        _encode_column(age, encode_age),
+        _encode_column(region, encode_region),
+        _encode_column(stage, encode_stage),
+        _encode_column(health, encode_conditions),
+    ])
+    if len(X) == 0:
+        return np.empty(0, dtype=object)
+    return le_output.classes_[_predict_codes(X)]
+
+
+# ==============================================
+# COMPILED MODE
+# ==============================================
+_compiled = None
+
+
+def compile_predictions():
+    """Score the whole form input space once and serve predict_nutrition from a dense table.
+
+    Axes are the onboarding age groups and every region, stage and health code,
+    including the unknown buckets. Inputs outside that domain (e.g. raw integer
+    ages) still go through the tree. Returns compiled_table_info().
+    """
+    global _compiled
+    shape = (len(AGE_GROUPS), UNKNOWN_REGION + 1, UNKNOWN_STAGE + 1, UNKNOWN_HEALTH + 1)
+    grid = np.indices(shape).reshape(len(shape), -1)
+
+    X = np.column_stack([
+        np.array(list(AGE_GROUPS.values()), dtype=np.int64)[grid[0]],
+        grid[1],
+        grid[2],
+        grid[3],
+    ])
+    codes = _predict_codes(X)
+    dtype = np.uint8 if len(le_output.classes_) <= np.iinfo(np.uint8).max else np.uint16
+
+    _compiled = {
+        "table": codes.astype(dtype).reshape(shape),
+        "age_index": {group: i for i, group in enumerate(AGE_GROUPS)},
+        "plans": le_output.classes_,
+    }
+    return compiled_table_info()
+
+
+def compiled_table_info():
+    """Shape and memory footprint of the compiled table, or None if not compiled."""
+    if _compiled is None:
+        return None
+    table = _compiled["table"]
+    return {
+        "shape": table.shape,
+        "entries": int(table.size),
+        "table_bytes": int(table.nbytes),
+        "plans_bytes": int(sum(len(p) for p in _compiled["plans"])),
+    }
+
+
+if COMPILED_MODE:
+    compile_predictions()
+
+
+if __name__ == "__main__":
+    # Build step: python nutrition_model.py
+    digest = build_artifact()
+    print(f"Wrote {ARTIFACT_PATH} (sha256={digest})")
@@ -3,6 +3,10 @@ import pandas as pd
 from datetime import datetime
 from PIL import Image
 import os
+from barcode_scan import load_index as load_barcode_index, scan_async
+from fuzzy_index import normalize
+from medication_db import category_level, check_lactation_safety, split_medications
+from user_session import restore_session
 
 # =============================================
 # PAGE CONFIGURATION
@@ -116,61 +120,108 @@ def daily_tip():
     tip = "Did you know? Adding spinach to smoothies boosts iron intake without changing the flavor!"
     st.info(f"💡 Today's Tip: {tip}")
 
+# Polls the barcode decode running on a worker thread, so the rest of the page
+# stays responsive; once it resolves the page reruns to show the product.
+@st.fragment(run_every=0.5)
+def wait_for_scan():
+    future = st.session_state.scan_future
+    if not future.done():
+        st.info("🔍 Reading barcode...")
+        return
+    st.session_state.scan_future = None
+    try:
+        st.session_state.scan_result = future.result()
+    except Exception:
+        st.session_state.scan_result = ([], None)
+    st.rerun()
+
+def scanned_medication():
+    for key in ("scan_photo", "scan_future", "scan_result"):
+        if key not in st.session_state:
+            st.session_state[key] = None
+
+    photo = st.camera_input("Scan medication barcode", key="barcode_scan")
+    if photo is not None and photo.file_id != st.session_state.scan_photo:
+        st.session_state.scan_photo = photo.file_id
+        st.session_state.scan_future = scan_async(photo.getvalue())
+        st.session_state.scan_result = None
+    typed_code = st.text_input("...or enter the barcode number", placeholder="e.g., 2000000000015")
+
+    if typed_code:
+        product = load_barcode_index().lookup(typed_code)
+        codes = [typed_code]
+    elif st.session_state.scan_future is not None:
+        wait_for_scan()
+        return None
+    elif st.session_state.scan_result is not None:
+        codes, product = st.session_state.scan_result
+    else:
+        return None
+
+    if product:
+        st.success(f"📦 {product.name} ({product.code})")
+        return product.medication
+    if codes:
+        st.warning(f"Barcode {codes[0]} isn't in the local product list. Try searching by name.")
+    else:
+        st.warning("Couldn't read a barcode. Hold the package steady with the barcode filling the frame, or type the number.")
+    return None
+
 def medication_safety_section():
     st.subheader("💊 Medication Safety Checker for Breastfeeding")
     med_input = st.radio("Input Method:", ["Search Manually", "Scan Barcode"], horizontal=True)
 
     if med_input == "Scan Barcode":
-        st.camera_input("Scan medication barcode", key="barcode_scan")
-        medication = "BarcodeScannedDrug123"
+        medication = scanned_medication()
     else:
-        medication = st.text_input("Enter medication name", placeholder="e.g., Ibuprofen")
+        medication = st.text_input(
+            "Enter medication name(s)",
+            placeholder="e.g., Ibuprofen, Sertraline",
+            help="Separate several medications with commas to check them together, including interactions."
+        )
 
     infant_age = None
     with st.expander("Infant Details (Optional)"):
         infant_age = st.selectbox("Infant Age", ["Newborn (0-1 month)", "1-6 months", "6+ months"])
 
+    for key, default in (("safety_query", None), ("confirmed_names", {})):
+        if key not in st.session_state:
+            st.session_state[key] = default
+
     if st.button("Check Safety"):
-        if med_input == "Search Manually" and not medication:
-            st.warning("Please enter a medication name")
+        if not medication:
+            st.warning("Please enter a medication name" if med_input == "Search Manually" else "Please scan a medication barcode")
         else:
-            safety_data = check_lactation_safety(medication, infant_age or "1-6 months")
-            display_safety_results(safety_data)
-
-def check_lactation_safety(drug_name, infant_age="1-6 months"):
-    lactation_db = {
-        "ibuprofen": {
-            "category": "L2 (Compatible)",
-            "transfer": "Minimal (<1% of dose)",
-            "effects": "No adverse effects reported",
-            "recommendation": "Usually safe",
-            "alternatives": ["Acetaminophen (if preferred)"]
-        },
-        "pseudoephedrine": {
-            "category": "L3 (Probably Safe)",
-            "transfer": "Low (0.5-3%)",
-            "effects": "May decrease milk supply",
-            "recommendation": "Monitor supply, avoid in first month",
-            "alternatives": ["Saline nasal spray"]
-        },
-        "accutane": {
-            "category": "L5 (Contraindicated)",
-            "transfer": "High (theoretical risk)",
-            "effects": "Severe potential toxicity",
-            "recommendation": "ABSOLUTELY AVOID",
-            "alternatives": ["Topical retinoids (consult doctor)"]
-        }
-    }
-    return lactation_db.get(drug_name.lower(), {
-        "category": "L4 (Limited Data)",
-        "transfer": "Unknown",
-        "effects": "Insufficient information",
-        "recommendation": "Consult healthcare provider",
-        "alternatives": []
-    })
-
-def display_safety_results(data):
-    st.success(f"**Safety Category**: {data['category']}")
+            st.session_state.safety_query = medication
+
+    # Results stay up (e.g. while confirming a suggestion) until the input changes
+    if medication and st.session_state.safety_query == medication:
+        confirmed = st.session_state.confirmed_names
+        names = [confirmed.get(normalize(name), name) for name in split_medications(medication)]
+        safety_data = check_lactation_safety(", ".join(names), infant_age or "1-6 months")
+        if "drugs" in safety_data:
+            display_combined_results(safety_data)
+        else:
+            display_safety_results(safety_data, names[0] if names else medication)
+
+def confirm_suggestion(query, name):
+    st.session_state.confirmed_names[normalize(query)] = name
+
+def suggestion_buttons(query, suggestions):
+    """A close spelling is only rated once the user picks it; it may be a different drug."""
+    st.warning(f"**{query}** isn't in the medication list. Did you mean:")
+    for column, name in zip(st.columns(len(suggestions)), suggestions):
+        column.button(name, key=f"suggest_{query}_{name}", on_click=confirm_suggestion, args=(query, name))
+
+def display_safety_results(data, query):
+    if data.get("matched"):
+        brands = f" ({', '.join(data['brands'])})" if data.get("brands") else ""
+        st.caption(f"Showing results for **{data['matched']}**{brands}")
+        st.success(f"**Safety Category**: {data['category']}")
+    else:
+        if data.get("suggestions"):
+            suggestion_buttons(query, data["suggestions"])
+        st.warning(f"**Safety Category**: {data['category']}")
     st.write(f"**Milk Transfer**: {data['transfer']}")
     st.write(f"**Infant Effects**: {data['effects']}")
     st.write(f"**Recommendation**: {data['recommendation']}")
@@ -179,6 +230,42 @@ def display_safety_results(data):
         for alt in data["alternatives"]:
             st.markdown(f"- {alt}")
 
+SEVERITY_ICONS = {"major": "🔴", "moderate": "🟠", "minor": "🟡"}
+
+def display_combined_results(report):
+    worst = report["worst"]
+    level = category_level(worst["category"])
+    summary = f"**Highest risk**: {worst['category']} ({worst.get('matched') or worst['query']})"
+    if level >= 4:
+        st.error(summary)
+    elif level == 3 or any(i.severity == "major" for i in report["interactions"]):
+        st.warning(summary)
+    else:
+        st.success(summary)
+
+    st.dataframe(
+        pd.DataFrame([{
+            "Entered": d["query"],
+            "Medication": d["matched"] or "Not found",
+            "Category": d["category"],
+            "Recommendation": d["recommendation"],
+        } for d in report["drugs"]]),
+        hide_index=True,
+        use_container_width=True
+    )
+    for drug in report["drugs"]:
+        if not drug["matched"] and drug["suggestions"]:
+            suggestion_buttons(drug["query"], drug["suggestions"])
+
+    st.write("**Interactions**:")
+    if not report["interactions"]:
+        st.caption("No known interactions between these medications.")
+    for interaction in report["interactions"]:
+        icon = SEVERITY_ICONS.get(interaction.severity, "⚪")
+        st.markdown(
+            f"- {icon} **{interaction.drug_a} + {interaction.drug_b}** ({interaction.severity}): {interaction.description}"
+        )
+
 def feature_navigation_cards():
     st.subheader("Explore Features")
 
@@ -233,6 +320,7 @@ def main():
     set_ui_theme()
     load_image("assets/logo.png", width=140)
 
+    restore_session()
     if 'user_profile' not in st.session_state or not st.session_state.user_profile:
         st.warning("🚨 Please complete onboarding first.")
         st.markdown("Click **'NutriMama'** in the left menu to begin onboarding.")
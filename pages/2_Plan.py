@@ -1,6 +1,12 @@
 import streamlit as st
-from gradio_client import Client
 from datetime import datetime
+import numpy as np
+from meal_planner import plan_key, plan_week
+from nutrient_engine import NUTRIENT_KEYS, POSITION, progress_table
+from nutrition_helpers import content_version, get_weekly_overview
+from recommendation_cache import current_cache
+from recommender import AsyncRecommender, backend_name, get_backend
+from user_session import restore_session
 
 # =============================================
 # PAGE CONFIG & THEME
@@ -81,6 +87,7 @@ st.markdown("Get a personalized meal recommendation based on your **region**, **
 # =============================================
 # SESSION CHECK
 # =============================================
+restore_session()
 if 'user_profile' not in st.session_state or not st.session_state.user_profile:
     st.warning("🚨 Please complete onboarding first.")
     st.markdown("Click **'NutriMama'** in the left menu to begin onboarding.")
@@ -112,34 +119,116 @@ st.write(f"**Health Conditions:** {', '.join(user_profile['conditions']) if user
 # =============================================
 # GET MEAL PLAN
 # =============================================
+# One service per process, so the worker pool, in-flight requests and the remote
+# backend's client pool and result cache are shared by all sessions.
+# Backend is chosen in .streamlit/secrets.toml ([recommender] backend = "local" | "remote")
+@st.cache_resource
+def load_recommender(name):
+    return AsyncRecommender(get_backend(name))
+
+
+def show_meal_plan(result):
+    st.success(f"🎯 Recommended Plan: **{result['plan']}**")
+
+    if result.get("meal_ideas"):
+        st.subheader("🍽️ Meal Ideas")
+        for meal in result["meal_ideas"]:
+            st.markdown(f"- {meal}")
+
+    if result.get("tips"):
+        st.subheader("Tips")
+        for tip in result["tips"]:
+            st.markdown(f"- {tip}")
+
+    if result.get("stage_tips"):
+        st.info(f"🍼 {result['stage_tips']}")
+
+
+# Polls the pending request without rerunning the whole page; once it resolves the
+# result moves into session state and the page reruns to render it.
+@st.fragment(run_every=0.5)
+def wait_for_meal_plan():
+    future = st.session_state.plan_future
+    if not future.done():
+        st.info("⏳ Fetching your personalized meal plan...")
+        return
+    st.session_state.plan_future = None
+    try:
+        st.session_state.plan_result = future.result()
+        st.session_state.plan_error = None
+    except Exception as e:
+        st.session_state.plan_result = None
+        st.session_state.plan_error = str(e)
+    st.rerun()
+
+
+for key in ("plan_future", "plan_result", "plan_error"):
+    if key not in st.session_state:
+        st.session_state[key] = None
+
 st.markdown("---")
 if st.button("Get Meal Plan"):
-    profile = st.session_state.user_profile
-    with st.spinner("Fetching your personalized meal plan..."):
-        try:
-            client = Client("ayeshaqamar/nutrition-api")
-
-            health_input = ", ".join(profile["conditions"])
-
-            result = client.predict(
-                age=profile["age"],
-                region=profile["region"],
-                stage=profile["bf_stage"],
-                health_condition=health_input,
-                api_name="/predict"
-            )
-
-            st.success(f"🎯 Recommended Plan: **{result['plan']}**")
-
-            if result.get("meal_ideas"):
-                st.subheader("🍽️ Meal Ideas")
-                for meal in result["meal_ideas"]:
-                    st.markdown(f"- {meal}")
-
-            if result.get("tips"):
-                st.subheader("Tips")
-                for tip in result["tips"]:
-                    st.markdown(f"- {tip}")
-
-        except Exception as e:
-            st.error(f"⚠️ Error fetching meal plan: {e}")
+    backend = backend_name(st.secrets.get("recommender", {}).get("backend"))
+    # The precomputed cache (python recommendation_cache.py) holds the local model's
+    # answer for every onboarding profile; anything else goes to the backend
+    cache = current_cache() if backend == "local" else None
+    cached = cache.recommendation(st.session_state.user_profile) if cache else None
+    if cached:
+        st.session_state.plan_future = None
+        st.session_state.plan_result = cached
+    else:
+        service = load_recommender(backend)
+        st.session_state.plan_future = service.submit(st.session_state.user_profile)
+        st.session_state.plan_result = None
+    st.session_state.plan_error = None
+
+if st.session_state.plan_future is not None:
+    wait_for_meal_plan()
+elif st.session_state.plan_error:
+    st.error(f"⚠️ Error fetching meal plan: {st.session_state.plan_error}")
+elif st.session_state.plan_result:
+    show_meal_plan(st.session_state.plan_result)
+
+
+# =============================================
+# WEEKLY MEAL PLAN
+# =============================================
+# Plans are deterministic per profile key, so every session with the same answers
+# shares one solve; new guidance content gives new plans
+@st.cache_data(max_entries=512, show_spinner=False)
+def weekly_plan(key, guidance_version):
+    region, stage, conditions, meals_per_day = key
+    return plan_week({"region": region, "bf_stage": stage, "conditions": list(conditions)}, meals_per_day)
+
+
+st.markdown("---")
+st.subheader("🗓️ Your Weekly Meal Plan")
+meals_per_day = st.radio("Meals per day", [3, 4, 5], index=1, horizontal=True)
+cache = current_cache()
+weekly = cache.weekly_plan(user_profile, meals_per_day) if cache else None
+if weekly is None:
+    weekly = weekly_plan(plan_key(user_profile, meals_per_day), content_version())
+
+overview = get_weekly_overview()
+for day, day_meals in weekly.meals.groupby("day", sort=False):
+    with st.expander(f"**{day}** — {overview.get(day, '')}"):
+        for meal in day_meals.itertuples():
+            servings = f" × {meal.servings:g}" if meal.servings != 1 else ""
+            st.markdown(f"- **{meal.slot.title()}**: {meal.meal}{servings} ({meal.calories:.0f} kcal)")
+
+# Average planned day against the profile's goals, for the nutrients the catalog covers
+average = np.zeros(len(NUTRIENT_KEYS))
+covered = np.full(len(NUTRIENT_KEYS), np.nan)
+for key, value in weekly.daily.mean().items():
+    average[POSITION[key]] = value
+    covered[POSITION[key]] = weekly.goals[POSITION[key]]
+coverage = progress_table(average, covered)
+st.caption("An average day of this plan against your daily goals")
+st.dataframe(
+    coverage[["nutrient", "percent"]],
+    column_config={
+        "nutrient": "Nutrient",
+        "percent": st.column_config.ProgressColumn("% of goal", format="%.0f%%", min_value=0, max_value=100),
+    },
+    hide_index=True
+)
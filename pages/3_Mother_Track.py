@@ -1,8 +1,16 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import requests
 from datetime import date, datetime
+import nutrient_db
+from charts import cached_spec, downsample
+from food_resolver import load_resolver
+from meal_batch import parse_meal_csv, parse_meal_text, score_meals
+from nutrient_engine import NUTRIENTS, POSITION, percent_of_goal, profile_goals, progress_table, to_vector
+from portions import DEFAULT_SIZE, portion_options, scale
+from storage import StorageError
+from usda_client import USDAClient
+from user_session import current_user_id, get_repository, load_once, restore_session
 
 
 # --- Load USDA API key securely ---
@@ -85,6 +93,7 @@ st.markdown(
 # =============================================
 # SESSION CHECK: Show message if no profile
 # =============================================
+restore_session()
 if 'user_profile' not in st.session_state or not st.session_state.user_profile:
     st.warning("🚨 Please complete onboarding first.")
     st.markdown("Click **'NutriMama'** in the left menu to begin onboarding.")
@@ -94,64 +103,112 @@ st.title("NutriMama Tracker")
 
 
 # --- USDA Nutrient Fetcher ---
+# Local FoodData Central copy first (built with `python nutrient_db.py import ...`),
+# then the live API unless disabled with [nutrients] api_fallback = false in secrets.toml
+USDA_API_FALLBACK = st.secrets.get("nutrients", {}).get("api_fallback", True)
+
+
+# One client per process: pooled HTTP session plus memory and on-disk caches
+@st.cache_resource
+def load_usda_client(api_key):
+    return USDAClient(api_key)
+
+
+# Typo-tolerant food name index, built once per process from the local FDC names
+@st.cache_resource
+def load_food_resolver():
+    return load_resolver()
+
+
+usda_client = load_usda_client(usda_api_key)
+
+
+# Thread-safe: bulk entry calls this from a worker pool
 def get_nutrient_info(food_name):
-    url = "https://api.nal.usda.gov/fdc/v1/foods/search"
-    params = {
-        "query": food_name,
-        "api_key": usda_api_key,
-        "pageSize": 1
-    }
-    response = requests.get(url, params=params)
-    if response.status_code == 200:
-        data = response.json()
-        if data["foods"]:
-            nutrients = data["foods"][0]["foodNutrients"]
-            return {n["nutrientName"]: n["value"] for n in nutrients}
-    return {}
+    nutrients = nutrient_db.lookup(food_name)
+    if not nutrients and USDA_API_FALLBACK:
+        nutrients = usda_client.get_nutrient_info(food_name)
+    return nutrients
 
 
 # --- Initialize Session State ---
-if "total_vitamin_d" not in st.session_state:
-    st.session_state.total_vitamin_d = 0
-if "total_calcium" not in st.session_state:
-    st.session_state.total_calcium = 0
-if "total_protein" not in st.session_state:
-    st.session_state.total_protein = 0
-if "meals" not in st.session_state:
-    st.session_state.meals = []
+repository = get_repository()
+user_id = current_user_id()
+meal_log = load_once("meal_log", lambda repo, uid: repo.load_meals(uid))
+if "meal_page" not in st.session_state:
+    st.session_state.meal_page = 0
+
+
+# Storage assigns the meal ids; a meal it could not save is taken out of the log again
+def save_meals(meal_ids):
+    saved = repository.add_meals(user_id, meal_log.rows(meal_ids))
+    try:
+        repository.flush(user_id)
+    except StorageError as e:
+        st.session_state.save_error = str(e)
+    if saved.exception():
+        for meal_id in meal_ids:
+            meal_log.delete(meal_id)
+        return False
+    meal_log.set_stored_ids(meal_ids, saved.result())
+    return True
+
+
+if st.session_state.get("save_error"):
+    st.error(f"⚠️ Could not save meals: {st.session_state.save_error}")
+    st.session_state.save_error = None
 
 
 # --- Nutrient Summary with Progress Bars ---
 st.subheader("Today's Nutrient Summary")
 
 
-# Hard-coded daily goals
-VITAMIN_D_GOAL_IU = 400
-CALCIUM_GOAL_MG = 1000
-PROTEIN_GOAL_G = 50
+# Daily goals for the profile's breastfeeding stage and health conditions
+goals = profile_goals(st.session_state.user_profile)
+today_totals = meal_log.totals_vector(day=date.today())
+percent = percent_of_goal(today_totals, goals)
 
 
-# Display progress bars using session state
-st.progress(
-    min(st.session_state.total_vitamin_d / VITAMIN_D_GOAL_IU, 1.0),
-    text=f"Vitamin D ({st.session_state.total_vitamin_d:.1f} IU / {VITAMIN_D_GOAL_IU} IU)"
-)
-st.progress(
-    min(st.session_state.total_calcium / CALCIUM_GOAL_MG, 1.0),
-    text=f"Calcium ({st.session_state.total_calcium:.1f} mg / {CALCIUM_GOAL_MG} mg)"
-)
-st.progress(
-    min(st.session_state.total_protein / PROTEIN_GOAL_G, 1.0),
-    text=f"Protein ({st.session_state.total_protein:.1f} g / {PROTEIN_GOAL_G} g)"
-)
+# Headline nutrients as progress bars
+for key in ("vitamin_d", "calcium", "protein", "iron"):
+    i = POSITION[key]
+    nutrient = NUTRIENTS[i]
+    st.progress(
+        min(percent[i] / 100, 1.0),
+        text=f"{nutrient.label} ({today_totals[i]:.1f} {nutrient.unit} / {goals[i]:g} {nutrient.unit})"
+    )
 
 
-# Reset button
-if st.button("Reset All Nutrients"):
-    st.session_state.total_vitamin_d = 0
-    st.session_state.total_calcium = 0
-    st.session_state.total_protein = 0
-    st.session_state.meals = []
+# Every tracked nutrient, computed in the same vector operation
+with st.expander("All nutrients"):
+    progress = progress_table(today_totals, goals)
+    progress["goal"] = [("≤ " if kind == "limit" else "") + f"{goal:g} {unit}"
+                        for goal, unit, kind in zip(progress["goal"], progress["unit"], progress["kind"])]
+    progress["amount"] = [f"{amount:.1f} {unit}" for amount, unit in zip(progress["amount"], progress["unit"])]
+    st.dataframe(
+        progress[["nutrient", "amount", "goal", "percent"]],
+        column_config={
+            "nutrient": "Nutrient",
+            "amount": "Today",
+            "goal": "Daily goal",
+            "percent": st.column_config.ProgressColumn("% of goal", format="%.0f%%", min_value=0, max_value=100),
+        },
+        hide_index=True,
+        use_container_width=True
+    )
+    over = progress.loc[(progress["kind"] == "limit") & (progress["percent"] > 100), "nutrient"]
+    if len(over):
+        st.warning(f"Over today's limit: {', '.join(over)}")
+
+
+# Reset button: clears today's meals only, older days and the charts keep their history
+if st.button("Reset Today's Meals"):
+    for meal_id in meal_log.ids_on(date.today()):
+        stored_id = meal_log.stored_id(meal_id)
+        meal_log.delete(meal_id)
+        if stored_id is not None:
+            repository.delete_meal(user_id, stored_id)
+    st.session_state.meal_page = 0
     st.rerun()
 
 
@@ -159,78 +216,139 @@ if st.button("Reset All Nutrients"):
 st.subheader("🍽️ Log a Meal")
 
 
-with st.form("meal_form"):
-    meal_time = st.time_input("Meal Time", value=datetime.now().time())
-    meal_name = st.text_input("Food Name", placeholder="e.g., Grilled Chicken Breast")
-   
-    # User-friendly portion selection
-    portion = st.selectbox(
-        "Portion Size",
-        ["Small (100-150g)", "Medium (150-200g)", "Large (200-300g)"],
+# Outside the form so matching foods refresh as soon as the name is entered
+food_query = st.text_input("Food Name", placeholder="e.g., Grilled Chicken Breast")
+food_matches = [m.name for m in load_food_resolver().candidates(food_query)] if food_query else []
+
+
+# Also outside the form: the portion choices depend on the chosen food
+meal_name = food_query
+if food_matches:
+    choice = st.selectbox(
+        "Matching foods",
+        [f"Use as typed: {food_query}"] + food_matches,
         index=1,
-        help="Approximate serving size"
+        help="Closest matches in the nutrient database"
     )
-   
+    meal_name = food_query if choice.startswith("Use as typed: ") else choice
+# Household measures come from the local nutrient data, never from the API
+portion_choices = portion_options(nutrient_db.portions(meal_name)) if meal_name else portion_options([])
+
+
+with st.form("meal_form"):
+    meal_time = st.time_input("Meal Time", value=datetime.now().time())
+
+    # Amount in any of the food's household measures, a generic size or grams
+    amount_col, unit_col = st.columns([0.3, 0.7])
+    with amount_col:
+        amount = st.number_input("Amount", min_value=0.25, value=1.0, step=0.25)
+    with unit_col:
+        unit_labels = [label for label, _ in portion_choices]
+        unit = st.selectbox(
+            "Portion",
+            unit_labels,
+            index=unit_labels.index(DEFAULT_SIZE),
+            help="Household measures for this food, approximate sizes, or grams"
+        )
+
     submitted = st.form_submit_button("Add Meal")
 
 
 if submitted and meal_name:
     nutrients = get_nutrient_info(meal_name)
     if nutrients:
-        # Map portion to multiplier
-        portion_multiplier = {
-            "Small (100-150g)": 1.0,
-            "Medium (150-200g)": 1.5,
-            "Large (200-300g)": 2.0
-        }.get(portion, 1.0)
-       
-        # Calculate nutrients
-        vitamin_d = nutrients.get("Vitamin D (D2 + D3), International Units", 0) * portion_multiplier
-        calcium = nutrients.get("Calcium, Ca", 0) * portion_multiplier
-        protein = nutrients.get("Protein", 0) * portion_multiplier
-        calories = nutrients.get("Energy", 0) * portion_multiplier
-       
-        # Update session state
-        st.session_state.total_vitamin_d += vitamin_d
-        st.session_state.total_calcium += calcium
-        st.session_state.total_protein += protein
-       
+        # Scale the per-100 g nutrient vector to the portion's grams
+        grams = amount * dict(portion_choices)[unit]
+        if unit == "grams":
+            portion = f"{grams:g} g"
+        else:
+            portion = unit if amount == 1 else f"{amount:g} × {unit}"
+        values = scale(to_vector(nutrients), grams)
+        calories = round(values[POSITION["calories"]])
+
         # Add meal to log
-        st.session_state.meals.append({
-            "id": len(st.session_state.meals) + 1,
-            "name": meal_name,
-            "time": meal_time.strftime("%H:%M"),
-            "portion": portion,
-            "calories": round(calories),
-            "vitamin_d": vitamin_d,
-            "calcium": calcium,
-            "protein": protein
-        })
-       
-        st.success(f"Added: {meal_name} ({portion}, 🔥 {round(calories)} kcal)")
+        meal_id = meal_log.append(
+            meal_name,
+            meal_time.strftime("%H:%M"),
+            portion,
+            values,
+            calories=calories
+        )
+        if save_meals([meal_id]):
+            st.success(f"Added: {meal_name} ({portion}, {grams:.0f} g, 🔥 {calories} kcal)")
         st.rerun()
     else:
-        st.warning("No nutrient data found. Try a more specific name (e.g., 'Grilled Chicken Breast').")
+        if food_matches:
+            st.warning(f"No nutrient data found for '{meal_name}'. Try one of the matching foods above.")
+        else:
+            st.warning("No nutrient data found. Try a more specific name (e.g., 'Grilled Chicken Breast').")
+
+
+# --- Bulk Meal Entry ---
+with st.expander("📋 Add a whole day's meals at once"):
+    with st.form("bulk_meal_form"):
+        bulk_text = st.text_area(
+            "One meal per line",
+            placeholder="08:00, oatmeal, 1 cup\n13:00, lentil soup, 250g\n19:30, grilled chicken breast, medium",
+            help="Format: time, food, portion. Time (08:00 or 8am) and portion are optional; portion is small/medium/large, "
+                 "grams, or a household measure like 2 cups or 1 large."
+        )
+        bulk_file = st.file_uploader("...or upload a CSV (columns: food, time, portion)", type="csv")
+        bulk_submitted = st.form_submit_button("Add All Meals")
+
+if bulk_submitted:
+    default_time = datetime.now().strftime("%H:%M")
+    try:
+        bulk_meals, bad_rows = parse_meal_csv(bulk_file.getvalue(), default_time) if bulk_file else parse_meal_text(bulk_text, default_time)
+    except ValueError as e:
+        st.error(f"⚠️ Could not read meals: {e}")
+        bulk_meals, bad_rows = None, []
+
+    if bad_rows and (bulk_meals is None or bulk_meals.empty):
+        st.warning("Skipped: " + "; ".join(bad_rows))
+    if bulk_meals is not None and bulk_meals.empty:
+        st.warning("No meals found. Enter one food per line or upload a CSV.")
+    elif bulk_meals is not None:
+        with st.spinner(f"Looking up {bulk_meals['name'].nunique()} foods..."):
+            scored, missing, skipped = score_meals(bulk_meals, get_nutrient_info, portions=nutrient_db.portions)
+
+        # One state update and one rerun for the whole batch
+        save_meals(meal_log.extend(scored))
+        st.session_state.bulk_missing = missing
+        st.session_state.bulk_skipped = bad_rows + skipped
+        st.rerun()
+
+if st.session_state.get("bulk_missing"):
+    st.warning(f"No nutrient data found for: {', '.join(st.session_state.bulk_missing)}")
+    st.session_state.bulk_missing = []
+if st.session_state.get("bulk_skipped"):
+    st.warning("Skipped: " + "; ".join(st.session_state.bulk_skipped))
+    st.session_state.bulk_skipped = []
 
 
 # Visual portion guide
 st.caption("💡 **Portion Guide**: Small = 1 palm-sized piece, Medium = 1.5 palms, Large = 2 palms")
 
 
-# --- Today's Meals with Delete Functionality ---
-st.subheader("Today's Meals")
+# --- Meal Log with Delete Functionality ---
+st.subheader("Meal Log")
+MEALS_PER_PAGE = 10
 
 
-if not st.session_state.meals:
+if not len(meal_log):
     st.info("No meals logged yet. Add your first meal above!")
 else:
-    for i, meal in enumerate(st.session_state.meals):
+    page_count = meal_log.page_count(MEALS_PER_PAGE)
+    st.session_state.meal_page = min(st.session_state.meal_page, page_count - 1)
+
+    # Only the meals on the visible page are materialized and rendered
+    for meal in meal_log.page(st.session_state.meal_page, MEALS_PER_PAGE):
         col1, col2 = st.columns([0.8, 0.2])
         with col1:
             st.markdown(
                 f"""<div class="entry">
                 <strong>{meal['name']}</strong> ({meal['portion']})<br>
-                ⏰ {meal['time']} | 🔥 {meal['calories']} kcal |
+                📅 {meal['date']:%b %d} ⏰ {meal['time']} | 🔥 {meal['calories']:.0f} kcal |
                 Vitamin D: {meal['vitamin_d']:.1f} IU |
                 Calcium: {meal['calcium']:.1f} mg |
                 Protein: {meal['protein']:.1f} g
@@ -238,31 +356,49 @@ else:
                 unsafe_allow_html=True
             )
         with col2:
-            if st.button("❌", key=f"delete_{i}"):
-                # Subtract nutrients before deleting
-                st.session_state.total_vitamin_d -= meal['vitamin_d']
-                st.session_state.total_calcium -= meal['calcium']
-                st.session_state.total_protein -= meal['protein']
-                del st.session_state.meals[i]
+            if st.button("❌", key=f"delete_{meal['id']}"):
+                stored_id = meal_log.stored_id(meal["id"])
+                meal_log.delete(meal["id"])
+                if stored_id is not None:
+                    repository.delete_meal(user_id, stored_id)
                 st.rerun()
 
+    if page_count > 1:
+        prev_col, info_col, next_col = st.columns([0.2, 0.6, 0.2])
+        with prev_col:
+            if st.button("◀ Newer", disabled=st.session_state.meal_page == 0):
+                st.session_state.meal_page -= 1
+                st.rerun()
+        with info_col:
+            st.caption(f"Page {st.session_state.meal_page + 1} of {page_count}")
+        with next_col:
+            if st.button("Older ▶", disabled=st.session_state.meal_page >= page_count - 1):
+                st.session_state.meal_page += 1
+                st.rerun()
 
-# --- Weekly Chart ---
-st.subheader("Weekly Calorie Overview")
 
+# --- Calorie Chart ---
+st.subheader("Calorie Overview")
 
-# Simulated weekly data (replace with real data later)
-meal_data = {
-    "Date": pd.date_range(end=date.today(), periods=7),
-    "Calories": [1800, 2000, 1750, 1900, 2100, 1950, 1850]
-}
+CHART_WINDOWS = {"7 days": 7, "30 days": 30, "365 days": 365}
+window = st.radio("Show", list(CHART_WINDOWS), horizontal=True, label_visibility="collapsed")
 
 
-meal_df = pd.DataFrame(meal_data)
-calorie_chart = alt.Chart(meal_df).mark_line(point=True, color="#f9c8a7").encode(
-    x="Date:T",
-    y="Calories:Q",
-    tooltip=["Date", "Calories"]
-)
+def calorie_chart(days):
+    # Read from the log's daily rollup: one row per day, however many meals are logged
+    daily = meal_log.daily_totals(days)
+    meal_df = pd.DataFrame({"Date": daily["date"], "Calories": daily["calories"].round()})
+    return alt.Chart(downsample(meal_df, "Date", "Calories")).mark_line(point=days <= 30, color="#f9c8a7").encode(
+        x="Date:T",
+        y="Calories:Q",
+        tooltip=["Date", "Calories"]
+    )
 
-st.altair_chart(calorie_chart, use_container_width=True)
+
+# Spec is rebuilt only when the log, the window or the date changes
+chart_specs = st.session_state.setdefault("chart_specs", {})
+spec = cached_spec(
+    chart_specs, "calories", (meal_log.version, window, date.today()),
+    lambda: calorie_chart(CHART_WINDOWS[window])
+)
+st.vega_lite_chart(spec, use_container_width=True)
@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 from datetime import date
+from charts import cached_spec, downsample
+from growth_standards import MAX_MONTH, percentile_bands, score_growth
+from user_session import current_user_id, get_repository, load_once, restore_session, save_profile
 
 # --- Page Setup ---
 st.set_page_config(page_title="Baby Tracker", page_icon="👶", layout="centered")
@@ -41,14 +44,54 @@ st.markdown("""
 # =============================================
 # SESSION CHECK: Show message if no profile
 # =============================================
+restore_session()
 if 'user_profile' not in st.session_state or not st.session_state.user_profile:
     st.warning("🚨 Please complete onboarding first.")
     st.markdown("Click **'NutriMama'** in the left menu to begin onboarding.")
     st.stop()
 
-# --- Initialize Empty Data ---
-if "growth_data" not in st.session_state:
-    st.session_state.growth_data = pd.DataFrame(columns=["Age (months)", "Weight (kg)", "Height (inches)"])
+# --- Load Stored Data ---
+repository = get_repository()
+user_id = current_user_id()
+load_once("growth_data", lambda repo, uid: repo.load_growth(uid))
+
+# --- Baby's Sex (picks the WHO growth standard) ---
+SEX_OPTIONS = {"Boy": "boys", "Girl": "girls"}
+profile = st.session_state.user_profile
+stored_sex = profile.get("baby_sex", "boys")
+sex_label = st.radio(
+    "Baby's sex (for WHO growth percentiles)",
+    list(SEX_OPTIONS),
+    index=list(SEX_OPTIONS.values()).index(stored_sex),
+    horizontal=True
+)
+baby_sex = SEX_OPTIONS[sex_label]
+if baby_sex != stored_sex:
+    save_profile({**profile, "baby_sex": baby_sex})
+
+
+def ordinal(value):
+    n = int(round(value))
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def growth_chart(scored, indicator, column, percentile_column, inches=False):
+    """Measurements over WHO P3-P97 curves for the ages covered so far."""
+    last_month = min(MAX_MONTH, int(scored["Age (months)"].max()) + 3)
+    bands = percentile_bands(indicator, baby_sex, months=range(last_month + 1), inches=inches)
+    curves = alt.Chart(bands).mark_line(strokeDash=[4, 4], opacity=0.6).encode(
+        x=alt.X("month:Q", title="Age (months)"),
+        y=alt.Y("value:Q", title=column),
+        color=alt.Color("percentile:N", title="WHO", sort=list(bands["percentile"].unique())),
+        tooltip=["percentile", "month", alt.Tooltip("value:Q", format=".1f")]
+    )
+    measurements = alt.Chart(downsample(scored, "Age (months)", column)).mark_line(point=True, color="#333333").encode(
+        x="Age (months):Q",
+        y=f"{column}:Q",
+        tooltip=["Age (months)", column, alt.Tooltip(f"{percentile_column}:Q", format=".0f")]
+    )
+    return (curves + measurements).properties(height=400)
 
 # --- Data Entry Form ---
 with st.form("growth_form"):
@@ -62,37 +105,42 @@ with st.form("growth_form"):
         height = st.number_input("Height (inches)", 0.0, 50.0, format="%.1f")
     
     if st.form_submit_button("Save"):
-        new_entry = pd.DataFrame({
-            "Age (months)": [age],
-            "Weight (kg)": [weight],
-            "Height (inches)": [height]
-        })
-        st.session_state.growth_data = pd.concat([st.session_state.growth_data, new_entry])
+        st.session_state.growth_data.append(age, weight, height)
+        repository.add_growth(user_id, age, weight, height)
         st.success("Saved!")
         st.rerun()
 
 # --- Growth Charts with Tabs ---
-if not st.session_state.growth_data.empty:
+if len(st.session_state.growth_data):
+    growth_data = st.session_state.growth_data
+    # Scores and specs are rebuilt only when a measurement or the baby's sex changes
+    chart_key = (growth_data.version, baby_sex)
+    scores = st.session_state.get("growth_scores")
+    if scores is None or scores[0] != chart_key:
+        scores = st.session_state.growth_scores = (chart_key, score_growth(growth_data.frame(), baby_sex))
+    scored = scores[1]
+    latest = scored.iloc[-1]
+    chart_specs = st.session_state.setdefault("chart_specs", {})
     st.subheader("Growth Progress")
     tab1, tab2 = st.tabs(["Weight", "Height"])
     
     with tab1:
         st.write("### Weight Progress")
-        weight_chart = alt.Chart(st.session_state.growth_data).mark_line(point=True).encode(
-            x="Age (months):Q",
-            y="Weight (kg):Q",
-            tooltip=["Age (months)", "Weight (kg)"]
-        ).properties(height=400)
-        st.altair_chart(weight_chart, use_container_width=True)
+        st.vega_lite_chart(cached_spec(
+            chart_specs, "weight", chart_key,
+            lambda: growth_chart(scored, "weight", "Weight (kg)", "Weight percentile")
+        ), use_container_width=True)
+        if pd.notna(latest["Weight percentile"]):
+            st.caption(f"Latest weight is at the {ordinal(latest['Weight percentile'])} WHO percentile (z = {latest['Weight z']:+.2f}).")
         
     with tab2:
         st.write("### Height Progress")
-        height_chart = alt.Chart(st.session_state.growth_data).mark_line(point=True).encode(
-            x="Age (months):Q",
-            y="Height (inches):Q",
-            tooltip=["Age (months)", "Height (inches)"]
-        ).properties(height=400)
-        st.altair_chart(height_chart, use_container_width=True)
+        st.vega_lite_chart(cached_spec(
+            chart_specs, "height", chart_key,
+            lambda: growth_chart(scored, "length", "Height (inches)", "Height percentile", inches=True)
+        ), use_container_width=True)
+        if pd.notna(latest["Height percentile"]):
+            st.caption(f"Latest height is at the {ordinal(latest['Height percentile'])} WHO percentile (z = {latest['Height z']:+.2f}).")
         
 else:
     st.info("No measurements yet. Add your first entry above!")
@@ -101,19 +149,25 @@ else:
 st.markdown('<div class="section">', unsafe_allow_html=True)
 st.subheader("Developmental Milestones")
 
-if "milestones" not in st.session_state:
-    st.session_state.milestones = [
-        {"age": "2M", "event": "First smile", "date": "2024-01-15"},
-        {"age": "6M", "event": "Sits without support", "date": "2024-05-20"}
-    ]
+load_once("milestones", lambda repo, uid: repo.load_milestones(uid))
+# Shown, labelled as examples, only until the first milestone is added; never stored
+EXAMPLE_MILESTONES = [
+    {"age": "2M", "event": "First smile"},
+    {"age": "6M", "event": "Sits without support"},
+]
 
 new_milestone = st.text_input("Add new milestone (e.g., 'Rolled over at 4M')")
 if st.button("Add Milestone") and new_milestone:
     st.session_state.milestones.append({"event": new_milestone, "date": date.today().isoformat()})
+    repository.add_milestone(user_id, new_milestone, date.today().isoformat())
     st.rerun()
 
 for milestone in st.session_state.milestones:
     st.markdown(f"- 🎯 **{milestone['event']}** ({milestone.get('date', '')})")
+if not st.session_state.milestones:
+    st.caption("No milestones yet. For example:")
+    for milestone in EXAMPLE_MILESTONES:
+        st.markdown(f"- 🎯 *{milestone['event']}* (around {milestone['age']})")
 
 st.markdown('</div>', unsafe_allow_html=True)
 
@@ -127,8 +181,20 @@ vaccines = {
     "6 Months": ["Hepatitis B (3rd dose)", "Influenza (yearly)"]
 }
 
+# Checkbox keys double as the stored vaccine names
+done = load_once("vaccines_done", lambda repo, uid: repo.load_vaccines(uid))
+for key, checked in done.items():
+    st.session_state.setdefault(key, checked)
+
+
+def save_vaccine(key):
+    done[key] = st.session_state[key]
+    repository.set_vaccine(user_id, key, done[key])
+
+
 for age, vax_list in vaccines.items():
     with st.expander(f"{age} Vaccines"):
         for vax in vax_list:
-            st.checkbox(vax, key=f"vax_{age}_{vax}")
+            key = f"vax_{age}_{vax}"
+            st.checkbox(vax, key=key, on_change=save_vaccine, args=(key,))
 st.markdown('</div>', unsafe_allow_html=True)
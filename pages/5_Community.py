@@ -1,9 +1,11 @@
 import streamlit as st
+from user_session import restore_session
 
 def community_page():
     # =============================================
     # SESSION CHECK: Ensure user_profile exists
     # =============================================
+    restore_session()
     if 'user_profile' not in st.session_state or not st.session_state.user_profile:
         st.warning("🚨 Please complete onboarding first.")
         st.markdown("Click **'NutriMama'** in the left menu to begin onboarding.")
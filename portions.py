@@ -0,0 +1,153 @@
+# portions.py
+# Portion sizes in grams for the Mother Tracker.
+#
+# Nutrient data is per 100 g, so every portion a user can enter ("150g",
+# "2 cups", "1 large", "Medium (150-200g)") is turned into grams and the meal's
+# nutrient vector is scaled once by grams / 100. Household measures are food
+# specific: FoodData Central lists them per food (1 cup of cooked rice is 158 g,
+# 1 large egg 50 g), and nutrient_db stores them at import time in a PortionIndex,
+# a CSR layout of per-food rows in flat arrays. Mass units convert directly;
+# volume units use the food's own density when it lists any volume measure.
+import re
+from collections import namedtuple
+from fractions import Fraction
+
+import numpy as np
+
+# A household measure as FDC lists it: `label` ("0.5 cup, diced") weighs `grams`
+# and is `amount` of `unit`
+Portion = namedtuple("Portion", ["label", "amount", "unit", "grams"])
+
+# Generic sizes offered for every food, at the middle of their stated range
+SIZES = {
+    "Small (100-150g)": 125.0,
+    "Medium (150-200g)": 175.0,
+    "Large (200-300g)": 250.0,
+}
+DEFAULT_SIZE = "Medium (150-200g)"
+_SIZE_WORDS = {label.split()[0].lower(): grams for label, grams in SIZES.items()}
+
+MASS_UNITS = {"g": 1.0, "kg": 1000.0, "mg": 0.001, "oz": 28.3495, "lb": 453.592}
+VOLUME_UNITS = {"ml": 1.0, "l": 1000.0, "cup": 236.588, "tbsp": 14.787, "tsp": 4.929, "fl oz": 29.574}
+
+_UNIT_ALIASES = {
+    "gram": "g", "gm": "g", "gr": "g", "kilogram": "kg", "milligram": "mg",
+    "ounce": "oz", "pound": "lb", "lbs": "lb",
+    "milliliter": "ml", "millilitre": "ml", "liter": "l", "litre": "l",
+    "tablespoon": "tbsp", "tbs": "tbsp", "tbl": "tbsp", "teaspoon": "tsp",
+    "fluid ounce": "fl oz", "fl": "fl oz",
+}
+_AMOUNT = re.compile(r"^\s*(\d+\s+\d+/\d+|\d+/\d+|\d*\.?\d+)?\s*(?:x\s+|×\s*)?(.*?)\s*$", re.IGNORECASE)
+_WORD = re.compile(r"[a-z]+(?: oz)?")
+
+
+def unit_key(text):
+    """Canonical unit for a measure description: "Cups, chopped" -> "cup", "tablespoons" -> "tbsp"."""
+    words = _WORD.findall(str(text).lower().split(",")[0].split("(")[0])
+    if not words:
+        return ""
+    word = " ".join(words[:2]) if " ".join(words[:2]) in _UNIT_ALIASES else words[0]
+    word = _UNIT_ALIASES.get(word, word)
+    # Plurals: "cups", "slices", "tomatoes"
+    if word not in MASS_UNITS and word not in VOLUME_UNITS and len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        word = word[:-2] if word.endswith("oes") else word[:-1]
+    return _UNIT_ALIASES.get(word, word)
+
+
+def parse_amount(text):
+    """("1 1/2 cups") -> (1.5, "cups"); the amount defaults to 1. None if the number can't be read ("1/0")."""
+    match = _AMOUNT.match(str(text))
+    number, rest = match.group(1), match.group(2)
+    if not number:
+        return 1.0, rest
+    try:
+        return float(sum(Fraction(part) for part in number.split())), rest
+    except (ZeroDivisionError, ValueError):
+        return None
+
+
+# ==============================================
+# Per-food portion index
+# ==============================================
+class PortionIndex:
+    """Household measures for many foods in flat arrays, grouped by fdc_id."""
+
+    def __init__(self, rows):
+        """`rows`: (fdc_id, label, amount, unit, grams), in display order within each food."""
+        rows = sorted(rows, key=lambda r: r[0])   # stable: keeps each food's own order
+        self._ids, self._starts = np.unique(np.array([r[0] for r in rows], dtype=np.int64), return_index=True)
+        self._starts = np.append(self._starts, len(rows))
+        self._labels = [r[1] for r in rows]
+        self._units = [r[3] for r in rows]
+        self._amounts = np.array([r[2] for r in rows], dtype=np.float64)
+        self._grams = np.array([r[4] for r in rows], dtype=np.float64)
+
+    def __len__(self):
+        return len(self._labels)
+
+    def portions(self, fdc_id):
+        """Portions listed for `fdc_id`, [] if none."""
+        i = int(np.searchsorted(self._ids, fdc_id))
+        if i == len(self._ids) or self._ids[i] != fdc_id:
+            return []
+        return [
+            Portion(self._labels[j], float(self._amounts[j]), self._units[j], float(self._grams[j]))
+            for j in range(self._starts[i], self._starts[i + 1])
+        ]
+
+
+# ==============================================
+# Portion text -> grams
+# ==============================================
+def _density(portions):
+    """Grams per ml from the first volume measure a food lists, or None."""
+    for portion in portions:
+        if portion.unit in VOLUME_UNITS:
+            return portion.grams / portion.amount / VOLUME_UNITS[portion.unit]
+    return None
+
+
+def portion_grams(portion, portions=()):
+    """Grams for a portion entry, using the food's `portions` for household units; None if unknown.
+
+    A zero amount ("0", "0 cups") gives 0, so callers can reject it rather than
+    mistake it for an unreadable entry. Accepts the generic size labels, "small"/"medium"/"large", plain grams ("150",
+    "150g"), mass and volume units ("5 oz", "2 cups") and any unit the food lists
+    ("1 large", "2 slices").
+    """
+    text = str(portion).strip()
+    if text in SIZES:
+        return SIZES[text]
+    parsed = parse_amount(text)
+    if parsed is None:
+        return None
+    amount, rest = parsed
+    if not rest:
+        # A bare number has always meant grams
+        return amount if _AMOUNT.match(text).group(1) else None
+    unit = unit_key(rest)
+    if unit in MASS_UNITS:
+        return amount * MASS_UNITS[unit]
+    for p in portions:
+        if p.unit == unit:
+            return amount * p.grams / p.amount
+    if unit in VOLUME_UNITS:
+        # Without a listed volume measure, assume the density of water
+        return amount * VOLUME_UNITS[unit] * (_density(portions) or 1.0)
+    if unit in _SIZE_WORDS:
+        return amount * _SIZE_WORDS[unit]
+    return None
+
+
+def portion_options(portions):
+    """(label, grams) choices for a food: its own measures, then the generic sizes and grams."""
+    options = [(f"{p.label} ({p.grams:g} g)", p.grams) for p in portions]
+    options += list(SIZES.items())
+    options.append(("grams", 1.0))
+    return options
+
+
+def scale(per_100g, grams):
+    """Nutrient vector(s) per 100 g -> amounts in `grams` (a scalar or one value per row)."""
+    grams = np.asarray(grams, dtype=np.float64)
+    return np.asarray(per_100g) * (grams[:, None] if grams.ndim else grams) / 100
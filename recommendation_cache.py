@@ -0,0 +1,333 @@
+# recommendation_cache.py
+# Precomputed recommendations for every answer the onboarding form allows.
+#
+# Onboarding offers AGE_GROUPS x REGIONS x DURATIONS x any subset of CONDITIONS,
+# so every recommendation bundle (model plan, meal ideas, condition, stage and
+# feeding tips) and every weekly meal plan the Plan page can show is known in
+# advance. `python recommendation_cache.py` computes them all, solving the weekly
+# plans on a process pool, and writes one keyed file:
+#
+#   magic, format version, header length   "NMRC" <u4 <u4
+#   header                                 JSON: freshness, counts, build time
+#   keys                                   <u8 x n, sorted 64-bit key hashes
+#   records                                <u8 x n, record number per key
+#   offsets                                <u8 x (m + 1), record bounds in the data
+#   data                                   m zlib-compressed JSON records
+#
+# Bundles come from recommender.LocalBackend, the same code that answers a cache
+# miss, so a hit and a miss look alike. Identical records (e.g. ages the model
+# scores alike) are stored once. The page maps the file read-only and answers a
+# lookup with a binary search over the mapped keys plus one small decompress,
+# without loading the file. The header records the model artifact's content
+# hash and prediction version, the guidance content version and the planner's
+# inputs and search parameters it was built from; a file that no longer matches
+# them is ignored and the page computes live.
+#
+# Both the bundles and the weekly plans are computed on the process pool; the
+# bundles are sent in chunks so each worker loads the model once.
+import argparse
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import meal_planner
+import nutrient_engine
+import nutrition_helpers
+from stages import DURATIONS, STAGE_BY_DURATION
+
+CACHE_PATH = os.environ.get(
+    "NUTRIMAMA_RECOMMENDATION_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "recommendations.bin")
+)
+MAGIC = b"NMRC"
+FORMAT_VERSION = 1
+_PREFIX = struct.Struct("<4sII")
+
+# Answers offered by the onboarding form in NutriMama.py ("None" is the same as no conditions)
+AGE_GROUPS = ("18-25", "26-35", "36-45", "45+")
+REGIONS = ("North America", "South Asia", "Africa", "Europe", "Middle East", "Other")
+CONDITIONS = ("Anemia", "Diabetes", "Thyroid", "PCOS", "Hypertension", "Obesity", "Cholesterol")
+# Meals-per-day choices on the Plan page
+MEALS_PER_DAY = (3, 4, 5)
+
+
+def _conditions(conditions):
+    return tuple(sorted(c for c in conditions or () if c and c != "None"))
+
+
+def recommendation_key(profile):
+    conditions = ",".join(_conditions(profile.get("conditions")))
+    return f"rec|{profile.get('age')}|{profile.get('region')}|{profile.get('bf_duration')}|{conditions}"
+
+
+def weekly_plan_key(profile, meals_per_day):
+    region, stage, conditions, meals_per_day = meal_planner.plan_key(profile, meals_per_day)
+    return f"week|{region}|{stage}|{','.join(conditions)}|{meals_per_day}"
+
+
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+# ==============================================
+# Freshness
+# ==============================================
+_digests = {}
+
+
+def _file_digest(path):
+    # Re-hashed only when the file's size or mtime changes
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _digests.get(path)
+    if cached is None or cached[0] != stamp:
+        with open(path, "rb") as f:
+            cached = (stamp, hashlib.sha256(f.read()).hexdigest()[:16])
+        _digests[path] = cached
+    return cached[1]
+
+
+def freshness(catalog_path=meal_planner.CATALOG_PATH):
+    """What cached recommendations are built from; a cache is served only while this still matches."""
+    # Imported here: the page only pays for loading the model once a cache file exists
+    import nutrition_model
+    return {
+        "format": FORMAT_VERSION,
+        "model": nutrition_model.artifact_sha256(),
+        "predictions": nutrition_model.PREDICTION_VERSION,
+        "guidance": nutrition_helpers.content_version(),
+        "catalog": _file_digest(catalog_path),
+        "goals": _file_digest(nutrient_engine.GOALS_PATH),
+        # JSON round trip so tuples compare equal to the lists read back from the header
+        "planner": json.loads(json.dumps(meal_planner.search_parameters())),
+    }
+
+
+# ==============================================
+# Reading
+# ==============================================
+class RecommendationCache:
+    """A cache file mapped read-only; lookups never read more than the records they return."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._keys = self._records = self._offsets = None
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        stat = os.stat(path)
+        self.stamp = (stat.st_mtime_ns, stat.st_size)
+        try:
+            magic, version, header_size = _PREFIX.unpack_from(self._map, 0)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"not a version {FORMAT_VERSION} recommendation cache")
+            start = _PREFIX.size
+            self.header = json.loads(self._map[start:start + header_size])
+            n, m = self.header["keys"], self.header["records"]
+            start += header_size
+            self._keys = np.frombuffer(self._map, dtype="<u8", count=n, offset=start)
+            self._records = np.frombuffer(self._map, dtype="<u8", count=n, offset=start + 8 * n)
+            self._offsets = np.frombuffer(self._map, dtype="<u8", count=m + 1, offset=start + 16 * n)
+            self._data = start + 16 * n + 8 * (m + 1)
+        except (struct.error, KeyError, TypeError, ValueError) as e:
+            self._keys = self._records = self._offsets = None
+            self._map.close()
+            raise ValueError(f"{path} is not a valid recommendation cache: {e}") from e
+
+    def __len__(self):
+        return 0 if self._keys is None else len(self._keys)
+
+    def is_fresh(self, expected=None):
+        return self.header.get("freshness") == (expected or freshness())
+
+    def get(self, key):
+        """The record stored under `key` (a dict), or None (also once the cache is closed)."""
+        h = np.uint64(key_hash(key))
+        with self._lock:
+            if self._map is None:
+                return None
+            i = int(np.searchsorted(self._keys, h))
+            if i == len(self._keys) or self._keys[i] != h:
+                return None
+            r = int(self._records[i])
+            start, end = self._data + int(self._offsets[r]), self._data + int(self._offsets[r + 1])
+            blob = self._map[start:end]
+        return json.loads(zlib.decompress(blob))
+
+    def close(self):
+        """Unmap the file; later lookups return None."""
+        with self._lock:
+            if self._map is None:
+                return
+            # The index arrays are views of the map and must go before it can close
+            self._keys = self._records = self._offsets = None
+            self._map.close()
+            self._map = None
+
+    def recommendation(self, profile):
+        """{"plan", "meal_ideas", "tips", "stage_tips", "feeding_advice"} for an onboarding profile, or None."""
+        return self.get(recommendation_key(profile))
+
+    def weekly_plan(self, profile, meals_per_day=4):
+        """The stored meal_planner.MealPlan for the profile, or None."""
+        record = self.get(weekly_plan_key(profile, meals_per_day))
+        if record is None:
+            return None
+        return meal_planner.assemble_plan(profile, meals_per_day, record["meals"], record["servings"], record["score"])
+
+
+_open = {}
+_open_lock = threading.Lock()
+
+
+def current_cache(path=CACHE_PATH):
+    """The cache at `path`, reopened when the file is rebuilt; None if missing, unreadable or stale."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    with _open_lock:
+        cache = _open.get(path)
+        if cache is None or cache.stamp != (stat.st_mtime_ns, stat.st_size):
+            try:
+                fresh = RecommendationCache(path)
+            except (OSError, ValueError):
+                return None
+            if cache is not None:
+                # Readers still holding the old cache just see misses and compute live
+                cache.close()
+            _open[path] = cache = fresh
+    return cache if cache.is_fresh() else None
+
+
+# ==============================================
+# Building
+# ==============================================
+def onboarding_profiles():
+    """Every profile the onboarding form can produce, with condition lists sorted."""
+    subsets = [
+        list(combo) for size in range(len(CONDITIONS) + 1) for combo in itertools.combinations(CONDITIONS, size)
+    ]
+    for age, region, duration, conditions in itertools.product(AGE_GROUPS, REGIONS, DURATIONS, subsets):
+        yield {
+            "age": age, "region": region, "bf_duration": duration, "bf_stage": STAGE_BY_DURATION[duration],
+            "conditions": sorted(conditions),
+        }
+
+
+_backend = None
+
+
+def _recommend_chunk(profiles):
+    global _backend
+    if _backend is None:
+        from recommender import LocalBackend
+        _backend = LocalBackend()
+    return [_backend.recommend(profile) for profile in profiles]
+
+
+def recommend_many(profiles, processes=None, chunk_size=256):
+    """LocalBackend().recommend() for every profile, in chunks across a process pool (0: in this process)."""
+    chunks = [profiles[i:i + chunk_size] for i in range(0, len(profiles), chunk_size)]
+    if processes == 0 or len(chunks) <= 1:
+        results = map(_recommend_chunk, chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_recommend_chunk, chunks))
+    return [bundle for chunk in results for bundle in chunk]
+
+
+def build_records(meals_per_day=MEALS_PER_DAY, processes=None, time_budget=meal_planner.TIME_BUDGET):
+    """{key: record} for every onboarding profile and meals-per-day choice.
+
+    The build rejects plans cut short by `time_budget`, so a different budget
+    can't change what is stored.
+    """
+    profiles = list(onboarding_profiles())
+    bundles = recommend_many(profiles, processes)
+    records = {recommendation_key(profile): bundle for profile, bundle in zip(profiles, bundles)}
+
+    catalog = meal_planner.load_catalog()
+    # Age doesn't change the weekly plan, so those profiles are planned once per meal count
+    planned = list({weekly_plan_key(p, 4): p for p in profiles}.values())
+    for count in meals_per_day:
+        for profile, plan in zip(planned, meal_planner.plan_many(planned, count, processes, time_budget)):
+            if not plan.complete:
+                raise RuntimeError(f"Planning {weekly_plan_key(profile, count)} hit the time cap; raise --time-budget")
+            records[weekly_plan_key(profile, count)] = {
+                "meals": [catalog.index[name] for name in plan.meals["meal"]],
+                "servings": plan.meals["servings"].tolist(),
+                "score": round(float(plan.score), 6),
+            }
+    return records
+
+
+def write_cache(records, path=CACHE_PATH, fresh=None):
+    """Write {key: record} to `path` in the format described at the top of this module."""
+    payloads, blobs = {}, []
+    keyed = []
+    for key, record in records.items():
+        blob = zlib.compress(json.dumps(record, separators=(",", ":"), sort_keys=True).encode(), 9)
+        if blob not in payloads:
+            payloads[blob] = len(blobs)
+            blobs.append(blob)
+        keyed.append((key_hash(key), payloads[blob]))
+    keyed.sort()
+    hashes = np.array([h for h, _ in keyed], dtype="<u8")
+    if len(hashes) and (np.diff(hashes) == 0).any():
+        raise ValueError("Two cache keys share a hash; change the key format")
+
+    header = json.dumps({
+        "freshness": fresh or freshness(),
+        "keys": len(keyed),
+        "records": len(blobs),
+        "built_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }).encode()
+    # Pad the header so the index arrays start 8-byte aligned
+    header += b" " * (-(_PREFIX.size + len(header)) % 8)
+    offsets = np.zeros(len(blobs) + 1, dtype="<u8")
+    offsets[1:] = np.cumsum([len(b) for b in blobs])
+
+    # Write to a temp file and rename so a running app never maps a partial file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.write(hashes.tobytes())
+        f.write(np.array([r for _, r in keyed], dtype="<u8").tobytes())
+        f.write(offsets.tobytes())
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, path)
+    return {"keys": len(keyed), "records": len(blobs), "bytes": os.path.getsize(path)}
+
+
+def build_cache(path=CACHE_PATH, meals_per_day=MEALS_PER_DAY, processes=None, time_budget=meal_planner.TIME_BUDGET):
+    fresh = freshness()
+    records = build_records(meals_per_day, processes, time_budget)
+    if freshness() != fresh:
+        raise RuntimeError("The model, guidance or meal catalog changed during the build; run it again")
+    return write_cache(records, path, fresh)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute recommendations for every onboarding answer.")
+    parser.add_argument("--output", default=CACHE_PATH)
+    parser.add_argument("--processes", type=int, default=None, help="default: one per CPU")
+    parser.add_argument("--meals-per-day", type=int, nargs="+", default=list(MEALS_PER_DAY))
+    parser.add_argument("--time-budget", type=float, default=meal_planner.TIME_BUDGET,
+                        help="seconds per weekly plan")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    info = build_cache(args.output, args.meals_per_day, args.processes, args.time_budget)
+    print(f"{info['keys']:,} keys, {info['records']:,} distinct records, {info['bytes'] / 1e6:.1f} MB "
+          f"in {time.perf_counter() - start:.0f} s -> {args.output}")
@@ -0,0 +1,226 @@
+# recommender.py
+# Meal-plan recommender backends. Every backend takes a user profile (as saved by
+# onboarding) and returns {"plan": str, "meal_ideas": [str], "tips": [str]}; the
+# local backend adds the stage's "stage_tips" and "feeding_advice".
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from cache_utils import TTLCache
+
+DEFAULT_SPACE = "ayeshaqamar/nutrition-api"
+
+
+def _split_conditions(health_condition):
+    return [c.strip() for c in health_condition.split(",") if c.strip()]
+
+
+def profile_key(profile):
+    """Cache key for a profile; condition order doesn't change the recommendation."""
+    return (profile["age"], profile["region"], profile["bf_stage"], tuple(sorted(profile["conditions"])))
+
+
+class RecommenderBackend:
+    name = None
+
+    def recommend(self, profile):
+        raise NotImplementedError
+
+
+class LocalBackend(RecommenderBackend):
+    """Runs the model from nutrition_model.py in-process."""
+    name = "local"
+
+    def __init__(self):
+        # Imported here so the remote backend doesn't pay for loading the model
+        import nutrition_model
+        import nutrition_helpers
+        self.model = nutrition_model
+        self.helpers = nutrition_helpers
+
+    def recommend(self, profile):
+        conditions = [c for c in profile["conditions"] if c != "None"]
+        guidance = self.helpers.get_guidance(profile)
+        return {
+            "plan": self.model.predict_nutrition(profile["age"], profile["region"], profile["bf_stage"], conditions),
+            "meal_ideas": list(guidance["meal_ideas"]),
+            "tips": list(guidance["condition_tips"]),
+            "stage_tips": guidance["stage_tips"],
+            "feeding_advice": guidance["feeding_advice"],
+        }
+
+
+class ClientPool:
+    """Reuses gradio clients so the Space's API config is only fetched per new client.
+
+    Hands out at most `size` clients at once; callers beyond that wait for one to
+    be returned.
+    """
+
+    def __init__(self, factory, space, size=4):
+        self.factory = factory
+        self.space = space
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+        if create:
+            try:
+                return self.factory(self.space)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No {self.space} client became free within {timeout}s")
+
+    def release(self, client):
+        self._idle.put(client)
+
+
+class GradioBackend(RecommenderBackend):
+    """Calls the hosted Gradio Space through a pooled gradio_client.Client.
+
+    Results are cached per profile_key() so identical profiles only hit the network
+    once per `cache_ttl` seconds; see stats() for the counters.
+    """
+    name = "remote"
+
+    def __init__(self, space=DEFAULT_SPACE, client_factory=None, pool_size=4,
+                 timeout=30, cache_size=512, cache_ttl=3600):
+        if client_factory is None:
+            from gradio_client import Client
+            client_factory = Client
+        self.space = space
+        self.timeout = timeout
+        self.pool = ClientPool(client_factory, space, size=pool_size)
+        self.cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+
+    def _fetch(self, profile):
+        client = self.pool.acquire(timeout=self.timeout)
+        try:
+            job = client.submit(
+                age=profile["age"],
+                region=profile["region"],
+                stage=profile["bf_stage"],
+                health_condition=", ".join(profile["conditions"]),
+                api_name="/predict"
+            )
+            result = job.result(timeout=self.timeout)
+        finally:
+            self.pool.release(client)
+        return {
+            "plan": result["plan"],
+            "meal_ideas": result.get("meal_ideas") or [],
+            "tips": result.get("tips") or [],
+        }
+
+    def recommend(self, profile):
+        return self.cache.get_or_compute(profile_key(profile), lambda: self._fetch(profile))
+
+    def stats(self):
+        return self.cache.stats()
+
+
+class LocalGradioStub:
+    """Offline stand-in for gradio_client.Client("ayeshaqamar/nutrition-api").
+
+    Accepts the same predict() call as the Space and answers it with the local model,
+    so the remote code path can be exercised without network access.
+    """
+
+    def __init__(self, space=DEFAULT_SPACE):
+        self.space = space
+        self.backend = LocalBackend()
+
+    def predict(self, age, region, stage, health_condition, api_name="/predict"):
+        if api_name != "/predict":
+            raise ValueError(f"Unknown api_name: {api_name}")
+        return self.backend.recommend({
+            "age": age,
+            "region": region,
+            "bf_stage": stage,
+            "conditions": _split_conditions(health_condition),
+        })
+
+    def submit(self, age, region, stage, health_condition, api_name="/predict"):
+        # Mirrors gradio_client.Job: the caller waits on .result(timeout=...)
+        job = Future()
+        try:
+            job.set_result(self.predict(age, region, stage, health_condition, api_name))
+        except Exception as e:
+            job.set_exception(e)
+        return job
+
+
+class AsyncRecommender:
+    """Runs a backend on a bounded thread pool without blocking the caller.
+
+    submit() returns a Future. While a profile_key() is in flight, further submits
+    for it return that same Future instead of issuing a duplicate upstream call.
+    """
+
+    def __init__(self, backend, max_workers=8):
+        self.backend = backend
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recommender")
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.coalesced = 0
+
+    def submit(self, profile):
+        key = profile_key(profile)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future = self._executor.submit(self.backend.recommend, dict(profile))
+            self._inflight[key] = future
+            self.submitted += 1
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def stats(self):
+        with self._lock:
+            return {"in_flight": len(self._inflight), "submitted": self.submitted, "coalesced": self.coalesced}
+
+
+BACKENDS = {
+    "local": LocalBackend,
+    "remote": GradioBackend,
+    "stub": lambda: GradioBackend(client_factory=LocalGradioStub),
+}
+
+
+def backend_name(name=None):
+    """The backend `name` resolves to; defaults to $NUTRIMAMA_RECOMMENDER, then "local"."""
+    return name or os.environ.get("NUTRIMAMA_RECOMMENDER", "local")
+
+
+def get_backend(name=None):
+    """Backend by name (see backend_name())."""
+    name = backend_name(name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown recommender backend: {name!r} (expected one of {sorted(BACKENDS)})")
+    return BACKENDS[name]()
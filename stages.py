@@ -0,0 +1,7 @@
+# stages.py
+# Breastfeeding stages: the durations the onboarding form offers and the stage
+# each one stands for. The model, nutrient goals, recommendation cache and the
+# form all take the mapping from here.
+STAGE_BY_DURATION = {"0-6 Months": "Lactation", "6-12 Months": "Weaning", "12+ Months": "Extended"}
+DURATIONS = tuple(STAGE_BY_DURATION)
+DEFAULT_STAGE = "Lactation"
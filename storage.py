@@ -0,0 +1,430 @@
+# storage.py
+# Durable per-user storage for profiles, meals, growth data, milestones and
+# vaccine checkboxes.
+#
+# Pages talk to the UserRepository interface; SQLiteRepository is the local
+# implementation. It runs SQLite in WAL mode so readers never block the writer,
+# keeps a small pool of connections per process, and batches writes: calls like
+# add_meals() enqueue their statements and a background thread commits whatever
+# has queued up in one transaction. Reads first wait for that user's queued
+# writes (never anyone else's), so a session always sees its own writes.
+#
+# Every write returns a Future that settles once its transaction commits. Meal ids
+# are assigned by the database inside that transaction (one past the user's
+# highest), never by a session, so two tabs of the same user can't overwrite each
+# other's meals; add_meals()'s Future resolves to the new ids. A failed batch is
+# retried one statement at a time so only the statements at fault fail: their
+# Futures raise StorageError, and so does that user's next flush().
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import Future, wait
+from contextlib import contextmanager
+from datetime import datetime
+
+from growth_log import GrowthLog
+from meal_log import NUTRIENT_COLUMNS, MealLog
+
+DB_PATH = os.environ.get(
+    "NUTRIMAMA_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "nutrimama.sqlite")
+)
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meals (
+    user_id TEXT NOT NULL,
+    meal_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    minute INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    portion TEXT NOT NULL,
+    vitamin_d REAL NOT NULL,
+    calcium REAL NOT NULL,
+    protein REAL NOT NULL,
+    calories REAL NOT NULL,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    nutrients TEXT,
+    PRIMARY KEY (user_id, meal_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS growth (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    age_months REAL NOT NULL,
+    weight_kg REAL NOT NULL,
+    height_in REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS growth_user ON growth (user_id);
+CREATE TABLE IF NOT EXISTS milestones (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    age TEXT,
+    event TEXT NOT NULL,
+    date TEXT
+);
+CREATE INDEX IF NOT EXISTS milestones_user ON milestones (user_id);
+CREATE TABLE IF NOT EXISTS vaccines (
+    user_id TEXT NOT NULL,
+    vaccine TEXT NOT NULL,
+    done INTEGER NOT NULL,
+    PRIMARY KEY (user_id, vaccine)
+) WITHOUT ROWID;
+"""
+
+# Statements are module constants so sqlite3's per-connection statement cache
+# reuses the prepared form on every call
+_UPSERT_PROFILE = "INSERT OR REPLACE INTO profiles (user_id, data, updated_at) VALUES (?, ?, ?)"
+_SELECT_PROFILE = "SELECT data FROM profiles WHERE user_id = ?"
+# The four headline nutrients keep their own columns (meals stored before the
+# full nutrient vector have only these); `nutrients` holds every non-zero
+# nutrient as JSON keyed by name, so adding nutrients never needs a migration
+MEAL_COLUMNS = ("vitamin_d", "calcium", "protein", "calories")
+_INSERT_MEAL = (
+    "INSERT INTO meals (user_id, meal_id, day, minute, name, portion, "
+    f"{', '.join(MEAL_COLUMNS)}, deleted, nutrients) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SELECT_MEALS = (
+    f"SELECT meal_id, day, minute, name, portion, {', '.join(MEAL_COLUMNS)}, deleted, nutrients "
+    "FROM meals WHERE user_id = ?"
+)
+_NEXT_MEAL_ID = "SELECT COALESCE(MAX(meal_id), -1) + 1 FROM meals WHERE user_id = ?"
+_DELETE_MEAL = "UPDATE meals SET deleted = 1 WHERE user_id = ? AND meal_id = ?"
+# Cleared meals stay as tombstones so their ids are never handed out again
+_CLEAR_MEALS = "UPDATE meals SET deleted = 1 WHERE user_id = ?"
+_INSERT_GROWTH = "INSERT INTO growth (user_id, age_months, weight_kg, height_in) VALUES (?, ?, ?, ?)"
+_SELECT_GROWTH = "SELECT age_months, weight_kg, height_in FROM growth WHERE user_id = ? ORDER BY id"
+_INSERT_MILESTONE = "INSERT INTO milestones (user_id, age, event, date) VALUES (?, ?, ?, ?)"
+_SELECT_MILESTONES = "SELECT age, event, date FROM milestones WHERE user_id = ? ORDER BY id"
+_UPSERT_VACCINE = "INSERT OR REPLACE INTO vaccines (user_id, vaccine, done) VALUES (?, ?, ?)"
+_SELECT_VACCINES = "SELECT vaccine, done FROM vaccines WHERE user_id = ?"
+
+
+def _migrate(conn):
+    """Bring a database created by an older version up to SCHEMA."""
+    meal_columns = {row[1] for row in conn.execute("PRAGMA table_info(meals)")}
+    if "nutrients" not in meal_columns:
+        conn.execute("ALTER TABLE meals ADD COLUMN nutrients TEXT")
+        conn.commit()
+
+
+def _meal_params(user_id, row):
+    # The log's own id is ignored; the writer assigns the stored one
+    _, day, minute, name, portion, *values, deleted = row
+    amounts = dict(zip(NUTRIENT_COLUMNS, values))
+    nutrients = json.dumps({k: v for k, v in amounts.items() if v})
+    return (user_id, None, day, minute, name, portion, *(amounts[c] for c in MEAL_COLUMNS), deleted, nutrients)
+
+
+def _meal_row(record):
+    meal_id, day, minute, name, portion, *legacy, deleted, nutrients = record
+    amounts = dict(zip(MEAL_COLUMNS, legacy))
+    if nutrients:
+        amounts.update(json.loads(nutrients))
+    return (meal_id, day, minute, name, portion, *(amounts.get(c, 0.0) for c in NUTRIENT_COLUMNS), deleted)
+
+
+class StorageError(Exception):
+    """A queued write that could not be committed."""
+
+
+def _gather(futures):
+    """A Future for the list of `futures`' results; fails with the first failure."""
+    combined = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def settle(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        errors = [f.exception() for f in futures if f.exception()]
+        if errors:
+            combined.set_exception(errors[0])
+        else:
+            combined.set_result([f.result() for f in futures])
+
+    if not futures:
+        combined.set_result([])
+    for future in futures:
+        future.add_done_callback(settle)
+    return combined
+
+
+class UserRepository:
+    """What the pages need from storage; all methods are keyed on a user id."""
+
+    def load_profile(self, user_id):
+        raise NotImplementedError
+
+    def save_profile(self, user_id, profile):
+        raise NotImplementedError
+
+    def load_meals(self, user_id):
+        raise NotImplementedError
+
+    def add_meals(self, user_id, rows):
+        """Store MealLog.rows() output; returns a Future of the stored meal ids."""
+        raise NotImplementedError
+
+    def delete_meal(self, user_id, meal_id):
+        raise NotImplementedError
+
+    def clear_meals(self, user_id):
+        raise NotImplementedError
+
+    def load_growth(self, user_id):
+        raise NotImplementedError
+
+    def add_growth(self, user_id, age_months, weight_kg, height_in):
+        raise NotImplementedError
+
+    def load_milestones(self, user_id):
+        raise NotImplementedError
+
+    def add_milestone(self, user_id, event, date, age=None):
+        raise NotImplementedError
+
+    def load_vaccines(self, user_id):
+        raise NotImplementedError
+
+    def set_vaccine(self, user_id, vaccine, done):
+        raise NotImplementedError
+
+    def flush(self, user_id=None):
+        pass
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared by the threads of one process."""
+
+    def __init__(self, path, size=4):
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            conn = sqlite3.connect(path, timeout=30, check_same_thread=False, cached_statements=64)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+
+class SQLiteRepository(UserRepository):
+    def __init__(self, path=DB_PATH, pool_size=4, batch_size=500):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.pool = ConnectionPool(path, pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            _migrate(conn)
+
+        self._lock = threading.Lock()
+        self._has_work = threading.Condition(self._lock)
+        self._committed = threading.Condition(self._lock)
+        self._pending = deque()
+        self._enqueued = 0       # statements ever queued
+        self._done = 0           # statements ever written (or failed)
+        self._failures = {}      # user id -> StorageErrors not yet reported by flush()
+        self._user_pending = {}  # user id -> Futures of its writes not yet settled
+        self._closing = False
+        self.statements_written = 0
+        self.transactions = 0
+        self._writer = threading.Thread(target=self._write_loop, name="storage-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # ---------------------------------------------
+    # Write batching
+    # ---------------------------------------------
+    def _enqueue(self, sql, params):
+        # Every statement's first parameter is the user id
+        future = Future()
+        with self._lock:
+            self._pending.append((sql, params, future))
+            self._user_pending.setdefault(params[0], set()).add(future)
+            self._enqueued += 1
+            self._has_work.notify()
+        return future
+
+    def _write_loop(self):
+        while True:
+            # Take everything already queued; under load this grows the batch
+            # without ever delaying a lone write
+            with self._lock:
+                while not self._pending and not self._closing:
+                    self._has_work.wait()
+                if not self._pending:
+                    return
+                count = min(len(self._pending), self.batch_size)
+                batch = [self._pending.popleft() for _ in range(count)]
+            # Any error fails only the statements at fault; the writer itself must
+            # never die, or every later wait would hang
+            try:
+                outcomes = list(zip(batch, self._apply(batch)))
+            except Exception:
+                logger.exception("Failed to write %d queued statements; retrying them one by one", len(batch))
+                outcomes = [(item, self._apply_one(item)) for item in batch]
+            for (_, _, future), result in outcomes:
+                if isinstance(result, StorageError):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            with self._lock:
+                for (_, params, future), result in outcomes:
+                    if isinstance(result, StorageError):
+                        self._failures.setdefault(params[0], []).append(result)
+                    pending = self._user_pending.get(params[0])
+                    if pending is not None:
+                        pending.discard(future)
+                        if not pending:
+                            del self._user_pending[params[0]]
+                self._done += len(batch)
+                self._committed.notify_all()
+
+    def _apply_one(self, item):
+        try:
+            return self._apply([item])[0]
+        except Exception as e:
+            logger.error("Failed to write %r: %s", item[0], e)
+            return StorageError(f"Could not save your change ({e})")
+
+    def _apply(self, batch):
+        """Commit `batch` in one transaction; returns each statement's result (new meal ids for meal inserts)."""
+        results = [None] * len(batch)
+        next_ids = {}
+        # Consecutive statements with the same SQL go through one executemany;
+        # order is preserved so an insert is never overtaken by its delete
+        with self.pool.connection() as conn:
+            with conn:
+                # Take the write lock up front so the meal ids read below stay ours
+                conn.execute("BEGIN IMMEDIATE")
+                start = 0
+                while start < len(batch):
+                    sql = batch[start][0]
+                    end = start
+                    while end < len(batch) and batch[end][0] == sql:
+                        end += 1
+                    params = [p for _, p, _ in batch[start:end]]
+                    if sql == _INSERT_MEAL:
+                        for i, row in enumerate(params):
+                            user_id = row[0]
+                            if user_id not in next_ids:
+                                next_ids[user_id] = conn.execute(_NEXT_MEAL_ID, (user_id,)).fetchone()[0]
+                            results[start + i] = next_ids[user_id]
+                            next_ids[user_id] += 1
+                            params[i] = (user_id, results[start + i], *row[2:])
+                    conn.executemany(sql, params)
+                    start = end
+        self.statements_written += len(batch)
+        self.transactions += 1
+        return results
+
+    def _wait(self, user_id=None):
+        """Wait for the writes queued so far: `user_id`'s only, or everyone's if None."""
+        with self._lock:
+            if user_id is None:
+                target = self._enqueued
+                while self._done < target and self._writer.is_alive():
+                    self._committed.wait(timeout=1)
+                return
+            pending = list(self._user_pending.get(user_id, ()))
+        while pending and self._writer.is_alive():
+            pending = list(wait(pending, timeout=1).not_done)
+
+    def flush(self, user_id=None):
+        """Block until the writes queued before this call are committed: `user_id`'s, or all if None.
+
+        Raises StorageError if a write for `user_id` (any user if None) failed
+        since the last flush() that reported it.
+        """
+        self._wait(user_id)
+        with self._lock:
+            if user_id is None:
+                failures = [e for errors in self._failures.values() for e in errors]
+                self._failures = {}
+            else:
+                failures = self._failures.pop(user_id, [])
+        if failures:
+            raise StorageError(f"{len(failures)} write(s) failed: {failures[0]}")
+
+    def close(self):
+        """Write what is queued and stop the writer thread."""
+        with self._lock:
+            self._closing = True
+            self._has_work.notify()
+        self._writer.join()
+
+    def _read(self, sql, params):
+        # Reads are keyed on the user id, so only that user's writes need to land first
+        self._wait(params[0])
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    # ---------------------------------------------
+    # Profiles
+    # ---------------------------------------------
+    def load_profile(self, user_id):
+        rows = self._read(_SELECT_PROFILE, (user_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_profile(self, user_id, profile):
+        return self._enqueue(_UPSERT_PROFILE, (user_id, json.dumps(profile), datetime.now().isoformat()))
+
+    # ---------------------------------------------
+    # Meals
+    # ---------------------------------------------
+    def load_meals(self, user_id):
+        return MealLog.from_rows([_meal_row(r) for r in self._read(_SELECT_MEALS, (user_id,))])
+
+    def add_meals(self, user_id, rows):
+        """Persist MealLog.rows() output; returns a Future of the stored meal ids, in row order."""
+        return _gather([self._enqueue(_INSERT_MEAL, _meal_params(user_id, row)) for row in rows])
+
+    def delete_meal(self, user_id, meal_id):
+        """`meal_id` is a stored id (MealLog.stored_id())."""
+        return self._enqueue(_DELETE_MEAL, (user_id, meal_id))
+
+    def clear_meals(self, user_id):
+        return self._enqueue(_CLEAR_MEALS, (user_id,))
+
+    # ---------------------------------------------
+    # Baby tracker
+    # ---------------------------------------------
+    def load_growth(self, user_id):
+        return GrowthLog.from_records(self._read(_SELECT_GROWTH, (user_id,)))
+
+    def add_growth(self, user_id, age_months, weight_kg, height_in):
+        return self._enqueue(_INSERT_GROWTH, (user_id, age_months, weight_kg, height_in))
+
+    def load_milestones(self, user_id):
+        return [
+            {"age": age, "event": event, "date": date} if age else {"event": event, "date": date}
+            for age, event, date in self._read(_SELECT_MILESTONES, (user_id,))
+        ]
+
+    def add_milestone(self, user_id, event, date, age=None):
+        return self._enqueue(_INSERT_MILESTONE, (user_id, age, event, date))
+
+    def load_vaccines(self, user_id):
+        return {vaccine: bool(done) for vaccine, done in self._read(_SELECT_VACCINES, (user_id,))}
+
+    def set_vaccine(self, user_id, vaccine, done):
+        return self._enqueue(_UPSERT_VACCINE, (user_id, vaccine, int(done)))
@@ -0,0 +1,73 @@
+"""Tests for how nutrition_model answers inputs its training data doesn't cover.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import nutrition_model  # noqa: E402
+from nutrition_model import GENERAL_PLAN, predict_nutrition, predict_nutrition_batch  # noqa: E402
+from recommendation_cache import AGE_GROUPS, CONDITIONS, REGIONS  # noqa: E402
+from stages import DURATIONS  # noqa: E402
+
+KNOWN_CONDITIONS = set(nutrition_model.le_health.classes_) - {"None"}
+UNKNOWN_CONDITIONS = [c for c in CONDITIONS if c not in KNOWN_CONDITIONS]
+UNKNOWN_REGIONS = [r for r in REGIONS if r not in nutrition_model.le_region.classes_]
+
+
+def condition_plans():
+    """Plans the training data gives for a specific condition."""
+    data = nutrition_model.data
+    return set(data.loc[data["health_condition"] != "None", "nutrition_plan"])
+
+
+@pytest.fixture(params=[False, True], ids=["tree", "compiled"])
+def compiled(request):
+    saved = nutrition_model._compiled
+    if request.param:
+        nutrition_model.compile_predictions()
+    else:
+        nutrition_model._compiled = None
+    yield request.param
+    nutrition_model._compiled = saved
+
+
+def test_form_offers_unknown_conditions_and_regions():
+    # Otherwise the tests below check nothing
+    assert UNKNOWN_CONDITIONS and UNKNOWN_REGIONS
+
+
+def test_unknown_condition_never_gets_a_condition_plan(compiled):
+    specific = condition_plans()
+    for age in AGE_GROUPS:
+        for region in REGIONS:
+            for duration in DURATIONS:
+                for condition in UNKNOWN_CONDITIONS:
+                    plan = predict_nutrition(age, region, duration, [condition])
+                    assert plan not in specific, (age, region, duration, condition)
+                    assert plan == GENERAL_PLAN
+
+
+def test_unknown_region_or_stage_gets_the_general_plan(compiled):
+    for region in UNKNOWN_REGIONS:
+        assert predict_nutrition("26-35", region, "Lactation", ["Thyroid"]) == GENERAL_PLAN
+    assert predict_nutrition("26-35", "Africa", "Pregnancy", ["Anemia"]) == GENERAL_PLAN
+
+
+def test_known_condition_wins_over_unknown_ones(compiled):
+    assert predict_nutrition("26-35", "Africa", "Weaning", ["PCOS", "Anemia"]) == \
+        predict_nutrition("26-35", "Africa", "Weaning", ["Anemia"])
+
+
+def test_batch_matches_single_predictions():
+    profiles = [
+        {"age": age, "region": region, "stage": "Lactation", "health": [condition]}
+        for age in AGE_GROUPS for region in REGIONS for condition in CONDITIONS
+    ]
+    batch = predict_nutrition_batch(profiles)
+    assert list(batch) == [predict_nutrition(p["age"], p["region"], p["stage"], p["health"]) for p in profiles]
@@ -0,0 +1,175 @@
+"""Offline tests for the remote recommender path, run against LocalGradioStub.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_utils import TTLCache  # noqa: E402
+from recommender import DEFAULT_SPACE, AsyncRecommender, ClientPool, GradioBackend, LocalGradioStub  # noqa: E402
+
+PROFILE = {"age": "26-35", "region": "South Asia", "bf_stage": "Lactation", "conditions": ["Anemia", "Thyroid"]}
+
+
+class CountingStub(LocalGradioStub):
+    """LocalGradioStub that counts clients created and calls answered."""
+    created = 0
+    calls = 0
+
+    def __init__(self, space):
+        super().__init__(space)
+        type(self).created += 1
+
+    def predict(self, *args, **kwargs):
+        type(self).calls += 1
+        return super().predict(*args, **kwargs)
+
+
+class GatedStub(CountingStub):
+    """CountingStub whose calls wait until `gate` is set."""
+    gate = threading.Event()
+
+    def predict(self, *args, **kwargs):
+        assert self.gate.wait(timeout=10)
+        return super().predict(*args, **kwargs)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_until_idle(recommender):
+    # Futures wake their waiters before running done callbacks, so the
+    # in-flight entry can outlive result() by a moment
+    deadline = time.monotonic() + 5
+    while recommender.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return recommender.stats()
+
+
+@pytest.fixture
+def stub():
+    CountingStub.created = CountingStub.calls = 0
+    GatedStub.created = GatedStub.calls = 0
+    GatedStub.gate = threading.Event()
+    return CountingStub
+
+
+def test_stub_answers_like_the_space(stub):
+    backend = GradioBackend(client_factory=stub)
+    result = backend.recommend(PROFILE)
+    assert set(result) == {"plan", "meal_ideas", "tips"}
+    assert isinstance(result["plan"], str) and result["plan"]
+    with pytest.raises(ValueError):
+        stub(DEFAULT_SPACE).submit("26-35", "Europe", "Lactation", "", api_name="/x").result()
+
+
+def test_cache_hits_until_ttl_expires(stub):
+    clock = FakeClock()
+    backend = GradioBackend(client_factory=stub, cache_ttl=60)
+    backend.cache = TTLCache(maxsize=8, ttl=60, clock=clock)
+
+    first = backend.recommend(PROFILE)
+    # Condition order is not part of the key
+    reordered = dict(PROFILE, conditions=list(reversed(PROFILE["conditions"])))
+    assert backend.recommend(reordered) == first
+    assert stub.calls == 1
+    assert backend.stats()["hits"] == 1 and backend.stats()["misses"] == 1
+
+    clock.now = 61
+    assert backend.recommend(PROFILE) == first
+    assert stub.calls == 2
+    assert backend.stats()["expirations"] == 1
+
+
+def test_cache_evicts_least_recently_used(stub):
+    backend = GradioBackend(client_factory=stub)
+    backend.cache = TTLCache(maxsize=2, ttl=60, clock=FakeClock())
+    for stage in ("Lactation", "Weaning", "Extended"):
+        backend.recommend(dict(PROFILE, bf_stage=stage))
+    backend.recommend(dict(PROFILE, bf_stage="Lactation"))
+    assert stub.calls == 4
+    assert backend.stats()["evictions"] == 2
+
+
+def test_client_pool_reuses_clients_and_bounds_them(stub):
+    pool = ClientPool(stub, "space", size=2)
+    a, b = pool.acquire(), pool.acquire()
+    assert stub.created == 2
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+    pool.release(a)
+    assert pool.acquire(timeout=0.01) is a
+    assert stub.created == 2
+
+    # A waiting caller gets the next client returned
+    threading.Timer(0.05, pool.release, args=(b,)).start()
+    assert pool.acquire(timeout=5) is b
+
+
+def test_client_pool_forgets_failed_creations():
+    attempts = []
+
+    def flaky(space):
+        attempts.append(space)
+        if len(attempts) == 1:
+            raise ConnectionError("Space is waking up")
+        return object()
+
+    pool = ClientPool(flaky, "space", size=1)
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    # The failed attempt doesn't use up the pool's only slot
+    assert pool.acquire(timeout=0.01) is not None
+
+
+def test_async_recommender_coalesces_in_flight_profiles(stub):
+    recommender = AsyncRecommender(GradioBackend(client_factory=GatedStub), max_workers=4)
+    first = recommender.submit(PROFILE)
+    second = recommender.submit(dict(PROFILE, conditions=["Thyroid", "Anemia"]))
+    other = recommender.submit(dict(PROFILE, region="Europe"))
+    assert second is first and other is not first
+    assert recommender.stats() == {"in_flight": 2, "submitted": 2, "coalesced": 1}
+
+    GatedStub.gate.set()
+    assert first.result(timeout=10) == second.result(timeout=10)
+    other.result(timeout=10)
+    assert GatedStub.calls == 2
+
+    # Done requests leave the in-flight table; a repeat is served from the backend's cache
+    wait_until_idle(recommender)
+    again = recommender.submit(PROFILE)
+    assert again is not first
+    assert again.result(timeout=10) == first.result()
+    assert GatedStub.calls == 2
+    assert wait_until_idle(recommender) == {"in_flight": 0, "submitted": 3, "coalesced": 1}
+
+
+def test_async_recommender_passes_errors_to_every_waiter(stub):
+    class Failing:
+        def __init__(self):
+            self.gate = threading.Event()
+
+        def recommend(self, profile):
+            self.gate.wait(timeout=10)
+            raise RuntimeError("Space unavailable")
+
+    backend = Failing()
+    recommender = AsyncRecommender(backend, max_workers=1)
+    futures = [recommender.submit(PROFILE) for _ in range(3)]
+    backend.gate.set()
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(timeout=10)
+    assert wait_until_idle(recommender) == {"in_flight": 0, "submitted": 1, "coalesced": 2}
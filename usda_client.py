@@ -0,0 +1,119 @@
+# usda_client.py
+# Cached client for the USDA FoodData Central search API.
+#
+# Lookups are keyed on the normalized food name and go through two cache tiers:
+# an in-process LRU, then a SQLite file shared by all workers on the host. Only
+# misses in both reach the API, over one pooled requests.Session. Transient
+# failures are retried with backoff, but one lookup never takes longer than
+# `deadline` seconds in total: each attempt's timeout and each backoff sleep are
+# cut to the time left.
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache_utils import CACHE_DIR, SQLiteTTLStore, TTLCache
+from fuzzy_index import normalize
+
+SEARCH_URL = "https://api.nal.usda.gov/fdc/v1/foods/search"
+CACHE_PATH = os.environ.get("NUTRIMAMA_USDA_CACHE", os.path.join(CACHE_DIR, "usda_cache.sqlite"))
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def make_session(pool_size=10):
+    """requests.Session with a connection pool; USDAClient does its own retries."""
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class USDAClient:
+    def __init__(self, api_key, cache_path=CACHE_PATH, memory_size=2048, ttl=7 * 24 * 3600,
+                 timeout=(3.05, 10), deadline=15, retries=3, backoff=0.5, session=None):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.session = session or make_session()
+        self.memory = TTLCache(maxsize=memory_size, ttl=ttl)
+        self.disk = SQLiteTTLStore(cache_path, ttl=ttl)
+        self._lock = threading.Lock()
+        self.api_calls = 0
+        self.api_errors = 0
+
+    def _search(self, food_name):
+        with self._lock:
+            self.api_calls += 1
+        params = {"query": food_name, "api_key": self.api_key, "pageSize": 1}
+        data = self._get_json(params)
+        if data is None:
+            with self._lock:
+                self.api_errors += 1
+            return None
+        if not data.get("foods"):
+            return {}
+        return {n["nutrientName"]: n["value"] for n in data["foods"][0]["foodNutrients"]}
+
+    def _get_json(self, params):
+        """The search response, or None once the attempts or the deadline run out."""
+        deadline = time.monotonic() + self.deadline
+        connect_timeout, read_timeout = self.timeout
+        for attempt in range(self.retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            delay = self.backoff * 2 ** attempt
+            try:
+                response = self.session.get(
+                    SEARCH_URL, params=params,
+                    timeout=(min(connect_timeout, remaining), min(read_timeout, remaining))
+                )
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    return response.json()
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = int(retry_after)
+            except (requests.ConnectionError, requests.Timeout):
+                pass
+            except (requests.RequestException, ValueError):
+                return None
+            if attempt == self.retries or time.monotonic() + delay >= deadline:
+                return None
+            time.sleep(delay)
+        return None
+
+    def get_nutrient_info(self, food_name):
+        """{nutrientName: value} for the top search hit; {} if nothing matched or the API failed."""
+        key = normalize(food_name)
+        if not key:
+            return {}
+        nutrients = self.memory.get(key)
+        if nutrients is None:
+            nutrients = self.disk.get(key)
+            if nutrients is None:
+                nutrients = self._search(food_name)
+                if nutrients is None:
+                    # Failures aren't cached so the next attempt retries the API
+                    return {}
+                self.disk.set(key, nutrients)
+            self.memory.set(key, nutrients)
+        return dict(nutrients)
+
+    def stats(self):
+        memory = self.memory.stats()
+        disk = self.disk.stats()
+        return {
+            "memory_hits": memory["hits"],
+            "disk_hits": disk["hits"],
+            "api_calls": self.api_calls,
+            "api_errors": self.api_errors,
+            "api_calls_saved": memory["hits"] + disk["hits"],
+            "memory_size": memory["size"],
+            "disk_size": disk["size"],
+        }
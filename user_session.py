@@ -0,0 +1,77 @@
+# user_session.py
+# Ties a Streamlit session to its stored user.
+#
+# The user id travels in the `uid` query parameter, so a refresh or a new tab
+# finds the same profile. Pages call restore_session() first thing; it loads the
+# profile once per session, and load_once() does the same for each page's data.
+# Writes are committed in the background; restore_session() also reports any of
+# the user's writes that failed since the last run.
+import os
+import uuid
+
+import streamlit as st
+
+from storage import DB_PATH, SQLiteRepository, StorageError
+
+
+@st.cache_resource
+def get_repository():
+    """One repository (connection pool + writer thread) per server process."""
+    return SQLiteRepository(os.environ.get("NUTRIMAMA_DB", DB_PATH))
+
+
+def current_user_id():
+    """The session's user id, taken from the URL on a fresh session; None if unknown."""
+    user_id = st.session_state.get("user_id") or st.query_params.get("uid")
+    if user_id:
+        st.session_state.user_id = user_id
+        if st.query_params.get("uid") != user_id:
+            st.query_params["uid"] = user_id
+    return user_id
+
+
+def save_profile(profile):
+    """Store the onboarding profile, assigning a user id the first time."""
+    user_id = current_user_id()
+    if not user_id:
+        user_id = uuid.uuid4().hex
+        st.session_state.user_id = user_id
+        st.query_params["uid"] = user_id
+    st.session_state.user_profile = profile
+    get_repository().save_profile(user_id, profile)
+    return user_id
+
+
+def report_failed_writes(user_id):
+    """Show an error if any of the user's queued writes could not be saved."""
+    try:
+        get_repository().flush(user_id)
+    except StorageError as e:
+        st.error(f"⚠️ Some changes could not be saved: {e}")
+
+
+def restore_session():
+    """Load the stored profile into session_state once per session."""
+    user_id = current_user_id()
+    if user_id:
+        report_failed_writes(user_id)
+    if st.session_state.get("profile_restored"):
+        return user_id
+    st.session_state.profile_restored = True
+    if user_id:
+        profile = get_repository().load_profile(user_id)
+        if profile:
+            st.session_state.user_profile = profile
+            st.session_state.show_onboarding = False
+    elif st.session_state.get("user_profile"):
+        # Profile created before storage existed: give it an id and keep it
+        save_profile(st.session_state.user_profile)
+        user_id = st.session_state.user_id
+    return user_id
+
+
+def load_once(key, load):
+    """session_state[key], filled from storage via load(repository, user_id) on first use."""
+    if key not in st.session_state:
+        st.session_state[key] = load(get_repository(), current_user_id())
+    return st.session_state[key]